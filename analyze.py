@@ -7,21 +7,30 @@
 import json
 import sys
 import os
-import time
 from typing import Dict, List, Optional
 
 # 添加项目根目录到路径
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+import cassette
 from config import LLM_MODEL, TEMPERATURE
 
 # 配置（从config.py读取）
 LLM_MODEL_CONFIG = LLM_MODEL  # "minimax/MiniMax-M2.1" 或 "moonshot/kimi-k2.5"
 MAX_TOKENS = 1000
 
+_llm_client = None
+
 def get_llm_client():
+    """获取LLM客户端（进程内只创建一次，守护模式下各轮复用）"""
+    global _llm_client
+    if _llm_client is None:
+        _llm_client = _create_llm_client()
+    return _llm_client
+
+def _create_llm_client():
     """
-    获取LLM客户端
+    创建LLM客户端
     优先使用 MiniMax，兼容 OpenAI
     """
     import json
@@ -110,28 +119,13 @@ def analyze_with_llm(text: str, client=None, provider=None) -> Dict:
     ]
     
     try:
-        # 获取客户端
-        if client is None:
-            client, provider = get_llm_client()
+        # 录制/回放模式下经过 cassette，回放时不需要LLM客户端
+        request = {"model": LLM_MODEL_CONFIG, "temperature": TEMPERATURE, "messages": messages}
+        content = cassette.llm_completion(request, lambda: _complete(messages, client, provider))
         
-        if client is None:
+        if content is None:
             return {"error": "无法初始化LLM客户端"}
         
-        # 确定模型名称
-        if provider == "minimax":
-            model_name = LLM_MODEL_CONFIG.replace("minimax/", "")
-        else:
-            model_name = LLM_MODEL_CONFIG
-        
-        resp = client.chat.completions.create(
-            model=model_name,
-            messages=messages,
-            temperature=TEMPERATURE,
-            max_tokens=MAX_TOKENS,
-        )
-        
-        content = resp.choices[0].message.content
-        
         # 清理并解析JSON
         content = content.strip()
         # 移除markdown代码块标记
@@ -153,6 +147,30 @@ def analyze_with_llm(text: str, client=None, provider=None) -> Dict:
         return {"error": str(e)}
 
 
+def _complete(messages: List[Dict], client=None, provider=None) -> Optional[str]:
+    """调用LLM，返回回复文本；没有可用客户端返回 None"""
+    if client is None:
+        client, provider = get_llm_client()
+    
+    if client is None:
+        return None
+    
+    # 确定模型名称
+    if provider == "minimax":
+        model_name = LLM_MODEL_CONFIG.replace("minimax/", "")
+    else:
+        model_name = LLM_MODEL_CONFIG
+    
+    resp = client.chat.completions.create(
+        model=model_name,
+        messages=messages,
+        temperature=TEMPERATURE,
+        max_tokens=MAX_TOKENS,
+    )
+    
+    return resp.choices[0].message.content
+
+
 def simple_keyword_analysis(text: str) -> Dict:
     """
     简单关键词分析（无LLM时的备用方案）
@@ -201,7 +219,9 @@ def batch_analyze(items: List[Dict], limit: int = 50) -> List[Dict]:
     """
     client, provider = get_llm_client()
     
-    use_keyword = client is None
+    # 回放时以录制内容为准：录到过LLM回复就走LLM分析
+    tape = cassette.get_cassette()
+    use_keyword = client is None and not (tape and tape.replaying and tape.has("llm"))
     if use_keyword:
         print(f"\n🔍 开始分析 {min(len(items), limit)} 条内容 (使用关键词分析)...")
     else:
@@ -233,7 +253,7 @@ def batch_analyze(items: List[Dict], limit: int = 50) -> List[Dict]:
         
         # 控速
         sleep_time = 1.5 if provider == "minimax" else 1.2
-        time.sleep(0.3 if use_keyword else sleep_time)
+        cassette.sleep(0.3 if use_keyword else sleep_time)
     
     print(f"\n✅ 分析完成: {len(results)} 条")
     return results
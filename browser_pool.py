@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+openclaw 浏览器标签页池
+策略：
+1. 每个 worker 常驻一个标签页，抓取时用 navigate 复用标签页，不再每页 open/close
+2. 多个 worker 并行，多只股票可同时抓取
+3. navigate 不可用或标签页失效时，退回原来的 open → snapshot → close 命令行方式
+4. 打开页面后不再固定 sleep，而是按递增间隔轮询 snapshot，直到出现 JSON 数据
+5. 每页的等待耗时记录到 BROWSER_LATENCY_FILE，用于调整默认等待参数
+6. 打开页面前过 rate_control 的 AIMD 限速，超时拿不到 JSON（多半是 WAF 页）视为被限流
+
+测试：设置 OPENCLAW_BIN="python3 fake_openclaw.py" 即可脱离真实浏览器运行
+"""
+
+import atexit
+import json
+import os
+import queue
+import re
+import shlex
+import subprocess
+import threading
+import time
+from typing import List, Dict, Optional, Tuple
+
+import cassette
+import config
+import rate_control
+
+
+def run_openclaw(args: List[str], timeout: int = 30) -> subprocess.CompletedProcess:
+    """执行 openclaw browser 子命令"""
+    cmd = shlex.split(config.OPENCLAW_BIN) + ['browser'] + args
+    return subprocess.run(cmd, capture_output=True, text=True, timeout=timeout)
+
+
+def parse_target_id(output: str) -> Optional[str]:
+    """从 browser open 的输出里解析 targetId (格式: "id: xxx")"""
+    match = re.search(r'id:\s*([A-F0-9]+)', output)
+    return match.group(1) if match else None
+
+
+READY_MARKER = 'generic [ref='  # snapshot 中出现 JSON 文本节点即表示页面已就绪
+
+_latency_lock = threading.Lock()
+
+
+def record_latency(url: str, elapsed: float, polls: int, ready: bool):
+    """记录一次页面等待耗时（JSON Lines）"""
+    entry = {
+        'ts': int(time.time()),
+        'path': url.split('?', 1)[0],
+        'elapsed': round(elapsed, 3),
+        'polls': polls,
+        'ready': ready,
+    }
+    with _latency_lock:
+        try:
+            with open(config.BROWSER_LATENCY_FILE, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        except OSError:
+            pass
+
+
+def wait_for_snapshot(target_id: str, url: str = '') -> Tuple[str, bool]:
+    """
+    轮询 snapshot 直到出现 JSON 数据，间隔递增，总时长不超过 BROWSER_READY_TIMEOUT
+
+    Returns:
+        (最后一次 snapshot 输出, 是否就绪)
+    """
+    start = time.time()
+    interval = config.BROWSER_POLL_INITIAL
+    output = ''
+    polls = 0
+    ready = False
+
+    while True:
+        time.sleep(interval)
+        result = run_openclaw(['snapshot', '--target-id', target_id])
+        polls += 1
+
+        if result.returncode == 0:
+            output = result.stdout
+            if READY_MARKER in output:
+                ready = True
+                break
+
+        if time.time() - start + interval >= config.BROWSER_READY_TIMEOUT:
+            break
+        interval = min(interval * config.BROWSER_POLL_BACKOFF, config.BROWSER_POLL_MAX)
+
+    record_latency(url, time.time() - start, polls, ready)
+    return output, ready
+
+
+def latency_summary(filename: str = None) -> Dict:
+    """统计历史等待耗时分位数（用于调整 BROWSER_POLL_INITIAL 等参数）"""
+    filename = filename or config.BROWSER_LATENCY_FILE
+    if not os.path.exists(filename):
+        return {}
+
+    elapsed = []
+    timeouts = 0
+    with open(filename, 'r', encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            if entry.get('ready'):
+                elapsed.append(entry['elapsed'])
+            else:
+                timeouts += 1
+
+    if not elapsed:
+        return {'count': 0, 'timeouts': timeouts}
+
+    elapsed.sort()
+
+    def pct(p):
+        return elapsed[min(int(len(elapsed) * p), len(elapsed) - 1)]
+
+    return {
+        'count': len(elapsed),
+        'timeouts': timeouts,
+        'p50': pct(0.5),
+        'p90': pct(0.9),
+        'p99': pct(0.99),
+        'max': elapsed[-1],
+    }
+
+
+def fetch_snapshot_cli(url: str) -> str:
+    """
+    原始方式：open → 轮询 snapshot → close
+
+    Returns:
+        snapshot 输出，失败返回空字符串
+    """
+    r1 = run_openclaw(['open', url])
+    target_id = parse_target_id(r1.stdout)
+    if not target_id:
+        return ''
+
+    try:
+        output, _ = wait_for_snapshot(target_id, url)
+        return output
+    finally:
+        run_openclaw(['close', '--target-id', target_id], timeout=10)
+
+
+class BrowserWorker:
+    """常驻一个标签页的 worker"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.target_id: Optional[str] = None
+        self.navigate_failures = 0  # 连续失败2次视为不支持 navigate，退回命令行方式
+
+    def _open(self, url: str) -> bool:
+        result = run_openclaw(['open', url])
+        self.target_id = parse_target_id(result.stdout)
+        return self.target_id is not None
+
+    def load(self, url: str) -> bool:
+        """在自己的标签页里打开 url"""
+        if self.target_id is None:
+            return self._open(url)
+
+        result = run_openclaw(['navigate', url, '--target-id', self.target_id])
+        if result.returncode == 0:
+            self.navigate_failures = 0
+            return True
+
+        # 标签页失效（或不支持 navigate）：关掉重开
+        self.navigate_failures += 1
+        self.close()
+        return self._open(url)
+
+    def snapshot(self, url: str) -> str:
+        """打开 url 并返回 snapshot 输出"""
+        if self.navigate_failures >= 2:
+            return fetch_snapshot_cli(url)
+
+        if not self.load(url):
+            return ''
+
+        output, _ = wait_for_snapshot(self.target_id, url)
+        if not output:
+            self.close()
+        return output
+
+    def close(self):
+        if self.target_id:
+            try:
+                run_openclaw(['close', '--target-id', self.target_id], timeout=10)
+            except Exception:
+                pass
+            self.target_id = None
+
+
+class BrowserPool:
+    """标签页池：N 个 worker，每次借一个空闲的"""
+
+    def __init__(self, size: int = config.BROWSER_POOL_SIZE):
+        self.size = max(size, 1)
+        self.workers = [BrowserWorker(f"tab-{i}") for i in range(self.size)]
+        self._idle = queue.Queue()
+        for worker in self.workers:
+            self._idle.put(worker)
+
+    def snapshot(self, url: str) -> str:
+        """
+        借一个标签页打开 url 并抓取 snapshot（录制/回放模式下经过 cassette）
+
+        Returns:
+            snapshot 输出，失败返回空字符串
+        """
+        return cassette.browser_snapshot(url, lambda: self._snapshot(url))
+
+    def _snapshot(self, url: str) -> str:
+        controller = rate_control.get_controller()
+        controller.acquire(url)
+        output = ''
+        worker = self._idle.get()
+        try:
+            output = worker.snapshot(url)
+        except Exception as e:
+            print(f"   ⚠️ [{worker.name}] 浏览器异常，改用命令行方式: {e}")
+            worker.close()
+            try:
+                output = fetch_snapshot_cli(url)
+            except Exception:
+                output = ''
+        finally:
+            self._idle.put(worker)
+            controller.release(url, rate_control.OK if READY_MARKER in output else rate_control.THROTTLED)
+        return output
+
+    def close(self):
+        """关闭所有常驻标签页"""
+        for worker in self.workers:
+            worker.close()
+
+
+_pool: Optional[BrowserPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_browser_pool() -> BrowserPool:
+    """获取进程级共享的标签页池（进程退出时自动关闭标签页）"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = BrowserPool()
+            atexit.register(_pool.close)
+        return _pool
+
+
+if __name__ == "__main__":
+    import sys
+
+    url = sys.argv[1] if len(sys.argv) > 1 else 'https://xueqiu.com/query/v1/symbol/search/status?symbol=SH600118&count=20&comment=0'
+    pool = get_browser_pool()
+
+    print(f"🌐 标签页池: {pool.size} 个 | openclaw: {config.OPENCLAW_BIN}")
+    for i in range(3):
+        start = time.time()
+        output = pool.snapshot(url)
+        print(f"   第 {i + 1} 次: {len(output)} 字符, {time.time() - start:.2f}s")
+
+    summary = latency_summary()
+    if summary.get('count'):
+        print(f"\n⏱️ 页面就绪耗时 ({summary['count']} 页, 超时 {summary['timeouts']}):")
+        print(f"   p50={summary['p50']}s p90={summary['p90']}s p99={summary['p99']}s max={summary['max']}s")
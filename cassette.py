@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+"""
+录制 / 回放层（cassette）
+策略：
+1. record：照常联网，把每个 HTTP 响应、浏览器 snapshot、LLM 回复按请求归档
+2. replay：完全离线，按同样的请求 key 从归档里取回响应，不访问网络
+3. 归档为 gzip 压缩的 JSON Lines，一行一条记录
+4. 同一个请求被重复发出时按录制顺序依次回放，用完后重复最后一次
+5. 回放时时钟冻结在录制时刻（now()）：24 小时截止、水位线断档等按录制时的"现在"算，隔多久回放结果都一样
+
+请求 key 会去掉 URL 里的 _=时间戳 防缓存参数，回放时才能对上号
+回放模式下限速用的 sleep 全部跳过，方便对 normalize/analyze/signals/top10 做基准测试
+
+使用:
+    python run.py --record              # 联网跑一遍并录制
+    python run.py --replay              # 离线回放
+    XUEQIU_CASSETTE_MODE=replay python fetch_status_v2.py SH600118
+"""
+
+import atexit
+import base64
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+import config
+
+RECORD = "record"
+REPLAY = "replay"
+
+# 录制时保留的响应头（Set-Cookie 等敏感头不落盘）
+KEEP_HEADERS = ('content-type', 'date')
+
+
+def normalize_url(url: str) -> str:
+    """去掉防缓存参数并排序 query，作为请求 key 的一部分"""
+    parts = urlsplit(url)
+    query = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k != '_')
+    return urlunsplit((parts.scheme, parts.netloc.lower(), parts.path, urlencode(query), ''))
+
+
+def request_key(kind: str, request: Dict) -> str:
+    """请求 key：类型 + 请求内容的 sha1"""
+    raw = json.dumps(request, ensure_ascii=False, sort_keys=True)
+    return f"{kind}:{hashlib.sha1(raw.encode('utf-8')).hexdigest()[:20]}"
+
+
+class Cassette:
+    """一个录制 / 回放归档"""
+
+    def __init__(self, mode: str, filename: str = config.CASSETTE_FILE):
+        if mode not in (RECORD, REPLAY):
+            raise ValueError(f"未知的 cassette 模式: {mode}")
+
+        self.mode = mode
+        self.filename = filename
+        self.lock = threading.Lock()
+        self.records: Dict[str, List[Dict]] = defaultdict(list)
+        self.cursors: Dict[str, int] = defaultdict(int)
+        self.hits = 0
+        self.misses = 0
+        self.started = time.time()
+        self.recorded_at: Optional[float] = None  # 回放：归档里最早一条记录的时间
+
+        if mode == REPLAY:
+            self._load()
+            stamps = [e['ts'] for entries in self.records.values() for e in entries]
+            self.recorded_at = min(stamps) if stamps else None
+
+    def _load(self, filename: Optional[str] = None):
+        filename = filename or self.filename
+        if not os.path.exists(filename):
+            raise FileNotFoundError(f"找不到录制文件: {filename}")
+
+        with gzip.open(filename, 'rt', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    with self.lock:
+                        self.records[record['key']].append(record)
+
+    def merge(self, filename: str) -> bool:
+        """把另一个进程（如 work_queue 的 worker）的录制并进来，合并后删掉那个文件"""
+        if self.mode != RECORD or not os.path.exists(filename):
+            return False
+        self._load(filename)
+        os.remove(filename)
+        return True
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == REPLAY
+
+    def has(self, kind: str) -> bool:
+        """归档里是否有某类记录（如 llm）"""
+        prefix = kind + ':'
+        return any(key.startswith(prefix) for key in self.records)
+
+    def lookup(self, kind: str, request: Dict) -> Optional[Dict]:
+        """回放：按 key 取下一条记录，没有返回 None"""
+        key = request_key(kind, request)
+        with self.lock:
+            entries = self.records.get(key)
+            if not entries:
+                self.misses += 1
+                return None
+            idx = min(self.cursors[key], len(entries) - 1)
+            self.cursors[key] += 1
+            self.hits += 1
+            return entries[idx]['response']
+
+    def record(self, kind: str, request: Dict, response: Any):
+        """录制一条"""
+        entry = {
+            'key': request_key(kind, request),
+            'kind': kind,
+            'ts': int(time.time()),
+            'request': request,
+            'response': response,
+        }
+        with self.lock:
+            self.records[entry['key']].append(entry)
+
+    def call(self, kind: str, request: Dict, live: Callable[[], Any]) -> Any:
+        """
+        通用入口：回放时取归档，否则调用 live() 并（录制时）归档
+
+        live() 返回 None 表示失败，不录制
+        """
+        if self.replaying:
+            return self.lookup(kind, request)
+        response = live()
+        if response is not None:
+            self.record(kind, request, response)
+        return response
+
+    def save(self):
+        """录制结果写盘（整份重写，先写临时文件再替换）"""
+        if self.mode != RECORD:
+            return
+        with self.lock:
+            entries = [e for items in self.records.values() for e in items]
+            entries.sort(key=lambda e: e['ts'])
+            tmp_file = self.filename + '.tmp'
+            with gzip.open(tmp_file, 'wt', encoding='utf-8') as f:
+                for entry in entries:
+                    f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+            os.replace(tmp_file, self.filename)
+
+    def summary(self) -> str:
+        total = sum(len(items) for items in self.records.values())
+        if self.replaying:
+            return f"回放 {self.hits} 次命中, {self.misses} 次未命中 ({self.filename})"
+        return f"录制 {total} 条 ({self.filename})"
+
+
+_cassette: Optional[Cassette] = None
+
+
+def start(mode: str, filename: Optional[str] = None) -> Cassette:
+    """开启录制 / 回放（进程级）"""
+    global _cassette
+    stop()
+    _cassette = Cassette(mode, filename or config.CASSETTE_FILE)
+    print(f"📼 cassette {mode}: {_cassette.filename}")
+    return _cassette
+
+
+def stop():
+    """结束录制 / 回放，录制模式下写盘"""
+    global _cassette
+    if _cassette is not None:
+        _cassette.save()
+        _cassette = None
+
+
+def child_env(name: str) -> Dict[str, str]:
+    """
+    子进程的环境变量：让子进程沿用当前的录制 / 回放模式
+
+    回放时子进程读同一个归档；录制时各写各的（归档文件名加上 name），结束后由父进程 merge
+    """
+    env = dict(os.environ)
+    cassette = get_cassette()
+    if cassette is not None:
+        env['XUEQIU_CASSETTE_MODE'] = cassette.mode
+        env['XUEQIU_CASSETTE'] = cassette.filename if cassette.replaying else child_filename(cassette, name)
+    return env
+
+
+def child_filename(cassette: Cassette, name: str) -> str:
+    """子进程 name 的录制文件"""
+    return f"{cassette.filename}.{name}"
+
+
+def get_cassette() -> Optional[Cassette]:
+    """当前生效的 cassette；也可以用环境变量 XUEQIU_CASSETTE_MODE 开启"""
+    if _cassette is None and config.CASSETTE_MODE:
+        start(config.CASSETTE_MODE)
+    return _cassette
+
+
+def replaying() -> bool:
+    cassette = get_cassette()
+    return cassette is not None and cassette.replaying
+
+
+def now() -> float:
+    """
+    当前时间戳（秒）：回放时是录制时刻加上回放已经过的时间，否则就是 time.time()
+
+    抓取的 24 小时截止、水位线断档、分析结果保留窗口等用这个，回放才可重复
+    """
+    cassette = get_cassette()
+    if cassette is not None and cassette.replaying and cassette.recorded_at:
+        return cassette.recorded_at + (time.time() - cassette.started)
+    return time.time()
+
+
+def sleep(seconds: float):
+    """限速用的 sleep，回放时跳过"""
+    if not replaying():
+        time.sleep(seconds)
+
+
+atexit.register(stop)
+
+
+# ============ HTTP ============
+
+def _encode_response(resp: requests.Response) -> Dict:
+    body = resp.content
+    try:
+        text, binary = body.decode('utf-8'), False
+    except UnicodeDecodeError:
+        text, binary = base64.b64encode(body).decode('ascii'), True
+    return {
+        'status': resp.status_code,
+        'reason': resp.reason,
+        'url': resp.url,
+        'headers': {k: v for k, v in resp.headers.items() if k.lower() in KEEP_HEADERS},
+        'encoding': resp.encoding,
+        'body': text,
+        'binary': binary,
+    }
+
+
+def _decode_response(data: Dict, request: requests.PreparedRequest) -> requests.Response:
+    resp = requests.Response()
+    resp.status_code = data['status']
+    resp.reason = data.get('reason', '')
+    resp.url = data.get('url') or request.url
+    resp.headers = CaseInsensitiveDict(data.get('headers', {}))
+    resp._content = base64.b64decode(data['body']) if data.get('binary') else data['body'].encode('utf-8')
+    resp.encoding = data.get('encoding') or get_encoding_from_headers(resp.headers)
+    resp.request = request
+    return resp
+
+
+def _http_request(request: requests.PreparedRequest) -> Dict:
+    body = request.body
+    if isinstance(body, bytes):
+        body = body.decode('utf-8', errors='replace')
+    return {'method': request.method, 'url': normalize_url(request.url), 'body': body or ''}
+
+
+class CassetteAdapter(HTTPAdapter):
+    """requests 传输层：未开启 cassette 时与 HTTPAdapter 完全一样"""
+
+    def send(self, request, **kwargs):
+        cassette = get_cassette()
+        if cassette is None:
+            return super().send(request, **kwargs)
+
+        key_request = _http_request(request)
+        if cassette.replaying:
+            data = cassette.lookup('http', key_request)
+            if data is None:
+                raise requests.ConnectionError(f"cassette 未录制该请求: {key_request['url']}", request=request)
+            return _decode_response(data, request)
+
+        resp = super().send(request, **kwargs)
+        cassette.record('http', key_request, _encode_response(resp))
+        return resp
+
+
+# ============ 浏览器 / LLM ============
+
+def browser_snapshot(url: str, live: Callable[[], str]) -> str:
+    """浏览器 snapshot 录制 / 回放（空结果不录制）"""
+    cassette = get_cassette()
+    if cassette is None:
+        return live()
+    return cassette.call('browser', {'url': normalize_url(url)}, lambda: live() or None) or ''
+
+
+def llm_completion(request: Dict, live: Callable[[], Optional[str]]) -> Optional[str]:
+    """LLM 回复录制 / 回放，request 为模型 + 消息"""
+    cassette = get_cassette()
+    if cassette is None:
+        return live()
+    return cassette.call('llm', request, live)
+
+
+if __name__ == "__main__":
+    import sys
+    from collections import Counter
+
+    filename = sys.argv[1] if len(sys.argv) > 1 else config.CASSETTE_FILE
+    cassette = Cassette(REPLAY, filename)
+    kinds = Counter(e['kind'] for items in cassette.records.values() for e in items)
+
+    print(f"📼 {filename} ({os.path.getsize(filename) // 1024} KB)")
+    for kind, count in kinds.most_common():
+        print(f"   {kind}: {count} 条")
+    for items in list(cassette.records.values())[:10]:
+        request = items[0]['request']
+        print(f"   - [{items[0]['kind']}] x{len(items)} {request.get('url') or request.get('model')}")
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+抓取断点续传
+策略：
+1. 每翻完一页，把这一页的原始帖子和翻页状态（页码、下一页游标、是否结束）追加到 CHECKPOINT_FILE
+2. 每段翻页按 "symbol:起始游标[:水位线id]" 标识（最新一段是 head，回补断档是断档游标）
+3. 进程中途挂掉（浏览器超时、WAF 封禁）重启后：已抓的页从检查点重放给调用方，不再请求，
+   从最后一个游标接着翻；已经翻完的段直接跳过
+4. 只有整轮批量抓取（batch_fetch / crawler / run.py）才用检查点：开始时 begin()，整轮抓完 complete() 删掉；
+   单独抓一只股票不读写检查点，不会把上一轮翻完的段当成这次的结果重放；
+   超过 CHECKPOINT_MAX_AGE 秒的检查点视为过期，重新开始
+5. 被限流 / 拦截重试中的页不记录，重启后重新请求；因时限或请求失败停下的段重启后接着翻；回放模式下不启用
+6. 内存里每段只留游标、条数、状态和各页在文件里的偏移，帖子不常驻内存，重放时再从文件读
+
+文件格式（JSONL）：第一行 {"started": 时间戳}，之后每行一页
+    {"key": "SH600118:head", "page": 下一页页码, "max_id": 下一页游标, "count": 累计条数,
+     "finished": bool, "reason": 结束原因, "posts": [原始帖子...]}
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Dict, Iterator, List, Optional
+
+import cassette
+import config
+import watermark
+
+
+class CrawlCheckpoint:
+    """按页记录的抓取检查点（线程安全，追加写）"""
+
+    def __init__(self, filename: str = config.CHECKPOINT_FILE, max_age: float = config.CHECKPOINT_MAX_AGE):
+        self.filename = filename
+        self.max_age = max_age
+        self.lock = threading.Lock()
+        self.segments: Dict[str, Dict] = {}  # key -> 最后一页的状态 + 页数 + 有帖子的页在文件里的偏移
+        self.started = time.time()
+        self._file = None
+        self._load()
+
+    @staticmethod
+    def key(walk) -> str:
+        key = f"{walk.symbol}:{walk.start_max_id or 'head'}"
+        # 增量模式带水位线，和全量抓取的同一段区分开
+        return f"{key}:{walk.mark['id']}" if walk.mark else key
+
+    def _load(self):
+        if not os.path.exists(self.filename):
+            return
+        try:
+            with open(self.filename, 'rb') as f:
+                header = json.loads(f.readline() or b'{}')
+                if time.time() - header.get('started', 0) > self.max_age:
+                    print("   🗑️ 检查点已过期，重新开始")
+                    return self._discard()
+                offset = f.tell()
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        break  # 崩溃时写到一半的最后一行
+                    self._track(entry, offset)
+                    offset += len(line)
+            self.started = header['started']
+        except (OSError, ValueError, KeyError):
+            self._discard()
+
+    def _discard(self):
+        self.segments = {}
+        self.started = time.time()
+        if os.path.exists(self.filename):
+            os.remove(self.filename)
+
+    def _track(self, entry: Dict, offset: int):
+        """更新段状态（帖子本身不留在内存里，只记偏移）"""
+        posts = entry.pop('posts')
+        segment = self.segments.setdefault(entry['key'], {'pages': 0, 'offsets': []})
+        segment['pages'] += 1
+        if posts:
+            segment['offsets'].append(offset)
+        segment.update(entry)
+
+    def _append(self, entry: Dict) -> int:
+        """追加一行，返回这一行在文件里的偏移"""
+        if self._file is None:
+            fresh = not os.path.exists(self.filename)
+            self._file = open(self.filename, 'ab')
+            if fresh:
+                self._file.write(json.dumps({'started': self.started}).encode() + b'\n')
+        offset = self._file.seek(0, os.SEEK_END)
+        self._file.write(json.dumps(entry, ensure_ascii=False).encode('utf-8') + b'\n')
+        self._file.flush()
+        return offset
+
+    def _read_pages(self, offsets: List[int]) -> Iterator[List[Dict]]:
+        """按偏移从文件逐页读回帖子"""
+        with open(self.filename, 'rb') as f:
+            for offset in offsets:
+                f.seek(offset)
+                yield json.loads(f.readline())['posts']
+
+    def resume(self, walk) -> Iterator[List[Dict]]:
+        """
+        用检查点恢复 walk 的翻页状态（调用时立即恢复）
+
+        Returns:
+            之前已抓到的各页原始帖子，逐页从文件读（调用方按页重放）
+        """
+        with self.lock:
+            segment = self.segments.get(self.key(walk))
+            offsets = list(segment['offsets']) if segment else []
+        if not segment:
+            return iter(())
+        walk.page = segment['page']
+        walk.max_id = segment['max_id']
+        walk.count = segment['count']
+        walk.finished = segment['finished']
+        walk.reason = segment['reason']
+        if walk.reason in (watermark.END_TIMEOUT, watermark.END_FAILED):
+            # 上次是到了时限 / 请求失败才停的，不算翻完，从停下的地方接着翻
+            walk.finished, walk.reason = False, watermark.END_BUDGET
+        state = '已完成' if walk.finished else f"从第 {walk.page} 页继续"
+        print(f"   ♻️ {walk.symbol} 检查点: 重放 {segment['pages']} 页, {state}")
+        return self._read_pages(offsets)
+
+    def record(self, walk, posts: List[Dict]):
+        """记录刚翻完的一页（重试中的页不记）"""
+        if walk.retries:
+            return
+        entry = {
+            'key': self.key(walk),
+            'page': walk.page,
+            'max_id': walk.max_id,
+            'count': walk.count,
+            'finished': walk.finished,
+            'reason': walk.reason,
+        }
+        with self.lock:
+            try:
+                offset = self._append(dict(entry, posts=posts))
+            except OSError as e:
+                print(f"   ⚠️ 检查点写入失败: {e}")
+                return
+            self._track(dict(entry, posts=posts), offset)
+
+    def complete(self):
+        """整轮抓完，删除检查点"""
+        with self.lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            self._discard()
+
+    def summary(self) -> Dict:
+        with self.lock:
+            return {
+                'started': int(self.started),
+                'segments': len(self.segments),
+                'finished': sum(1 for s in self.segments.values() if s['finished']),
+                'pages': sum(s['pages'] for s in self.segments.values()),
+                'posts': sum(s['count'] for s in self.segments.values()),
+            }
+
+
+_checkpoint: Optional[CrawlCheckpoint] = None
+_checkpoint_lock = threading.Lock()
+
+
+def begin() -> Optional[CrawlCheckpoint]:
+    """整轮批量抓取开始：打开（或接着用）进程级检查点；关闭或回放时返回 None"""
+    global _checkpoint
+    if not config.CHECKPOINT_ENABLED or cassette.replaying():
+        return None
+    with _checkpoint_lock:
+        if _checkpoint is None:
+            _checkpoint = CrawlCheckpoint()
+        return _checkpoint
+
+
+def get_checkpoint() -> Optional[CrawlCheckpoint]:
+    """当前这轮批量抓取的检查点；没有 begin() 过（单独抓一只股票）时返回 None"""
+    return _checkpoint
+
+
+def complete():
+    """整轮抓取结束，删掉检查点（没有检查点时什么都不做）"""
+    global _checkpoint
+    with _checkpoint_lock:
+        if _checkpoint is not None:
+            _checkpoint.complete()
+            _checkpoint = None
+
+
+if __name__ == "__main__":
+    import sys
+
+    checkpoint = CrawlCheckpoint()
+    if '--clear' in sys.argv:
+        checkpoint.complete()
+        print(f"🗑️ 已清除检查点 {checkpoint.filename}")
+    else:
+        print(f"💾 检查点 {checkpoint.filename}: {checkpoint.summary()}")
+        for key, segment in sorted(checkpoint.segments.items()):
+            state = segment['reason'] if segment['finished'] else f"下一页 {segment['page']} (max_id={segment['max_id']})"
+            print(f"   {key}: {segment['pages']} 页, {segment['count']} 条, {state}")
@@ -1,6 +1,8 @@
 # 雪球舆情监控配置
 # ⚠️ 请从浏览器复制你的 xq_a_token 和 u Cookie
 
+import os
+
 HEADERS = {
     "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36",
     "Accept": "application/json",
@@ -30,8 +32,10 @@ SYMBOLS = [
     "SZ002149",  # 西部材料
 ]
 
-# 雪球API地址
-BASE_URL = "https://xueqiu.com"
+# 雪球API地址（可用环境变量指向 mock_server.py 做压测）
+BASE_URL = os.environ.get("XUEQIU_BASE_URL", "https://xueqiu.com")
+STOCK_BASE_URL = os.environ.get("XUEQIU_STOCK_BASE_URL", "https://stock.xueqiu.com")
+QUOTE_BASE_URL = os.environ.get("XUEQIU_QUOTE_BASE_URL", "http://qt.gtimg.cn")  # 腾讯行情
 
 # Telegram配置
 TELEGRAM_BOT_TOKEN = "8577720778:AAFnet0gNmJESRwhUihHPdBO4UNjFkS7Iqs"
@@ -44,6 +48,132 @@ WHATSAPP_TARGET = "+8613382188809"
 REQUEST_TIMEOUT = 10
 MIN_POSTS_PER_STOCK = 20
 LIVENEWS_COUNT = 50
+FETCH_STAGE_TIMEOUT = 600  # 抓取阶段（讨论 + 快讯 + 行情）时限（秒），到点各路径停止翻页
+NORMALIZE_BUFFER_SIZE = 5000  # 流式标准化时内存里最多缓存的条数，超过就排序落盘
+
+# 原始响应归档（raw_archive.py）
+RAW_CAPTURE = os.environ.get("XUEQIU_RAW_CAPTURE", "") == "1"  # 默认关闭
+RAW_ARCHIVE_DIR = "/tmp/xueqiu_raw"
+RAW_ARCHIVE_CODEC = "zstd"  # 没装 zstandard 时自动退回 zlib
+
+# 行情（quotes.py）
+QUOTE_BATCH_SIZE = 300  # 每次请求的股票数
+QUOTE_CONCURRENCY = 8  # 并发批次数
+QUOTE_CACHE_TTL = 30  # 行情缓存有效期（秒）
+QUOTE_CACHE_FILE = "/tmp/xueqiu_quotes.json"
+
+# Session池 / Cookie缓存（session_pool.py）
+SESSION_POOL_SIZE = 8
+COOKIE_CACHE_FILE = os.environ.get("XUEQIU_COOKIE_CACHE", "/tmp/xueqiu_cookies.json")
+COOKIE_TTL = 6 * 3600  # Cookie缓存有效期（秒）
+COOKIE_RETRY_TTL = 60  # 首页获取Cookie失败后，隔多久再试（秒），不写磁盘缓存
+
+# 登录凭据池（credential_pool.py）
+CREDENTIALS_FILE = os.environ.get("XUEQIU_CREDENTIALS", "")  # 多账号 JSON 文件，空则只用 COOKIES
+CREDENTIAL_COOLDOWN = 30  # 首次隔离时长（秒），之后每次翻倍
+CREDENTIAL_COOLDOWN_MAX = 1800  # 隔离时长上限（秒）
+CREDENTIAL_MAX_FAILURES = 2  # 429 / WAF 连续失败几次后隔离（401/403 立即隔离）
+CREDENTIAL_METRICS_FILE = "/tmp/xueqiu_credentials.json"  # 各凭据指标导出
+
+# 并发抓取设置（crawler.py）
+CRAWL_CONCURRENCY = 4  # 同时抓取的股票数
+CRAWL_RPS = 4.0  # 全局每秒请求数上限（单 host 速率由 AIMD 自适应）
+CRAWL_MAX_PAGES = 7  # 每只股票最大翻页数
+
+# 按活跃度调度（poll_scheduler.py）
+ACTIVITY_FILE = "/tmp/xueqiu_activity.json"  # 各股票发帖速率估计
+ACTIVITY_EWMA_ALPHA = 0.3  # 发帖速率 EWMA 系数
+ACTIVITY_TARGET_POSTS = 10  # 每次刷新期望拿到的新帖数（决定间隔）
+ACTIVITY_MIN_INTERVAL = 60  # 最热门股票的刷新间隔（秒）
+ACTIVITY_MAX_INTERVAL = 1800  # 最冷门股票的刷新间隔（秒）
+ACTIVITY_REQUEST_BUDGET = 30  # 全局请求预算（页/分钟）
+
+# 断点续传（checkpoint.py）
+CHECKPOINT_ENABLED = os.environ.get("XUEQIU_CHECKPOINT", "1") == "1"
+CHECKPOINT_FILE = "/tmp/xueqiu_checkpoint.jsonl"  # 每翻完一页追加一行（原始帖子 + 游标）
+CHECKPOINT_MAX_AGE = 3600  # 超过这么久（秒）的检查点不再续用
+
+# 抓取后端路由（fetch_backend.py）
+ROUTER_BLOCK_SECONDS = 600  # 某只股票被 WAF 拦截后改走浏览器的时长（秒）
+ROUTER_HOST_BLOCK_SYMBOLS = 3  # 同时被拦截的股票达到这么多只，整个 host 改走浏览器
+ROUTER_MIN_SUCCESS = 0.6  # http 成功率（EWMA）不低于这个值就优先用 http
+ROUTER_STATS_FILE = "/tmp/xueqiu_backend_stats.json"  # 各后端统计
+
+# 分片抓取工作队列（work_queue.py）
+WORK_QUEUE_FILE = os.environ.get("XUEQIU_WORK_QUEUE", "/tmp/xueqiu_work_queue.db")  # SQLite（WAL）队列
+WORK_OUTPUT_DIR = "/tmp/xueqiu_partitions"  # 各 worker 的输出分区
+WORK_LEASE_SECONDS = 120  # 租约时长（秒），每抓一页续租，worker 崩溃后过期由别的 worker 接手
+WORK_CHUNK_PAGES = 2  # 一个工作项最多翻几页，剩下的页数作为新工作项放回队列
+WORK_MAX_ATTEMPTS = 3  # 单个工作项最多尝试次数
+
+# 股票提及识别（symbol_tagger.py）
+SYMBOL_UNIVERSE_FILE = "/tmp/xueqiu_universe.json"  # 全市场股票表（python symbol_tagger.py --build 生成）
+SYMBOL_TAGGER_CACHE = "/tmp/xueqiu_symbol_tagger.json"  # 建好的自动机（JSON，不用 pickle），股票表不变时直接加载
+
+# 近似重复折叠（near_dup.py）
+NEAR_DUP_FILE = "/tmp/xueqiu_near_dup.json"  # MinHash 签名 + LSH 分段索引，跨轮次保留
+NEAR_DUP_WINDOW_HOURS = 24  # 只和这个时间窗口内的帖子比较
+NEAR_DUP_MAX_ENTRIES = 100000  # 索引最多保留条数（内存上限）
+NEAR_DUP_THRESHOLD = 0.7  # MinHash 估算的 Jaccard 不低于这个值算近似重复
+NEAR_DUP_BANDS = 8  # 32 维签名切成几段做 LSH（8 段 × 4 维，Jaccard 约 0.6 以上才容易成为候选）
+
+# 已处理帖子过滤（seen_filter.py）
+SEEN_FILTER_ENABLED = os.environ.get("XUEQIU_SEEN_FILTER", "1") == "1"
+SEEN_FILTER_DIR = "/tmp/xueqiu_seen"  # 每代每片一个 mmap 文件
+SEEN_FILTER_ROTATE_HOURS = 6  # 每代时长
+SEEN_FILTER_GENERATIONS = 5  # 保留几代（覆盖 30 小时，长于 24 小时抓取窗口）
+SEEN_FILTER_CAPACITY = 100000  # 每代第一片的容量，装满后加一片（容量翻倍）
+SEEN_FILTER_ERROR_RATE = 0.001  # 每代的误判率上限（约）
+
+# 分析结果列式存储（column_store.py）
+COLUMN_STORE_DIR = "/tmp/xueqiu_columns"  # 每个数据集一个子目录，每轮追加一个段，超出 DAEMON_RETENTION_HOURS 的段删掉
+
+# 交易时段节奏（market_calendar.py）
+HOLIDAY_FILE = os.environ.get("XUEQIU_HOLIDAY_FILE", "")  # 额外的休市日 JSON 列表
+MARKET_STATE_FILE = "/tmp/xueqiu_market_state.json"  # cron 模式下记录上次运行时间
+# 各时段：interval 两轮间隔（秒）、pages 每股翻页数、llm_budget 每轮 LLM 分析条数
+MARKET_PHASE_PROFILES = {
+    "pre_open": {"interval": 300, "pages": 3, "llm_budget": 30},
+    "morning": {"interval": 120, "pages": 7, "llm_budget": 50},
+    "lunch": {"interval": 900, "pages": 2, "llm_budget": 10},
+    "afternoon": {"interval": 120, "pages": 7, "llm_budget": 50},
+    "after_hours": {"interval": 900, "pages": 5, "llm_budget": 30},
+    "overnight": {"interval": 3600, "pages": 2, "llm_budget": 0},
+    "closed": {"interval": 3600, "pages": 3, "llm_budget": 10},
+}
+
+# 守护模式（run.py --daemon）
+DAEMON_HEALTH_FILE = "/tmp/xueqiu_daemon_health.json"  # 状态 / 轮次 / 最近一轮耗时和错误
+DAEMON_RETENTION_HOURS = 24  # 内存中保留多久的分析结果
+DAEMON_SEND_INTERVAL = 3600  # 带 --send 时两次推送的最小间隔（秒）
+DAEMON_MIN_SLEEP = 30  # 两轮之间最少休息（秒）
+
+# 自适应限速（rate_control.py，按 host）
+AIMD_INITIAL_RATE = 1.0  # 初始每秒请求数
+AIMD_MIN_RATE = 0.2
+AIMD_MAX_RATE = 10.0
+AIMD_RATE_STEP = 0.2  # 响应正常时每秒约增加的速率
+AIMD_INITIAL_CONCURRENCY = 2
+AIMD_MAX_CONCURRENCY = 8
+AIMD_DECREASE = 0.5  # 被限流时速率 / 并发乘以该系数
+AIMD_COOLDOWN = 2.0  # 两次降速的最小间隔（秒）
+AIMD_MAX_RETRIES = 3  # 单页被限流 / WAF 拦截后的最大重试次数
+
+# openclaw 浏览器（browser_pool.py）
+OPENCLAW_BIN = os.environ.get("OPENCLAW_BIN", "openclaw")  # 测试时可指向 fake_openclaw.py
+BROWSER_POOL_SIZE = 3  # 常驻标签页数
+BROWSER_POLL_INITIAL = 0.3  # 打开页面后首次检查间隔（秒）
+BROWSER_POLL_BACKOFF = 1.5  # 轮询间隔递增倍数
+BROWSER_POLL_MAX = 1.0  # 单次轮询最大间隔（秒）
+BROWSER_READY_TIMEOUT = 8.0  # 等待页面就绪的总超时（秒）
+BROWSER_LATENCY_FILE = "/tmp/xueqiu_browser_latency.jsonl"  # 每页就绪耗时记录
+
+# 增量抓取水位线（watermark.py）
+WATERMARK_FILE = "/tmp/xueqiu_watermarks.json"
+
+# 录制 / 回放（cassette.py）
+CASSETTE_FILE = os.environ.get("XUEQIU_CASSETTE", "/tmp/xueqiu_cassette.jsonl.gz")
+CASSETTE_MODE = os.environ.get("XUEQIU_CASSETTE_MODE", "")  # record / replay，留空为正常联网
 
 # 分析设置
 LLM_MODEL = "minimax/abab6.5s-chat"  # 使用MiniMax
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+雪球个股讨论抓取 - asyncio 并发版
+策略：
+1. 多只股票同时抓取，单只股票内部仍按 max_id 顺序翻页
+2. 全局限速（令牌桶）封顶，单 host 速率 / 并发由 rate_control 的 AIMD 自适应调整
+3. 输出格式与 fetch_status_v2.batch_fetch 一致: {symbol: [posts...]}
+4. 传入 on_page 时边抓边回调（流式），不在内存里攒全部帖子
+"""
+
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import List, Dict, AsyncIterator, Callable, Optional, Tuple
+
+import cassette
+import checkpoint
+import config
+import rate_control
+from fetch_status_v2 import fetch_page, normalize_post, PageWalk
+from session_pool import get_pool
+import watermark
+
+
+class RateLimiter:
+    """异步令牌桶限速器，rate 为每秒请求数（<=0 表示不限速）"""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.capacity = max(burst, 1)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        """取一个令牌，不够时等待（按先来后到排队）"""
+        if self.rate <= 0:
+            return
+
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class AsyncCrawler:
+    """并发抓取引擎"""
+
+    def __init__(self, concurrency: int = config.CRAWL_CONCURRENCY,
+                 rps: float = config.CRAWL_RPS,
+                 max_pages: int = config.CRAWL_MAX_PAGES,
+                 incremental: bool = False,
+                 on_page: Optional[Callable[[str, List[Dict]], None]] = None,
+                 page_depth: Optional[Dict[str, int]] = None,
+                 router=None,
+                 deadline: Optional[float] = None):
+        self.max_pages = max_pages
+        self.page_depth = page_depth or {}  # 单只股票的翻页数（poll_scheduler 按活跃度给出），缺省用 max_pages
+        self.incremental = incremental
+        self.router = router  # fetch_backend.FetchRouter：设置后每页由路由器选 http / 浏览器
+        self.on_page = on_page  # 每页回调 on_page(symbol, 原始帖子)，设置后非增量模式不再攒结果
+        self.deadline = deadline  # 时限（time.time() 时间戳）：到点各股票停止翻页，没轮到的股票不再开始
+        self.concurrency = max(concurrency, 1)
+        self.semaphore = asyncio.Semaphore(self.concurrency)
+        # 阻塞请求放到专用线程池：每个并发槽一个线程，避免默认线程池（CPU数+4）把并发压低甚至卡死
+        self.executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='crawler')
+        self.global_limiter = RateLimiter(rps)
+
+    async def run_blocking(self, func, *args):
+        """在专用线程池里执行阻塞调用"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, func, *args)
+
+    async def throttle(self):
+        """请求前过全局桶（单 host 的节奏由 session 适配器里的 AIMD 控制；回放时不限速）"""
+        if cassette.replaying():
+            return
+        await self.global_limiter.acquire()
+
+    async def crawl_symbol(self, symbol: str) -> List[Dict]:
+        """抓取单只股票24小时内的讨论（页与页之间严格顺序）"""
+        async with self.semaphore:
+            if self.expired():
+                return []
+            print(f"\n📡 [并发] 抓取 {symbol} 的24小时讨论...")
+
+            pool = get_pool()
+            # 走路由器时由后端自己借 session，这里再借一个会和它抢池子（并发槽占满即死锁）
+            session = None if self.router else await self.run_blocking(pool.checkout)
+            try:
+                if not self.incremental:
+                    posts, _, _ = await self._walk_pages(pool, session, symbol, keep=self.on_page is None)
+                    return posts
+
+                # 增量模式：先抓水位线之后的新帖，再回补上一轮留下的断档
+                run = watermark.IncrementalRun(symbol)
+                run.head_done(*await self._walk_pages(pool, session, symbol, None, run.mark))
+                for gap in list(run.pending_gaps):
+                    result = await self._walk_pages(pool, session, symbol, gap['max_id'], watermark.gap_mark(gap))
+                    run.gap_done(gap, *result)
+                await self.run_blocking(run.save)
+                return run.posts
+            finally:
+                if session is not None:
+                    pool.release(session)
+
+    async def iter_pages(self, pool, session, walk: PageWalk) -> AsyncIterator[List[Dict]]:
+        """逐页 yield 原始帖子（异步版 fetch_status_v2.iter_pages，同样先重放检查点、每页落检查点）"""
+        saved = checkpoint.get_checkpoint()
+        if saved:
+            for posts in saved.resume(walk):
+                yield posts
+        while not walk.finished:
+            await self.throttle()
+            if self.router:
+                data = await self.run_blocking(self.router.fetch_page, walk.symbol, walk.max_id)
+            else:
+                data = await self.run_blocking(fetch_page, session, walk.symbol, walk.max_id)
+            posts = walk.feed(data)
+            if saved:
+                saved.record(walk, posts)
+            if walk.renew and session is not None:
+                await self.run_blocking(pool.renew, session)
+            if posts:
+                yield posts
+
+    async def _walk_pages(self, pool, session, symbol: str,
+                          start_max_id: Optional[int] = None,
+                          mark: Optional[Dict] = None,
+                          keep: bool = True) -> Tuple[List[Dict], str, Optional[int]]:
+        """单只股票按 max_id 顺序翻页，返回 (帖子, 结束原因, 下一页游标)"""
+        walk = PageWalk(symbol, self.page_depth.get(symbol, self.max_pages), start_max_id, mark,
+                        verbose=False, deadline=self.deadline)
+        all_posts = []
+
+        async for posts in self.iter_pages(pool, session, walk):
+            if self.on_page:
+                self.on_page(symbol, posts)
+            if keep:
+                all_posts.extend(normalize_post(post, symbol) for post in posts)
+
+        if walk.reason == watermark.END_BLOCKED:
+            print(f"   🚫 {symbol} 多次被限流/拦截，停止抓取")
+        elif walk.reason == watermark.END_FAILED:
+            print(f"   ❌ {symbol} 多次请求失败，停止抓取")
+        elif walk.reason == watermark.END_TIMEOUT:
+            print(f"   ⏱️ {symbol} 到达抓取时限，停止翻页")
+        print(f"   ✅ {symbol}: 共抓取 {walk.count} 条 (来自 {walk.page} 页)")
+        return all_posts, walk.reason, walk.max_id
+
+    def expired(self) -> bool:
+        return bool(self.deadline) and time.time() >= self.deadline
+
+    async def crawl(self, symbols: List[str]) -> Dict[str, List[Dict]]:
+        """并发抓取所有股票"""
+        # 每个并发槽要能借到一个 session，否则线程会卡在借 session 上
+        get_pool().ensure_size(self.concurrency)
+        checkpoint.begin()
+        try:
+            results = await asyncio.gather(*(self.crawl_symbol(s) for s in symbols))
+        finally:
+            self.executor.shutdown(wait=False)
+        # 到了时限说明这一轮没抓完，留着检查点
+        if not self.expired():
+            checkpoint.complete()
+        return dict(zip(symbols, results))
+
+
+def crawl_symbols(symbols: List[str], max_pages: Optional[int] = None, **kwargs) -> Dict[str, List[Dict]]:
+    """
+    同步入口：并发抓取多只股票
+
+    Args:
+        symbols: 股票代码列表
+        max_pages: 每只股票最大翻页数（默认 config.CRAWL_MAX_PAGES）
+        **kwargs: concurrency / rps / incremental / on_page / page_depth / router / deadline
+
+    Returns:
+        {symbol: [posts...]}
+    """
+    async def _run():
+        crawler = AsyncCrawler(max_pages=max_pages or config.CRAWL_MAX_PAGES, **kwargs)
+        return await crawler.crawl(symbols)
+
+    return asyncio.run(_run())
+
+
+if __name__ == "__main__":
+    import sys
+
+    incremental = '--incremental' in sys.argv
+    symbols = [s for s in sys.argv[1:] if not s.startswith('--')] or config.SYMBOLS
+
+    print("="*60)
+    print("🐧 雪球24小时舆情抓取 (并发版)")
+    print(f"   并发: {config.CRAWL_CONCURRENCY} | 全局上限: {config.CRAWL_RPS} rps | 单host: AIMD 自适应")
+    print("="*60)
+
+    start = time.time()
+    all_data = crawl_symbols(symbols, incremental=incremental)
+
+    output = {
+        "fetch_time": datetime.now().isoformat(),
+        "symbols": symbols,
+        "data": all_data
+    }
+
+    with open('/tmp/xueqiu_24h_data.json', 'w', encoding='utf-8') as f:
+        json.dump(output, f, ensure_ascii=False, indent=2)
+
+    print(f"\n💾 已保存到 /tmp/xueqiu_24h_data.json (耗时 {time.time() - start:.1f}s)")
+    for symbol, posts in all_data.items():
+        print(f"   {symbol}: {len(posts)} 条")
+    print(f"\n🚦 限速状态: {rate_control.get_controller().stats()}")
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+登录凭据池（xq_a_token / u / User-Agent 组合）
+策略：
+1. 每个凭据单独统计成功率、平均延迟（EWMA）、最近一次失败时间
+2. 每次借出健康分最高的凭据：成功率 / (1 + 延迟) / (1 + 在用数)，多账号自动分摊请求
+3. 401/403 立即隔离；429 / WAF 连续失败 CREDENTIAL_MAX_FAILURES 次才隔离
+4. 隔离时长指数增长（CREDENTIAL_COOLDOWN × 2^(n-1)，上限 CREDENTIAL_COOLDOWN_MAX），成功一次清零
+5. 全部被隔离时借出最早解除隔离的那个，单账号也不会卡住
+6. 各凭据指标导出到 CREDENTIAL_METRICS_FILE
+
+多账号：在 XUEQIU_CREDENTIALS 指向的 JSON 文件里写
+    [{"name": "a", "xq_a_token": "...", "u": "...", "user_agent": "..."}, ...]
+"""
+
+import atexit
+import json
+import os
+import threading
+import time
+from typing import List, Dict, Optional
+
+import config
+
+# 失败类型
+AUTH = "auth"  # 401/403，凭据本身失效
+THROTTLED = "throttled"  # 429 / WAF，可能是单账号限流
+
+LATENCY_ALPHA = 0.3  # 延迟 EWMA 系数
+
+
+class Credential:
+    """一组登录凭据及其健康统计"""
+
+    def __init__(self, name: str, xq_a_token: str, u: str, user_agent: str = ''):
+        self.name = name
+        self.xq_a_token = xq_a_token
+        self.u = u
+        self.user_agent = user_agent or config.HEADERS['User-Agent']
+
+        self.ok = 0
+        self.failed = 0
+        self.latency = 0.0  # 秒，EWMA
+        self.last_failure = 0.0
+        self.last_status = 0
+        self.consecutive_failures = 0
+        self.quarantines = 0  # 连续被隔离次数，决定下次隔离时长
+        self.quarantined_until = 0.0
+        self.in_use = 0
+
+    def cookies(self) -> Dict[str, str]:
+        return {k: v for k, v in (('xq_a_token', self.xq_a_token), ('u', self.u)) if v}
+
+    @property
+    def success_rate(self) -> float:
+        # 先验算一次成功：没用过的凭据分数最高，会先被试一次
+        return (self.ok + 1) / (self.ok + self.failed + 1)
+
+    def score(self) -> float:
+        """健康分，越高越优先"""
+        return self.success_rate / (1.0 + self.latency) / (1.0 + self.in_use)
+
+    def metrics(self) -> Dict:
+        now = time.time()
+        return {
+            'name': self.name,
+            'ok': self.ok,
+            'failed': self.failed,
+            'success_rate': round(self.success_rate, 3),
+            'latency_ms': round(self.latency * 1000),
+            'last_failure': int(self.last_failure),
+            'last_status': self.last_status,
+            'quarantined_for': max(0, round(self.quarantined_until - now)),
+            'in_use': self.in_use,
+        }
+
+
+def load_credentials(filename: str = config.CREDENTIALS_FILE) -> List[Credential]:
+    """读取凭据列表；没有配置文件时只用 config.COOKIES 这一组"""
+    entries = []
+    if filename and os.path.exists(filename):
+        try:
+            with open(filename, 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"   ⚠️ 凭据文件读取失败: {e}")
+
+    if not entries:
+        entries = [{'name': 'default', **config.COOKIES}]
+
+    return [Credential(e.get('name') or f"cred-{i}", e.get('xq_a_token', ''),
+                       e.get('u', ''), e.get('user_agent', ''))
+            for i, e in enumerate(entries)]
+
+
+class CredentialPool:
+    """按健康分调度的凭据池（线程安全）"""
+
+    def __init__(self, credentials: Optional[List[Credential]] = None,
+                 cooldown: float = config.CREDENTIAL_COOLDOWN,
+                 cooldown_max: float = config.CREDENTIAL_COOLDOWN_MAX,
+                 max_failures: int = config.CREDENTIAL_MAX_FAILURES):
+        self.credentials = credentials or load_credentials()
+        self.cooldown = cooldown
+        self.cooldown_max = cooldown_max
+        self.max_failures = max_failures
+        self.lock = threading.Lock()
+
+    def acquire(self) -> Credential:
+        """借出当前最健康的凭据（用完调用 release）"""
+        with self.lock:
+            now = time.time()
+            healthy = [c for c in self.credentials if c.quarantined_until <= now]
+            if healthy:
+                cred = max(healthy, key=lambda c: c.score())
+            else:
+                cred = min(self.credentials, key=lambda c: c.quarantined_until)
+            cred.in_use += 1
+            return cred
+
+    def release(self, cred: Credential):
+        with self.lock:
+            cred.in_use = max(cred.in_use - 1, 0)
+
+    def report_success(self, cred: Credential, latency: float):
+        with self.lock:
+            cred.ok += 1
+            cred.last_status = 200
+            cred.consecutive_failures = 0
+            cred.quarantines = 0
+            cred.latency = latency if cred.ok == 1 else \
+                LATENCY_ALPHA * latency + (1 - LATENCY_ALPHA) * cred.latency
+
+    def report_failure(self, cred: Credential, kind: str = THROTTLED, status: int = 0):
+        with self.lock:
+            cred.failed += 1
+            cred.last_status = status
+            cred.last_failure = time.time()
+            cred.consecutive_failures += 1
+            if kind == AUTH or cred.consecutive_failures >= self.max_failures:
+                self._quarantine(cred)
+
+    def _quarantine(self, cred: Credential):
+        cred.quarantines += 1
+        duration = min(self.cooldown * 2 ** (cred.quarantines - 1), self.cooldown_max)
+        cred.quarantined_until = time.time() + duration
+        cred.consecutive_failures = 0
+        if len(self.credentials) > 1:
+            print(f"   🔒 凭据 {cred.name} 隔离 {duration:.0f}s (状态码 {cred.last_status})")
+
+    def metrics(self) -> List[Dict]:
+        with self.lock:
+            return [c.metrics() for c in self.credentials]
+
+    def export_metrics(self, filename: str = config.CREDENTIAL_METRICS_FILE):
+        """各凭据指标写入 JSON 文件"""
+        try:
+            with open(filename, 'w', encoding='utf-8') as f:
+                json.dump({'ts': int(time.time()), 'credentials': self.metrics()},
+                          f, ensure_ascii=False, indent=2)
+        except OSError as e:
+            print(f"   ⚠️ 凭据指标写入失败: {e}")
+
+
+_pool: Optional[CredentialPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_credential_pool() -> CredentialPool:
+    """获取进程级共享的凭据池（进程退出时导出指标）"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = CredentialPool()
+            atexit.register(_pool.export_metrics)
+        return _pool
+
+
+if __name__ == "__main__":
+    import random
+
+    # 模拟：a 正常，b 延迟高，c 已失效（401）
+    pool = CredentialPool([Credential('a', 'token-a', '1'),
+                           Credential('b', 'token-b', '2'),
+                           Credential('c', 'token-c', '3')], cooldown=0.5)
+    behaviour = {'a': (0.05, 200), 'b': (0.4, 200), 'c': (0.05, 401)}
+    used = {'a': 0, 'b': 0, 'c': 0}
+
+    print("🧪 模拟 300 次请求，每轮 3 个并发（a 正常 / b 慢 / c 失效）")
+    for _ in range(100):
+        batch = [pool.acquire() for _ in range(3)]
+        for cred in batch:
+            used[cred.name] += 1
+            latency, status = behaviour[cred.name]
+            if status == 200:
+                pool.report_success(cred, latency * random.uniform(0.8, 1.2))
+            else:
+                pool.report_failure(cred, AUTH, status)
+            pool.release(cred)
+        time.sleep(0.01)
+
+    print(f"   分配: {used}")
+    for m in pool.metrics():
+        print(f"   {m}")
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+假的 openclaw 命令行（测试浏览器抓取用）
+模拟 browser open / navigate / snapshot / close，返回与真实 snapshot 同格式的合成数据
+
+使用:
+    OPENCLAW_BIN="python3 fake_openclaw.py" python xueqiu_v9_production.py
+
+环境变量:
+    FAKE_OPENCLAW_STATE        标签页状态目录（默认 /tmp/fake_openclaw）
+    FAKE_OPENCLAW_DELAY        每条命令的模拟耗时（秒）
+    FAKE_OPENCLAW_NO_NAVIGATE  设为1时模拟不支持 navigate 的旧版本
+"""
+
+import json
+import os
+import sys
+import time
+import uuid
+from urllib.parse import urlparse, parse_qs
+
+STATE_DIR = os.environ.get("FAKE_OPENCLAW_STATE", "/tmp/fake_openclaw")
+DELAY = float(os.environ.get("FAKE_OPENCLAW_DELAY", "0"))
+PAGE_SIZE = 20
+
+
+def tab_file(target_id: str) -> str:
+    return os.path.join(STATE_DIR, f"{target_id}.url")
+
+
+def fake_posts(url: str) -> dict:
+    """按 URL 里的 symbol / max_id / page 生成一页倒序的帖子"""
+    query = parse_qs(urlparse(url).query)
+    symbol = query.get("symbol", ["SH600118"])[0]
+    count = int(query.get("count", [PAGE_SIZE])[0])
+    page = int(query.get("page", ["1"])[0])
+
+    now_ms = int(time.time() * 1000)
+    top_id = 400000000
+    max_id = int(query.get("max_id", ["0"])[0])
+    start_id = max_id - 1 if max_id else top_id - (page - 1) * count
+
+    posts = []
+    for post_id in range(start_id, start_id - count, -1):
+        age = top_id - post_id  # 每条帖子间隔3分钟
+        posts.append({
+            "id": post_id,
+            "created_at": now_ms - age * 180 * 1000,
+            "text": f"<p>{symbol} 第{age}条 测试讨论 &nbsp;涨停 $中国卫星(SH600118)$</p>",
+            "user": {"id": post_id % 9973, "screen_name": f"用户{post_id % 97}", "followers_count": post_id % 1000},
+            "like_count": post_id % 7,
+            "reply_count": post_id % 5,
+            "retweet_count": post_id % 3,
+            "view_count": post_id % 1000,
+            "source": "雪球",
+        })
+
+    return {"about": "", "count": len(posts), "list": posts, "maxPage": 100}
+
+
+def main(argv):
+    if len(argv) < 2 or argv[0] != "browser":
+        print("用法: fake_openclaw.py browser <open|navigate|snapshot|close> ...", file=sys.stderr)
+        return 2
+
+    os.makedirs(STATE_DIR, exist_ok=True)
+    time.sleep(DELAY)
+
+    command, args = argv[1], argv[2:]
+    target_id = args[args.index("--target-id") + 1] if "--target-id" in args else None
+
+    if command == "open":
+        target_id = uuid.uuid4().hex[:16].upper()
+        with open(tab_file(target_id), "w") as f:
+            f.write(args[0])
+        print(f"opened tab\nid: {target_id}")
+        return 0
+
+    if command == "navigate":
+        if os.environ.get("FAKE_OPENCLAW_NO_NAVIGATE") == "1":
+            print("error: unknown command 'navigate'", file=sys.stderr)
+            return 1
+        if not target_id or not os.path.exists(tab_file(target_id)):
+            print("error: tab not found", file=sys.stderr)
+            return 1
+        with open(tab_file(target_id), "w") as f:
+            f.write(args[0])
+        return 0
+
+    if command == "snapshot":
+        if not target_id or not os.path.exists(tab_file(target_id)):
+            print("error: tab not found", file=sys.stderr)
+            return 1
+        with open(tab_file(target_id)) as f:
+            url = f.read()
+        payload = json.dumps(fake_posts(url), ensure_ascii=False, separators=(",", ":"))
+        print(f'- generic [ref=e2]: {json.dumps(payload, ensure_ascii=False)}')
+        return 0
+
+    if command == "close":
+        if target_id and os.path.exists(tab_file(target_id)):
+            os.remove(tab_file(target_id))
+        return 0
+
+    print(f"error: unknown command '{command}'", file=sys.stderr)
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
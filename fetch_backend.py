@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+抓取后端路由：直连 HTTP 优先，被 WAF 拦截时才走浏览器
+策略：
+1. 两个后端同一个接口 fetch_page(symbol, max_id) -> {'list': [...]}：
+   http 走 session_pool（fetch_status_v2.fetch_page），browser 走 openclaw 标签页池（fetch_status_browser）
+2. 每个后端记录成功率（EWMA）、平均延迟（EWMA）、请求 / 拦截次数
+3. http 对某只股票返回 WAF 页：这只股票 ROUTER_BLOCK_SECONDS 秒内改走浏览器，当前页立即用浏览器重试；
+   同时被拦截的股票达到 ROUTER_HOST_BLOCK_SYMBOLS 只，视为整个 host 被拦截，所有股票都走浏览器
+4. 没被拦截时按代价选：http 成功率不低于 ROUTER_MIN_SUCCESS 就用 http，否则选 成功率 / (1 + 延迟) 高的
+5. 两个后端返回同样的原始帖子，经 PageWalk 翻页、同样的标准化，下游不用区分来源
+6. 429 是限速不是拦截，交给 AIMD 降速，不切换后端；openclaw 不可用时只用 http
+
+使用:
+    python run.py --backend auto
+    python fetch_backend.py SH600118 SZ002155   # 抓取并打印各后端统计
+"""
+
+import atexit
+import json
+import shlex
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import checkpoint
+import config
+
+HTTP = "http"
+BROWSER = "browser"
+
+STATS_ALPHA = 0.2  # 成功率 / 延迟 EWMA 系数
+
+
+class BackendStats:
+    """单个后端的成功率和延迟统计"""
+
+    def __init__(self):
+        self.requests = 0
+        self.blocked = 0
+        self.failed = 0
+        self.success = 1.0  # EWMA，先验为成功
+        self.latency = 0.0  # 秒，EWMA
+
+    def observe(self, ok: bool, latency: float):
+        self.requests += 1
+        self.success = STATS_ALPHA * (1.0 if ok else 0.0) + (1 - STATS_ALPHA) * self.success
+        self.latency = latency if self.requests == 1 else \
+            STATS_ALPHA * latency + (1 - STATS_ALPHA) * self.latency
+
+    def score(self) -> float:
+        return self.success / (1.0 + self.latency)
+
+    def to_dict(self) -> Dict:
+        return {
+            'requests': self.requests,
+            'blocked': self.blocked,
+            'failed': self.failed,
+            'success': round(self.success, 3),
+            'latency_ms': round(self.latency * 1000),
+        }
+
+
+class HttpBackend:
+    """直连接口：从 session 池借 session，WAF 页时顺手刷新 Cookie"""
+
+    name = HTTP
+
+    def fetch_page(self, symbol: str, max_id: Optional[int] = None) -> Dict:
+        from fetch_status_v2 import fetch_page
+        from session_pool import get_pool
+
+        pool = get_pool()
+        with pool.session() as session:
+            data = fetch_page(session, symbol, max_id)
+            if data.get('waf'):
+                pool.renew(session)
+        return data
+
+
+class BrowserBackend:
+    """openclaw 浏览器快照"""
+
+    name = BROWSER
+
+    @staticmethod
+    def available() -> bool:
+        parts = shlex.split(config.OPENCLAW_BIN)
+        return bool(parts) and shutil.which(parts[0]) is not None
+
+    def fetch_page(self, symbol: str, max_id: Optional[int] = None) -> Dict:
+        from fetch_status_browser import fetch_with_browser
+        return fetch_with_browser(symbol, max_id)
+
+
+class FetchRouter:
+    """按拦截状态和统计在两个后端之间路由（线程安全）"""
+
+    def __init__(self, backends: Optional[List] = None,
+                 block_seconds: float = config.ROUTER_BLOCK_SECONDS,
+                 host_block_symbols: int = config.ROUTER_HOST_BLOCK_SYMBOLS,
+                 min_success: float = config.ROUTER_MIN_SUCCESS):
+        if backends is None:
+            backends = [HttpBackend()]
+            if BrowserBackend.available():
+                backends.append(BrowserBackend())
+        self.backends = {b.name: b for b in backends}
+        self.stats = {name: BackendStats() for name in self.backends}
+        self.block_seconds = block_seconds
+        self.host_block_symbols = host_block_symbols
+        self.min_success = min_success
+        self.lock = threading.Lock()
+        self.blocked: Dict[str, float] = {}  # symbol -> http 解除拦截的时间
+        self.host_blocked_until = 0.0
+
+    def _http_blocked(self, symbol: str, now: float) -> bool:
+        return self.host_blocked_until > now or self.blocked.get(symbol, 0) > now
+
+    def choose(self, symbol: str) -> str:
+        """这只股票这一页用哪个后端"""
+        with self.lock:
+            if BROWSER not in self.backends:
+                return HTTP
+            if self._http_blocked(symbol, time.time()):
+                return BROWSER
+            if self.stats[HTTP].success >= self.min_success:
+                return HTTP
+            return max(self.stats, key=lambda name: self.stats[name].score())
+
+    def _mark_blocked(self, symbol: str):
+        with self.lock:
+            now = time.time()
+            self.blocked = {s: until for s, until in self.blocked.items() if until > now}
+            self.blocked[symbol] = now + self.block_seconds
+            if len(self.blocked) >= self.host_block_symbols and self.host_blocked_until <= now:
+                self.host_blocked_until = now + self.block_seconds
+                print(f"   🔀 {len(self.blocked)} 只股票被 WAF 拦截，{self.block_seconds:.0f}s 内全部改走浏览器")
+
+    def _call(self, name: str, symbol: str, max_id: Optional[int]) -> Dict:
+        start = time.time()
+        try:
+            data = self.backends[name].fetch_page(symbol, max_id)
+        except Exception as e:
+            print(f"   ⚠️ [{name}] {symbol} 抓取异常: {e}")
+            data = {'list': [], 'failed': True}
+        elapsed = time.time() - start
+
+        blocked = bool(data.get('waf'))
+        ok = not (blocked or data.get('failed'))
+        with self.lock:
+            stats = self.stats[name]
+            stats.observe(ok, elapsed)
+            stats.blocked += blocked
+            stats.failed += bool(data.get('failed'))
+        return data
+
+    def fetch_page(self, symbol: str, max_id: Optional[int] = None) -> Dict:
+        """抓一页；http 被 WAF 拦截且有浏览器可用时，当前页立即改用浏览器"""
+        name = self.choose(symbol)
+        data = self._call(name, symbol, max_id)
+        if name == HTTP and data.get('waf') and BROWSER in self.backends:
+            self._mark_blocked(symbol)
+            print(f"   🔀 {symbol} 被 WAF 拦截，改走浏览器")
+            data = self._call(BROWSER, symbol, max_id)
+        # 快照失败 / 异常带 failed 标记，PageWalk 会重试，仍失败则记 END_FAILED
+        return data
+
+    def summary(self) -> Dict:
+        with self.lock:
+            now = time.time()
+            return {
+                'backends': {name: stats.to_dict() for name, stats in self.stats.items()},
+                'blocked_symbols': sorted(s for s, until in self.blocked.items() if until > now),
+                'host_blocked_for': max(0, round(self.host_blocked_until - now)),
+            }
+
+    def export_stats(self, filename: str = config.ROUTER_STATS_FILE):
+        try:
+            with open(filename, 'w', encoding='utf-8') as f:
+                json.dump(dict(self.summary(), ts=int(time.time())), f, ensure_ascii=False, indent=2)
+        except OSError as e:
+            print(f"   ⚠️ 后端统计写入失败: {e}")
+
+
+_router: Optional[FetchRouter] = None
+_router_lock = threading.Lock()
+
+
+def get_router() -> FetchRouter:
+    """获取进程级共享的路由器（进程退出时导出统计）"""
+    global _router
+    with _router_lock:
+        if _router is None:
+            _router = FetchRouter()
+            atexit.register(_router.export_stats)
+        return _router
+
+
+# ---------- 翻页（与 fetch_status_v2 同样的 PageWalk / 检查点 / 标准化） ----------
+
+def iter_pages(router: FetchRouter, walk,
+               saved: Optional[checkpoint.CrawlCheckpoint] = None) -> Iterator[List[Dict]]:
+    """逐页 yield 原始帖子，每页由路由器选后端"""
+    if saved:
+        yield from saved.resume(walk)
+    while not walk.finished:
+        posts = walk.feed(router.fetch_page(walk.symbol, walk.max_id))
+        if saved:
+            saved.record(walk, posts)
+        if posts:
+            yield posts
+
+
+def walk_pages(router: FetchRouter, symbol: str, max_pages: int,
+               start_max_id: Optional[int] = None,
+               mark: Optional[Dict] = None,
+               on_page: Optional[Callable[[str, List[Dict]], None]] = None,
+               keep: bool = True,
+               deadline: Optional[float] = None) -> Tuple[List[Dict[str, Any]], str, Optional[int]]:
+    """同 fetch_status_v2.walk_pages，只是每页经路由器抓取"""
+    from fetch_status_v2 import PageWalk, normalize_post
+
+    walk = PageWalk(symbol, max_pages, start_max_id, mark, verbose=False, deadline=deadline)
+    all_posts = []
+    for posts in iter_pages(router, walk, checkpoint.get_checkpoint()):
+        if on_page:
+            on_page(symbol, posts)
+        if keep:
+            all_posts.extend(normalize_post(post, symbol) for post in posts)
+    print(f"   ✅ {symbol}: 共抓取 {walk.count} 条 (来自 {walk.page} 页)")
+    return all_posts, walk.reason, walk.max_id
+
+
+def fetch_discussions_24h(symbol: str, max_pages: int = config.CRAWL_MAX_PAGES, incremental: bool = False,
+                          on_page: Optional[Callable[[str, List[Dict]], None]] = None,
+                          router: Optional[FetchRouter] = None,
+                          deadline: Optional[float] = None) -> List[Dict[str, Any]]:
+    """抓取24小时内的讨论（参数同 fetch_status_v2.fetch_discussions_24h）"""
+    import watermark
+
+    router = router or get_router()
+
+    def walk(start_max_id, mark, keep=True):
+        return walk_pages(router, symbol, max_pages, start_max_id, mark, on_page, keep, deadline)
+
+    if incremental:
+        return watermark.incremental_fetch(symbol, walk)
+    posts, _, _ = walk(None, None, keep=on_page is None)
+    return posts
+
+
+def batch_fetch(symbols: List[str], incremental: bool = False,
+                concurrency: int = config.CRAWL_CONCURRENCY) -> Dict[str, List[Dict]]:
+    """多只股票并行抓取（http 的节奏由 AIMD 控制，浏览器受标签页数限制）"""
+    checkpoint.begin()
+    with ThreadPoolExecutor(max_workers=max(concurrency, 1)) as executor:
+        results = executor.map(lambda s: fetch_discussions_24h(s, incremental=incremental), symbols)
+        posts = dict(zip(symbols, results))
+    checkpoint.complete()
+    return posts
+
+
+if __name__ == "__main__":
+    import sys
+
+    symbols = [s for s in sys.argv[1:] if not s.startswith('--')] or config.SYMBOLS
+    router = get_router()
+    print(f"🔀 后端: {', '.join(router.backends)}")
+
+    start = time.time()
+    data = batch_fetch(symbols, incremental='--incremental' in sys.argv)
+    print(f"\n📊 {sum(len(p) for p in data.values())} 条, {time.time() - start:.1f}s")
+    print(json.dumps(router.summary(), ensure_ascii=False, indent=2))
@@ -3,11 +3,12 @@
 雪球数据抓取 - 使用OpenClaw浏览器
 """
 
-import subprocess
 import json
-import re
 from datetime import datetime
 
+from browser_pool import get_browser_pool
+from snapshot_parser import parse_snapshot
+
 def fetch_with_browser(symbol, market='SZ'):
     """
     使用浏览器获取雪球数据
@@ -19,42 +20,11 @@ def fetch_with_browser(symbol, market='SZ'):
     url = f"https://xueqiu.com/query/v1/symbol/search/status?symbol={symbol}&page=1&size=10"
     
     try:
-        # 打开页面
-        subprocess.run(
-            ['openclaw', 'browser', 'open', url],
-            capture_output=True, text=True, timeout=30
-        )
-        
-        # 等待加载
-        import time
-        time.sleep(3)
-        
-        # 获取快照
-        result = subprocess.run(
-            ['openclaw', 'browser', 'snapshot'],
-            capture_output=True, text=True, timeout=60
-        )
+        # 常驻标签页打开，轮询等待数据就绪（不再固定 sleep 3 秒）
+        snapshot = get_browser_pool().snapshot(url)
         
-        if result.returncode == 0:
-            # 快照开头是JSON数据
-            snapshot = result.stdout.strip()
-            
-            # 尝试解析JSON
-            if snapshot.startswith('{'):
-                try:
-                    data = json.loads(snapshot)
-                    return data.get('list', [])
-                except json.JSONDecodeError:
-                    pass
-            
-            # 尝试从快照中提取JSON
-            json_match = re.search(r'\{"[^{}]*"list"', snapshot)
-            if json_match:
-                try:
-                    data = json.loads(json_match.group(0))
-                    return data.get('list', [])
-                except:
-                    pass
+        # 单遍解析（兼容直接输出 JSON 和 generic 文本节点两种格式）
+        return parse_snapshot(snapshot)
     
     except Exception as e:
         print(f"❌ 错误: {e}")
@@ -5,23 +5,25 @@ API: /statuses/livenews/list.json
 快讯是情绪突变信号的重要来源
 """
 
-import requests
 import json
 import sys
 import os
-from datetime import datetime
+import time
 
 # 添加项目根目录到路径
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from config import BASE_URL, HEADERS, COOKIES, REQUEST_TIMEOUT, LIVENEWS_COUNT
+import cassette
+from config import BASE_URL, HEADERS, REQUEST_TIMEOUT, LIVENEWS_COUNT
+from session_pool import get_pool
 
-def fetch_livenews(count=50):
+def fetch_livenews(count=50, deadline=None):
     """
     获取最新快讯
     
     Args:
         count: 获取数量
+        deadline: 时限（time.time() 时间戳），请求超时不超过剩余时间
     
     Returns:
         list: 快讯列表
@@ -29,15 +31,23 @@ def fetch_livenews(count=50):
     url = f"{BASE_URL}/statuses/livenews/list.json"
     params = {"count": count}
     
+    timeout = REQUEST_TIMEOUT
+    if deadline:
+        timeout = min(timeout, deadline - time.time())
+        if timeout <= 0:
+            print("⏱️ 到达抓取时限，跳过快讯")
+            return []
+    
     try:
         print("📡 正在获取雪球快讯...")
-        r = requests.get(
-            url, 
-            headers=HEADERS, 
-            cookies=COOKIES, 
-            params=params, 
-            timeout=REQUEST_TIMEOUT
-        )
+        # Cookie 由共享 Session 池提供
+        with get_pool().session() as session:
+            r = session.get(
+                url, 
+                headers=HEADERS, 
+                params=params, 
+                timeout=timeout
+            )
         r.raise_for_status()
         
         data = r.json()
@@ -66,7 +76,7 @@ def fetch_recent_livenews(hours=2):
             break
         
         # 过滤时间
-        cutoff = datetime.now().timestamp() - hours * 3600
+        cutoff = cassette.now() - hours * 3600
         recent = [n for n in news if n.get("created_at", 0) / 1000 > cutoff]
         
         if recent:
@@ -12,19 +12,9 @@ import json
 from datetime import datetime
 from typing import List, Dict, Any
 import config
-
-# 备用 User-Agent 列表
-USER_AGENTS = [
-    "Mozilla/5.0 (iPhone; CPU iPhone OS 16_0 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/16.0 Mobile/15E148 Safari/604.1",
-    "Mozilla/5.0 (iPad; CPU OS 16_0 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/16.0 Mobile/15E148 Safari/604.1",
-    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-]
-
-# 备用 Cookie 池（示例，实际应从配置文件读取）
-COOKIE_POOL = [
-    {"xq_a_token": config.COOKIES["xq_a_token"], "u": config.COOKIES["u"]},
-]
+import text_clean
+import raw_archive
+from session_pool import get_pool, is_waf_response
 
 
 def fetch_discussions(symbol: str, max_retries: int = 3) -> List[Dict[str, Any]]:
@@ -37,27 +27,33 @@ def fetch_discussions(symbol: str, max_retries: int = 3) -> List[Dict[str, Any]]
     """
     # 尝试多个 API 端点
     api_endpoints = [
-        f"https://stock.xueqiu.com/v5/statuses/search.json?symbol={symbol}&count=50&source=全部",
-        f"https://xueqiu.com/query/v1/symbol/search/status?symbol={symbol}&size=50&source=ALL",
+        f"{config.STOCK_BASE_URL}/v5/statuses/search.json?symbol={symbol}&count=50&source=全部",
+        f"{config.BASE_URL}/query/v1/symbol/search/status?symbol={symbol}&size=50&source=ALL",
     ]
     
+    # User-Agent 跟登录 Cookie 成对，由凭据池设置在 session 上
     headers_list = [
         {
-            'User-Agent': USER_AGENTS[0],
             'Accept': 'application/json',
             'Accept-Language': 'zh-CN,zh;q=0.9',
             'Referer': 'https://xueqiu.com/',
-            'Cookie': f'xq_a_token={config.COOKIES["xq_a_token"]}; u={config.COOKIES["u"]}'
         },
         {
-            'User-Agent': USER_AGENTS[2],
             'Accept': 'application/json',
             'Accept-Language': 'en-US,en;q=0.9',
             'Referer': 'https://stock.xueqiu.com/',
-            'Cookie': f'xq_a_token={config.COOKIES["xq_a_token"]}; u={config.COOKIES["u"]}'
         },
     ]
     
+    # Cookie 由共享 Session 池统一管理（含首页下发的 device_id 等）
+    pool = get_pool()
+    with pool.session() as session:
+        return _fetch_with_session(pool, session, symbol, api_endpoints, headers_list, max_retries)
+
+
+def _fetch_with_session(pool, session: requests.Session, symbol: str, api_endpoints: List[str],
+                        headers_list: List[Dict], max_retries: int) -> List[Dict[str, Any]]:
+    """依次尝试各端点，直到拿到讨论数据"""
     for retry_count in range(max_retries):
         for endpoint_idx, url in enumerate(api_endpoints):
             headers = headers_list[endpoint_idx % len(headers_list)]
@@ -65,7 +61,7 @@ def fetch_discussions(symbol: str, max_retries: int = 3) -> List[Dict[str, Any]]
             print(f"   尝试 {retry_count + 1}/{max_retries}: {url[:60]}...")
             
             try:
-                response = requests.get(url, headers=headers, timeout=30)
+                response = session.get(url, headers=headers, timeout=30)
                 print(f"   状态码: {response.status_code}")
                 
                 if response.status_code == 200:
@@ -76,11 +72,8 @@ def fetch_discussions(symbol: str, max_retries: int = 3) -> List[Dict[str, Any]]
                         try:
                             data = response.json()
                             
-                            # 保存原始 JSON 数据
-                            raw_file = f"/tmp/xueqiu_raw_{symbol}.json"
-                            with open(raw_file, 'w', encoding='utf-8') as f:
-                                json.dump(data, f, ensure_ascii=False, indent=2)
-                            print(f"   💾 原始JSON已保存: {raw_file}")
+                            # 原始响应追加到归档（XUEQIU_RAW_CAPTURE=1 时）
+                            raw_archive.capture(response, symbol, 'status')
                             
                             # 提取讨论列表
                             posts = data.get('list', []) or data.get('statuses', [])
@@ -99,12 +92,11 @@ def fetch_discussions(symbol: str, max_retries: int = 3) -> List[Dict[str, Any]]
                     else:
                         # 返回 HTML，可能是 WAF 拦截
                         print(f"   ⚠️ 收到非JSON响应 ({content_type})，可能是WAF拦截")
+                        if is_waf_response(response):
+                            pool.renew(session)
                         
-                        # 保存原始响应用于分析
-                        raw_file = f"/tmp/xueqiu_waf_{symbol}_{endpoint_idx}.html"
-                        with open(raw_file, 'w', encoding='utf-8') as f:
-                            f.write(response.text)
-                        print(f"   💾 WAF响应已保存: {raw_file}")
+                        # 拦截页也归档，便于分析
+                        raw_archive.capture(response, symbol, 'waf')
                         continue
                         
                 elif response.status_code == 404:
@@ -113,9 +105,8 @@ def fetch_discussions(symbol: str, max_retries: int = 3) -> List[Dict[str, Any]]
                     
                 elif response.status_code == 401:
                     print(f"   ⚠️ 认证失败 (401)，尝试更换Cookie...")
-                    # 尝试更换 Cookie
-                    if endpoint_idx < len(COOKIE_POOL):
-                        headers['Cookie'] = f'xq_a_token={COOKIE_POOL[endpoint_idx]["xq_a_token"]}; u={COOKIE_POOL[endpoint_idx]["u"]}'
+                    # 凭据池已把当前凭据隔离，换一组最健康的
+                    pool.rotate_credential(session)
                     continue
                     
                 else:
@@ -139,9 +130,7 @@ def normalize_posts(posts: List[Dict], symbol: str) -> List[Dict[str, Any]]:
 
     for post in posts:
         # 提取纯文本（去除HTML标签）
-        html_text = post.get('text', '')
-        plain_text = re.sub(r'<[^>]+>', '', html_text)
-        plain_text = plain_text.replace('<br/>', '\n').strip()
+        plain_text = text_clean.clean(post.get('text', ''))
 
         # 提取用户信息
         user = post.get('user', {})
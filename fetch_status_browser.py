@@ -5,117 +5,94 @@
 """
 
 import json
-import subprocess
-import time
 import re
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
+import cassette
 import config
+import text_clean
+import watermark
+from browser_pool import get_browser_pool
+from snapshot_parser import parse_snapshot_data
 
 
 def fetch_with_browser(symbol: str, max_id: Optional[int] = None, count: int = 20) -> Dict:
     """
     使用 browser 工具抓取数据
+    
+    Returns:
+        接口原始数据；快照失败 / 无法解析时带 failed 标记（与"没有更多数据"区分）
     """
-    url = f'https://xueqiu.com/query/v1/symbol/search/status?symbol={symbol}&count={count}&comment=0'
+    url = f'{config.BASE_URL}/query/v1/symbol/search/status?symbol={symbol}&count={count}&comment=0'
     if max_id:
         url += f'&max_id={max_id}'
     
     try:
-        # 打开页面
-        result = subprocess.run(
-            ['openclaw', 'browser', 'open', url],
-            capture_output=True, text=True, timeout=30
-        )
-        
-        if result.returncode != 0:
-            print(f"   ⚠️ browser open 失败: {result.stderr}")
-            return {'list': []}
-        
-        # 解析 targetId (格式: "id: xxx")
-        import re
-        match = re.search(r'id:\s*([A-F0-9]+)', result.stdout)
-        if not match:
-            print(f"   ⚠️ 无法获取 targetId")
-            return {'list': []}
-        
-        target_id = match.group(1)
-        
-        # 等待页面加载
-        time.sleep(2)
-        
-        # 获取页面内容
-        result = subprocess.run(
-            ['openclaw', 'browser', 'snapshot', '--target-id', target_id],
-            capture_output=True, text=True, timeout=30
-        )
-        
-        if result.returncode != 0:
-            print(f"   ⚠️ snapshot 失败: {result.stderr}")
-            return {'list': []}
-        
-        # 关闭页面
-        subprocess.run(
-            ['openclaw', 'browser', 'close', '--target-id', target_id],
-            capture_output=True, timeout=10
-        )
-        
-        # 解析JSON数据（从页面内容中提取）
-        output = result.stdout
-        
-        # 尝试从文本区域提取JSON
+        # 借常驻标签页打开并抓取快照
+        output = get_browser_pool().snapshot(url)
+        if not output:
+            print(f"   ⚠️ 浏览器快照失败")
+            return {'list': [], 'failed': True}
+        
+        # 单遍解析 snapshot（generic 文本节点 / 直接输出的 JSON）
+        data = parse_snapshot_data(output)
+        if data.get('list') or 'statuses' in data:
+            return data
+        
+        # 兜底：页面以 textarea 展示 JSON
         textarea_match = re.search(r'<textarea[^>]*>(.*?)</textarea>', output, re.DOTALL)
         if textarea_match:
-            content = textarea_match.group(1)
             try:
-                data = json.loads(content)
-                return data
-            except:
+                return json.loads(textarea_match.group(1))
+            except ValueError:
                 pass
         
-        # 尝试直接解析整个输出
-        try:
-            # 找到JSON开始的位置
-            json_start = output.find('{')
-            if json_start >= 0:
-                # 尝试解析
-                data = json.loads(output[json_start:])
-                if 'list' in data or 'statuses' in data:
-                    return data
-        except:
-            pass
-        
-        # 最后尝试：查找页面中的JSON数据
-        generic_match = re.search(r'generic \[ref=[^\]]+\]: "({.*?})"', output, re.DOTALL)
-        if generic_match:
-            try:
-                # 需要处理转义
-                json_str = generic_match.group(1).replace('\\"', '"').replace('\\n', '\n')
-                data = json.loads(json_str)
-                return data
-            except:
-                pass
+        if 'list' in data:
+            return data
         
         print(f"   ⚠️ 无法解析响应数据")
-        return {'list': []}
+        return {'list': [], 'failed': True}
         
     except Exception as e:
         print(f"   ❌ 异常: {e}")
-        return {'list': []}
+        return {'list': [], 'failed': True}
 
 
-def fetch_discussions_24h(symbol: str, max_pages: int = 5) -> List[Dict[str, Any]]:
+def fetch_discussions_24h(symbol: str, max_pages: int = 5, incremental: bool = False) -> List[Dict[str, Any]]:
     """
     抓取24小时内的讨论（自动翻页）
+    
+    Args:
+        incremental: 增量模式，只抓上次水位线之后的新帖（见 watermark.py）
     """
     print(f"\n📡 抓取 {symbol} 的24小时讨论...")
     
-    now = datetime.now().timestamp() * 1000
+    def walk(start_max_id, mark):
+        return walk_pages(symbol, max_pages, start_max_id, mark)
+    
+    if incremental:
+        return watermark.incremental_fetch(symbol, walk)
+    
+    posts, _, _ = walk(None, None)
+    return posts
+
+
+def walk_pages(symbol: str, max_pages: int, start_max_id: Optional[int] = None,
+               mark: Optional[Dict] = None) -> Tuple[List[Dict[str, Any]], str, Optional[int]]:
+    """
+    从 start_max_id 开始翻页，碰到24小时截止或水位线 mark 停止
+    
+    Returns:
+        (标准化帖子列表, 结束原因 watermark.END_*, 下一页游标)
+    """
+    now = cassette.now() * 1000  # 回放时为录制时刻
     one_day_ms = 24 * 60 * 60 * 1000
     
     all_posts = []
-    max_id = None
+    max_id = start_max_id
     page = 1
+    reason = watermark.END_BUDGET
     
     while page <= max_pages:
         print(f"   📄 第 {page} 页...")
@@ -123,14 +100,22 @@ def fetch_discussions_24h(symbol: str, max_pages: int = 5) -> List[Dict[str, Any
         data = fetch_with_browser(symbol, max_id)
         posts = data.get('list', [])
         
+        if data.get('failed'):
+            # 快照失败不是"没有更多数据"，记为没翻完，增量模式下留断档
+            print(f"   ❌ 抓取失败，停止翻页")
+            reason = watermark.END_FAILED
+            break
+        
         if not posts:
             print(f"   ✓ 无更多数据")
+            reason = watermark.END_EMPTY
             break
         
         # 处理本页数据
+        newer, reached = watermark.split_at_mark(posts, mark)
         stop_fetching = False
         valid_count = 0
-        for post in posts:
+        for post in newer:
             ts = post.get('created_at', 0)
             
             # 检查是否超过24小时
@@ -144,25 +129,26 @@ def fetch_discussions_24h(symbol: str, max_pages: int = 5) -> List[Dict[str, Any
         
         print(f"      本页有效: {valid_count}/{len(posts)} 条")
         
-        if stop_fetching or valid_count < len(posts):
+        if reached:
+            print(f"   🔖 到达上次水位线")
+            reason = watermark.END_MARK
+            break
+        
+        if stop_fetching or valid_count < len(newer):
+            reason = watermark.END_CUTOFF
             break
         
         # 下一页
         max_id = posts[-1].get('id')
         page += 1
-        
-        # 限速
-        time.sleep(1.5)
     
     print(f"   ✅ 共 {len(all_posts)} 条")
-    return all_posts
+    return all_posts, reason, max_id
 
 
 def normalize_post(post: Dict, symbol: str) -> Dict[str, Any]:
     """标准化单条讨论"""
-    html_text = post.get('text', '')
-    plain_text = re.sub(r'<[^>]+>', '', html_text)
-    plain_text = plain_text.replace('&nbsp;', ' ').replace('&quot;', '"').strip()
+    plain_text = text_clean.clean(post.get('text', ''))
     
     user = post.get('user', {})
     
@@ -218,16 +204,11 @@ def emotion_analysis(text: str) -> str:
     return "中性"
 
 
-def batch_fetch(symbols: List[str]) -> Dict[str, List[Dict]]:
-    """批量抓取多只股票"""
-    results = {}
-    
-    for symbol in symbols:
-        posts = fetch_discussions_24h(symbol)
-        results[symbol] = posts
-        time.sleep(1)  # 股票间限速
-    
-    return results
+def batch_fetch(symbols: List[str], incremental: bool = False) -> Dict[str, List[Dict]]:
+    """批量抓取多只股票（每个常驻标签页负责一只，并行抓取）"""
+    with ThreadPoolExecutor(max_workers=get_browser_pool().size) as executor:
+        results = executor.map(lambda s: fetch_discussions_24h(s, incremental=incremental), symbols)
+        return dict(zip(symbols, results))
 
 
 if __name__ == "__main__":
@@ -238,13 +219,14 @@ if __name__ == "__main__":
         print("示例: python fetch_status_browser.py SH600118")
         sys.exit(1)
     
-    symbols = sys.argv[1:]
+    incremental = '--incremental' in sys.argv
+    symbols = [s for s in sys.argv[1:] if not s.startswith('--')]
     
     print("="*60)
     print("🐧 雪球24小时舆情抓取 (浏览器版)")
     print("="*60)
     
-    all_data = batch_fetch(symbols)
+    all_data = batch_fetch(symbols, incremental=incremental)
     
     # 保存
     output = {
@@ -5,50 +5,31 @@
 """
 
 import requests
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
 import json
 import time
-import re
 from datetime import datetime
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Callable, Iterator, Optional, Tuple
+import cassette
+import checkpoint
 import config
+import text_clean
+import raw_archive
+from session_pool import get_pool
+import watermark
 
-# 创建带Cookie保持的session
-def create_session():
-    """创建带重试和Cookie支持的session"""
-    session = requests.Session()
-    
-    # 重试策略
-    retries = Retry(
-        total=3,
-        backoff_factor=1,
-        status_forcelist=[429, 500, 502, 503, 504]
-    )
-    adapter = HTTPAdapter(max_retries=retries)
-    session.mount('http://', adapter)
-    session.mount('https://', adapter)
-    
-    # 基础headers
-    session.headers.update({
-        'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-        'Accept': 'application/json, text/plain, */*',
-        'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
-        'Accept-Encoding': 'gzip, deflate, br',
-        'Connection': 'keep-alive',
-        'Referer': 'https://xueqiu.com/',
-    })
-    
-    return session
+# 讨论列表接口
+STATUS_URL = f'{config.BASE_URL}/query/v1/symbol/search/status'
+ONE_DAY_MS = 24 * 60 * 60 * 1000  # 24小时毫秒
 
 
 def init_cookie(session: requests.Session) -> bool:
     """
     访问雪球首页获取Cookie（关键步骤！绕过404反爬）
+    注：抓取流程已改用 session_pool 的缓存Cookie，这里保留给单独调试用
     """
     try:
         print("   🍪 访问首页获取Cookie...")
-        resp = session.get('https://xueqiu.com/', timeout=10)
+        resp = session.get(f'{config.BASE_URL}/', timeout=10)
         
         # 检查是否设置了Cookie
         cookies = session.cookies.get_dict()
@@ -63,14 +44,21 @@ def init_cookie(session: requests.Session) -> bool:
         return False
 
 
+def build_page_url(symbol: str, max_id: Optional[int] = None, count: int = 20) -> str:
+    """拼接单页讨论的URL"""
+    url = f'{STATUS_URL}?symbol={symbol}&count={count}&comment=0'
+    if max_id:
+        url += f'&max_id={max_id}'
+    return url
+
+
 def fetch_page(session: requests.Session, symbol: str, max_id: Optional[int] = None, count: int = 20) -> Dict:
     """
     抓取单页讨论
     雪球翻页用 max_id（时间游标），不是 page=1,2,3
+    请求失败（异常 / 非200 / 无法解析）带 failed 标记，和"没有更多数据"区分开
     """
-    url = f'https://xueqiu.com/query/v1/symbol/search/status?symbol={symbol}&count={count}&comment=0'
-    if max_id:
-        url += f'&max_id={max_id}'
+    url = build_page_url(symbol, max_id, count)
     
     try:
         resp = session.get(url, timeout=15)
@@ -78,101 +66,197 @@ def fetch_page(session: requests.Session, symbol: str, max_id: Optional[int] = N
         if resp.status_code == 200:
             try:
                 data = resp.json()
+                raw_archive.capture(resp, symbol, 'status')
                 return data
             except json.JSONDecodeError:
                 # 返回了HTML，可能是WAF
                 if '<html' in resp.text[:100]:
                     print(f"   ⚠️ 被WAF拦截，返回了HTML")
+                    raw_archive.capture(resp, symbol, 'waf')
                     return {'list': [], 'waf': True}
-                return {'list': []}
+                return {'list': [], 'failed': True}
+        elif resp.status_code == 429:
+            print(f"   ⚠️ 429 请求过于频繁")
+            return {'list': [], 'throttled': True}
         elif resp.status_code == 404:
             print(f"   ⚠️ 404 接口不存在")
-            return {'list': []}
+            return {'list': [], 'failed': True}
         else:
             print(f"   ⚠️ HTTP {resp.status_code}")
-            return {'list': []}
+            return {'list': [], 'failed': True}
     except Exception as e:
         print(f"   ❌ 请求异常: {e}")
-        return {'list': []}
+        return {'list': [], 'failed': True}
 
 
-def fetch_discussions_24h(symbol: str, max_pages: int = 10) -> List[Dict[str, Any]]:
+def fetch_discussions_24h(symbol: str, max_pages: int = 10, incremental: bool = False,
+                          on_page: Optional[Callable[[str, List[Dict]], None]] = None,
+                          deadline: Optional[float] = None) -> List[Dict[str, Any]]:
     """
     抓取24小时内的讨论（自动翻页）
     
     Args:
         symbol: 股票代码如 SH600118
         max_pages: 最大翻页数（防无限循环）
+        incremental: 增量模式，只抓上次水位线之后的新帖（见 watermark.py）
+        on_page: 每抓到一页就回调 on_page(symbol, 原始帖子)；设置后非增量模式不再攒结果
+        deadline: 时限（time.time() 时间戳），到点停止翻页，增量模式下没翻完的记为断档
     
     Returns:
         标准化后的讨论列表
     """
     print(f"\n📡 抓取 {symbol} 的24小时讨论...")
     
-    # 创建session并获取cookie
-    session = create_session()
-    if not init_cookie(session):
-        return []
+    # 从共享池借session（Cookie已缓存，无需每只股票访问首页）
+    pool = get_pool()
+    with pool.session() as session:
+        def walk(start_max_id, mark, keep=True):
+            return walk_pages(pool, session, symbol, max_pages, start_max_id, mark, on_page, keep, deadline)
+        
+        if incremental:
+            return watermark.incremental_fetch(symbol, walk)
+        
+        posts, _, _ = walk(None, None, keep=on_page is None)
+        return posts
+
+
+class PageWalk:
+    """
+    一次按 max_id 翻页的状态，同步 / 异步翻页共用
     
-    # 手动设置已知的Cookie
-    session.cookies.set('xq_a_token', config.COOKIES.get('xq_a_token', ''))
-    session.cookies.set('u', config.COOKIES.get('u', ''))
+    每拿到一页响应调用 feed()，得到本页要产出的原始帖子（已去掉水位线之后和24小时以前的）；
+    finished 为真时停止，reason 为结束原因 watermark.END_*，max_id 为下一页游标；
+    过了 deadline（time.time() 时间戳）后 finished 也为真，结束原因 END_TIMEOUT
+    """
     
-    now = datetime.now().timestamp() * 1000  # 毫秒时间戳
-    one_day_ms = 24 * 60 * 60 * 1000  # 24小时毫秒
+    def __init__(self, symbol: str, max_pages: int, start_max_id: Optional[int] = None,
+                 mark: Optional[Dict] = None, verbose: bool = True, deadline: Optional[float] = None):
+        self.symbol = symbol
+        self.max_pages = max_pages
+        self.start_max_id = start_max_id
+        self.max_id = start_max_id
+        self.mark = mark
+        self.verbose = verbose
+        self.now = cassette.now() * 1000  # 毫秒时间戳（回放时为录制时刻）
+        self.page = 1
+        self.retries = 0
+        self.count = 0
+        self.renew = False  # 调用方需要先刷新Cookie再重试
+        self.deadline = deadline
+        self._finished = max_pages < 1
+        self.reason = watermark.END_BUDGET
     
-    all_posts = []
-    max_id = None
-    page = 1
+    @property
+    def finished(self) -> bool:
+        # 翻下一页之前检查时限：到点就停，不再发请求（已抓的页照常产出）
+        if not self._finished and self.deadline and time.time() >= self.deadline:
+            self._finish(watermark.END_TIMEOUT, f"   ⏱️ {self.symbol} 到达抓取时限，停止翻页")
+        return self._finished
     
-    while page <= max_pages:
-        print(f"   📄 第 {page} 页 (max_id={max_id})...")
-        
-        data = fetch_page(session, symbol, max_id)
+    @finished.setter
+    def finished(self, value: bool):
+        self._finished = value
+    
+    def _finish(self, reason: str, message: str = ''):
+        self._finished = True
+        self.reason = reason
+        if message and self.verbose:
+            print(message)
+    
+    def feed(self, data: Dict) -> List[Dict]:
+        self.renew = False
         
-        # 检查WAF拦截
-        if data.get('waf'):
-            print(f"   🚫 被WAF拦截，停止抓取")
-            break
+        # 被限流 / WAF拦截：AIMD 控制器已降速，WAF 先刷新Cookie，重试几次仍不行才放弃
+        # 请求失败同样重试；放弃时记 END_FAILED，不能当成"没有更多数据"（否则水位线会越过没抓到的帖子）
+        blocked = data.get('waf') or data.get('throttled')
+        if blocked or data.get('failed'):
+            if self.retries >= config.AIMD_MAX_RETRIES:
+                if blocked:
+                    self._finish(watermark.END_BLOCKED, f"   🚫 {self.symbol} 多次被限流/拦截，停止抓取")
+                else:
+                    self._finish(watermark.END_FAILED, f"   ❌ {self.symbol} 多次请求失败，停止抓取")
+                return []
+            self.retries += 1
+            self.renew = bool(data.get('waf')) and self.retries == 1
+            return []
+        self.retries = 0
         
         posts = data.get('list', [])
         if not posts:
-            print(f"   ✓ 无更多数据")
-            break
+            self._finish(watermark.END_EMPTY, "   ✓ 无更多数据")
+            return []
         
-        # 处理本页数据
-        stop_fetching = False
-        for post in posts:
-            ts = post.get('created_at', 0)
-            
-            # 检查是否超过24小时
-            if now - ts > one_day_ms:
-                print(f"   ⏰ 超过24小时，停止翻页")
-                stop_fetching = True
+        newer, reached = watermark.split_at_mark(posts, self.mark)
+        fresh = []
+        for post in newer:
+            if self.now - post.get('created_at', 0) > ONE_DAY_MS:
+                self._finish(watermark.END_CUTOFF, "   ⏰ 超过24小时，停止翻页")
                 break
-            
-            all_posts.append(normalize_post(post, symbol))
-        
-        if stop_fetching:
-            break
-        
-        # 下一页的max_id（最后一条的id）
-        max_id = posts[-1].get('id')
-        page += 1
+            fresh.append(post)
+        self.count += len(fresh)
         
-        # 限速：1.2秒（防反爬）
-        time.sleep(1.2)
+        if not self._finished and reached:
+            self._finish(watermark.END_MARK, "   🔖 到达上次水位线，停止翻页")
+        if not self._finished:
+            # 下一页的max_id（最后一条的id）
+            self.max_id = posts[-1].get('id')
+            self.page += 1
+            if self.page > self.max_pages:
+                self._finish(watermark.END_BUDGET)
+        return fresh
+
+
+def iter_pages(pool, session: requests.Session, walk: PageWalk,
+               saved: Optional[checkpoint.CrawlCheckpoint] = None) -> Iterator[List[Dict]]:
+    """逐页 yield 原始帖子，页与页之间不攒数据（传入检查点时先重放已抓的页，每页落检查点）"""
+    if saved:
+        yield from saved.resume(walk)
+    while not walk.finished:
+        print(f"   📄 第 {walk.page} 页 (max_id={walk.max_id})...")
+        posts = walk.feed(fetch_page(session, walk.symbol, walk.max_id))
+        if saved:
+            saved.record(walk, posts)
+        if walk.renew:
+            pool.renew(session)
+        if posts:
+            yield posts
+
+
+def walk_pages(pool, session: requests.Session, symbol: str, max_pages: int,
+               start_max_id: Optional[int] = None,
+               mark: Optional[Dict] = None,
+               on_page: Optional[Callable[[str, List[Dict]], None]] = None,
+               keep: bool = True,
+               deadline: Optional[float] = None) -> Tuple[List[Dict[str, Any]], str, Optional[int]]:
+    """
+    从 start_max_id 开始按 max_id 顺序翻页抓取
     
-    print(f"   ✅ 共抓取 {len(all_posts)} 条 (来自 {page} 页)")
-    return all_posts
+    Args:
+        mark: 水位线 {'id', 'created_at'}，碰到即停止
+        on_page: 每页回调 on_page(symbol, 原始帖子)
+        keep: 是否攒下标准化后的帖子作为返回值
+        deadline: 时限（time.time() 时间戳），到点停止翻页
+    
+    Returns:
+        (标准化帖子列表, 结束原因 watermark.END_*, 下一页游标)
+    """
+    walk = PageWalk(symbol, max_pages, start_max_id, mark, deadline=deadline)
+    all_posts = []
+    
+    for posts in iter_pages(pool, session, walk, checkpoint.get_checkpoint()):
+        if on_page:
+            on_page(symbol, posts)
+        if keep:
+            all_posts.extend(normalize_post(post, symbol) for post in posts)
+    
+    print(f"   ✅ 共抓取 {walk.count} 条 (来自 {walk.page} 页)")
+    return all_posts, walk.reason, walk.max_id
 
 
 def normalize_post(post: Dict, symbol: str) -> Dict[str, Any]:
     """标准化单条讨论"""
     # 提取纯文本
-    html_text = post.get('text', '')
-    plain_text = re.sub(r'<[^>]+>', '', html_text)
-    plain_text = plain_text.replace('&nbsp;', ' ').strip()
+    plain_text = text_clean.clean(post.get('text', ''))
     
     # 用户信息
     user = post.get('user', {})
@@ -229,7 +313,7 @@ def emotion_analysis(text: str) -> str:
     return "中性"
 
 
-def batch_fetch(symbols: List[str]) -> Dict[str, List[Dict]]:
+def batch_fetch(symbols: List[str], incremental: bool = False) -> Dict[str, List[Dict]]:
     """
     批量抓取多只股票
     
@@ -237,14 +321,14 @@ def batch_fetch(symbols: List[str]) -> Dict[str, List[Dict]]:
         {symbol: [posts...]}
     """
     results = {}
+    checkpoint.begin()
     
     for symbol in symbols:
-        posts = fetch_discussions_24h(symbol)
+        posts = fetch_discussions_24h(symbol, incremental=incremental)
         results[symbol] = posts
-        
-        # 股票间也限速
-        time.sleep(0.5)
     
+    # 中途挂掉的话，重跑时从检查点接着翻；全部抓完才清掉
+    checkpoint.complete()
     return results
 
 
@@ -255,15 +339,17 @@ if __name__ == "__main__":
         print("用法: python fetch_status_v2.py <股票代码>")
         print("示例: python fetch_status_v2.py SH600118")
         print("\n批量抓取: python fetch_status_v2.py SH600118 SZ002155")
+        print("增量抓取: python fetch_status_v2.py --incremental SH600118")
         sys.exit(1)
     
-    symbols = sys.argv[1:]
+    incremental = '--incremental' in sys.argv
+    symbols = [s for s in sys.argv[1:] if not s.startswith('--')]
     
     print("="*60)
     print("🐧 雪球24小时舆情抓取")
     print("="*60)
     
-    all_data = batch_fetch(symbols)
+    all_data = batch_fetch(symbols, incremental=incremental)
     
     # 保存结果
     output = {
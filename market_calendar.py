@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+A股交易日历 + 按时段调整抓取 / 分析节奏
+策略：
+1. 时段（北京时间）：盘前 9:15-9:30、上午 9:30-11:30、午休、下午 13:00-15:00、
+   盘后 15:00-22:00、夜间，以及周末 / 节假日休市
+2. 节假日来自本地表 HOLIDAYS（按交易所公告每年维护），也可用 XUEQIU_HOLIDAY_FILE 追加
+3. 每个时段一套参数 config.MARKET_PHASE_PROFILES：抓取间隔、翻页深度、LLM 分析条数
+   盘中勤抓、深翻、多分析；夜间和休市少抓、几乎不花 LLM
+4. 时钟可替换：SimulatedClock 可以快进，测试不用等真实时间
+
+使用:
+    python market_calendar.py                   # 当前时段和参数
+    python market_calendar.py --due             # cron 用：按时段间隔判断这次该不该跑（退出码 0=该跑）
+    python market_calendar.py --field pages     # 当前时段的某个参数
+    python market_calendar.py --simulate 2026-10-16T08:00 --hours 30
+"""
+
+import json
+import os
+import time
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Optional, Set
+
+import config
+
+CST = timezone(timedelta(hours=8))  # 北京时间，无夏令时
+
+# 时段
+PRE_OPEN = "pre_open"
+MORNING = "morning"
+LUNCH = "lunch"
+AFTERNOON = "afternoon"
+AFTER_HOURS = "after_hours"
+OVERNIGHT = "overnight"
+CLOSED = "closed"  # 周末 / 节假日
+
+PHASE_NAMES = {
+    PRE_OPEN: "盘前",
+    MORNING: "上午盘",
+    LUNCH: "午休",
+    AFTERNOON: "下午盘",
+    AFTER_HOURS: "盘后",
+    OVERNIGHT: "夜间",
+    CLOSED: "休市",
+}
+
+# 交易所休市日（不含周末），按上交所 / 深交所年度休市安排维护
+HOLIDAYS = {
+    # 2026
+    "2026-01-01", "2026-01-02",
+    "2026-02-16", "2026-02-17", "2026-02-18", "2026-02-19", "2026-02-20", "2026-02-23",
+    "2026-04-06",
+    "2026-05-01", "2026-05-04", "2026-05-05",
+    "2026-06-19",
+    "2026-09-25",
+    "2026-10-01", "2026-10-02", "2026-10-05", "2026-10-06", "2026-10-07",
+}
+
+# 时段边界（时, 分），按顺序判断
+_SCHEDULE = [
+    ((9, 15), PRE_OPEN),
+    ((9, 30), MORNING),
+    ((11, 30), LUNCH),
+    ((13, 0), AFTERNOON),
+    ((15, 0), AFTER_HOURS),
+    ((22, 0), OVERNIGHT),
+]
+
+
+class Clock:
+    """真实时钟"""
+
+    def now(self) -> datetime:
+        return datetime.now(CST)
+
+    def sleep(self, seconds: float):
+        time.sleep(seconds)
+
+
+class SimulatedClock(Clock):
+    """模拟时钟：sleep 只是把时间往前拨"""
+
+    def __init__(self, start: datetime):
+        self.current = start if start.tzinfo else start.replace(tzinfo=CST)
+
+    def now(self) -> datetime:
+        return self.current
+
+    def sleep(self, seconds: float):
+        self.current += timedelta(seconds=seconds)
+
+    def advance(self, **kwargs):
+        self.current += timedelta(**kwargs)
+
+
+def load_holidays(filename: str = config.HOLIDAY_FILE) -> Set[str]:
+    """内置休市表 + 可选的 JSON 文件（["2027-01-01", ...]）"""
+    holidays = set(HOLIDAYS)
+    if filename and os.path.exists(filename):
+        try:
+            with open(filename, 'r', encoding='utf-8') as f:
+                holidays.update(json.load(f))
+        except (OSError, ValueError) as e:
+            print(f"   ⚠️ 休市表读取失败: {e}")
+    return holidays
+
+
+class MarketCalendar:
+    """交易日判断 + 当前时段 + 时段参数"""
+
+    def __init__(self, clock: Optional[Clock] = None, holidays: Optional[Set[str]] = None,
+                 profiles: Optional[Dict[str, Dict]] = None):
+        self.clock = clock or Clock()
+        self.holidays = holidays if holidays is not None else load_holidays()
+        self.profiles = profiles or config.MARKET_PHASE_PROFILES
+
+    def now(self) -> datetime:
+        return self.clock.now().astimezone(CST)
+
+    def is_trading_day(self, day: date) -> bool:
+        return day.weekday() < 5 and day.isoformat() not in self.holidays
+
+    def phase(self, moment: Optional[datetime] = None) -> str:
+        moment = (moment or self.now()).astimezone(CST)
+        if not self.is_trading_day(moment.date()):
+            return CLOSED
+
+        current = OVERNIGHT  # 0:00 - 9:15
+        for (hour, minute), phase in _SCHEDULE:
+            if (moment.hour, moment.minute) >= (hour, minute):
+                current = phase
+        return current
+
+    def profile(self, moment: Optional[datetime] = None) -> Dict:
+        """当前时段的参数：interval（秒）、pages、llm_budget"""
+        return dict(self.profiles[self.phase(moment)])
+
+    def next_trading_day(self, day: date) -> date:
+        day += timedelta(days=1)
+        while not self.is_trading_day(day):
+            day += timedelta(days=1)
+        return day
+
+    def next_open(self, moment: Optional[datetime] = None) -> datetime:
+        """下一次开盘（9:30）时间"""
+        moment = (moment or self.now()).astimezone(CST)
+        today_open = moment.replace(hour=9, minute=30, second=0, microsecond=0)
+        if self.is_trading_day(moment.date()) and moment < today_open:
+            return today_open
+        return datetime.combine(self.next_trading_day(moment.date()), today_open.timetz())
+
+    def next_phase_change(self, moment: Optional[datetime] = None) -> datetime:
+        """当前时段结束的时间（用于不跨时段地 sleep）"""
+        moment = (moment or self.now()).astimezone(CST)
+        start = self.phase(moment)
+        step = moment.replace(second=0, microsecond=0)
+        # 按分钟往后找，最多找到下一个开盘
+        limit = self.next_open(moment)
+        while step < limit:
+            step += timedelta(minutes=1)
+            if self.phase(step) != start:
+                return step
+        return limit
+
+    def wait_seconds(self, last_run: float, moment: Optional[datetime] = None) -> float:
+        """距上次运行 last_run（时间戳）还要等几秒才该跑下一轮（不会跨过时段切换）"""
+        moment = (moment or self.now()).astimezone(CST)
+        due_at = last_run + self.profile(moment)['interval']
+        change_at = self.next_phase_change(moment).timestamp()
+        return max(min(due_at, change_at) - moment.timestamp(), 0.0)
+
+
+def check_due(calendar: MarketCalendar, state_file: str = config.MARKET_STATE_FILE) -> bool:
+    """cron 每几分钟调一次：按当前时段的间隔判断是否该跑，该跑就记下这次时间"""
+    last_run = 0.0
+    if os.path.exists(state_file):
+        try:
+            with open(state_file, 'r', encoding='utf-8') as f:
+                last_run = json.load(f).get('last_run', 0.0)
+        except (OSError, ValueError):
+            pass
+
+    now = calendar.now().timestamp()
+    if now - last_run < calendar.profile()['interval']:
+        return False
+
+    with open(state_file, 'w', encoding='utf-8') as f:
+        json.dump({'last_run': now, 'phase': calendar.phase()}, f)
+    return True
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description="A股交易时段")
+    parser.add_argument("--due", action="store_true", help="按时段间隔判断本次是否该运行（退出码 0=该跑）")
+    parser.add_argument("--field", metavar="NAME", help="输出当前时段的某个参数（interval / pages / llm_budget）")
+    parser.add_argument("--simulate", metavar="ISO_TIME", help="从指定时间开始模拟")
+    parser.add_argument("--hours", type=float, default=24, help="模拟时长（小时）")
+    args = parser.parse_args()
+
+    if args.due:
+        sys.exit(0 if check_due(MarketCalendar()) else 1)
+    if args.field:
+        print(MarketCalendar().profile()[args.field])
+        sys.exit(0)
+
+    if args.simulate:
+        clock = SimulatedClock(datetime.fromisoformat(args.simulate))
+        calendar = MarketCalendar(clock)
+        end = clock.now() + timedelta(hours=args.hours)
+        runs: Dict[str, int] = {}
+        pages = llm = 0
+        print(f"🕐 模拟 {clock.now():%m-%d %H:%M} 起 {args.hours} 小时:")
+        while clock.now() < end:
+            phase = calendar.phase()
+            profile = calendar.profile()
+            runs[phase] = runs.get(phase, 0) + 1
+            pages += profile['pages']
+            llm += profile['llm_budget']
+            clock.sleep(calendar.wait_seconds(clock.now().timestamp()))
+        for phase, count in runs.items():
+            print(f"   {PHASE_NAMES[phase]}: {count} 轮")
+        print(f"   合计 {sum(runs.values())} 轮, 每股 {pages} 页, LLM {llm} 条")
+    else:
+        calendar = MarketCalendar()
+        now = calendar.now()
+        phase = calendar.phase()
+        print(f"🕐 {now:%Y-%m-%d %H:%M} {PHASE_NAMES[phase]} | 参数 {calendar.profile()}")
+        print(f"   下次开盘: {calendar.next_open():%Y-%m-%d %H:%M}")
+        print(f"   本时段结束: {calendar.next_phase_change():%Y-%m-%d %H:%M}")
@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+"""
+本地模拟雪球 / 腾讯行情服务器（抓取层压测用）
+模拟接口：
+1. /query/v1/symbol/search/status   讨论列表，max_id 翻页
+2. /v5/statuses/search.json         讨论列表（stock.xueqiu.com）
+3. /statuses/livenews/list.json     快讯
+4. /q=sh600118,sz002155             qt.gtimg.cn 风格行情（GBK）
+5. /                                首页，下发 xq_a_token / device_id Cookie
+
+可配置：响应延迟、429 / WAF HTML 注入比例、单客户端限速、每只股票的发帖量
+帖子按时间槽确定性生成（id 随时间递增），同一时刻多次请求结果一致，时间推移会出现新帖
+
+使用:
+    python mock_server.py --port 8800 --latency 50 --rate-429 0.02 --rate-waf 0.01
+    XUEQIU_BASE_URL=http://127.0.0.1:8800 XUEQIU_STOCK_BASE_URL=http://127.0.0.1:8800 \\
+        XUEQIU_QUOTE_BASE_URL=http://127.0.0.1:8800 python crawler.py
+    python mock_server.py --bench 2000  # 起服务并用并发抓取引擎压测2000只股票
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+import zlib
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Dict, Optional
+from urllib.parse import urlparse, parse_qs
+
+WAF_HTML = '<html><head><title>405</title></head><body><div id="aliyun_waf">访问被拦截</div></body></html>'
+
+POST_TEMPLATES = [
+    "{name}今天放量突破，看好后市继续涨",
+    "{name}破位了，先卖出观望",
+    "{name}业绩预告超预期，利好兑现",
+    "{name}被套了，割肉还是继续拿？",
+    "{name}主力资金流入，低吸一点",
+    "{name}又是缩量阴跌，汪汪队打压",
+    "讨论一下{name}的估值，现在贵不贵",
+    "{name}涨停！新高在望",
+]
+
+LIVENEWS_TEMPLATES = [
+    "【快讯】央行开展逆回购操作，市场流动性合理充裕",
+    "【快讯】商业航天板块午后拉升，多股涨停",
+    "【快讯】黄金价格创历史新高",
+    "【快讯】北向资金净流入超50亿元",
+]
+
+
+class MockSettings:
+    """服务器行为参数"""
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0,
+                 rate_429: float = 0.0, rate_waf: float = 0.0,
+                 client_rps: float = 0.0, posts_per_hour: int = 60,
+                 seed: Optional[int] = None):
+        self.latency = latency  # 秒
+        self.jitter = jitter  # 秒
+        self.rate_429 = rate_429
+        self.rate_waf = rate_waf
+        self.client_rps = client_rps  # 单客户端每秒请求上限，超过返回429（<=0 不限）
+        self.posts_per_hour = max(posts_per_hour, 1)
+        self.random = random.Random(seed)
+
+
+def symbol_seed(symbol: str) -> int:
+    return zlib.crc32(symbol.encode('utf-8')) % 1000
+
+
+def make_posts(symbol: str, count: int, max_id: Optional[int], posts_per_hour: int) -> List[Dict]:
+    """
+    按时间槽生成倒序帖子（id = 槽号 * 1000 + 股票种子）
+
+    max_id 为翻页游标，只返回 id 更小的帖子
+    """
+    interval_ms = 3600 * 1000 // posts_per_hour
+    seed = symbol_seed(symbol)
+    slot = int(time.time() * 1000) // interval_ms
+    if max_id:
+        slot = min(slot, (max_id - seed) // 1000 - (1 if (max_id - seed) % 1000 == 0 else 0))
+
+    name = f"股票{symbol[-4:]}"
+    posts = []
+    for s in range(slot, slot - count, -1):
+        post_id = s * 1000 + seed
+        posts.append({
+            "id": post_id,
+            "created_at": s * interval_ms,
+            "text": f"<p>{POST_TEMPLATES[s % len(POST_TEMPLATES)].format(name=name)} ${name}({symbol})$</p>",
+            "user": {"id": s % 99991, "screen_name": f"用户{s % 997}", "followers_count": s % 5000},
+            "like_count": s % 13,
+            "reply_count": s % 7,
+            "retweet_count": s % 3,
+            "view_count": s % 3000,
+            "source": "雪球",
+        })
+    return posts
+
+
+def make_quote(code: str) -> str:
+    """qt.gtimg.cn 格式: v_sh600118="1~名称~代码~现价~昨收~...~涨跌~涨跌幅~..."; """
+    seed = zlib.crc32(code.encode('utf-8'))
+    prev_close = 5 + seed % 5000 / 100
+    change_pct = ((seed // 7 + int(time.time()) // 60) % 2001 - 1000) / 100  # -10% ~ +10%
+    price = round(prev_close * (1 + change_pct / 100), 2)
+
+    fields = ['0'] * 50
+    fields[0] = '1'
+    fields[1] = f'股票{code[-4:]}'
+    fields[2] = code[2:]
+    fields[3] = f'{price:.2f}'
+    fields[4] = f'{prev_close:.2f}'
+    volume = seed % 500000 + 1000
+    fields[5] = f'{prev_close:.2f}'
+    fields[6] = str(volume)
+    fields[30] = time.strftime('%Y%m%d%H%M%S')
+    fields[31] = f'{price - prev_close:.2f}'
+    fields[32] = f'{change_pct:.2f}'
+    fields[33] = f'{max(price, prev_close):.2f}'
+    fields[34] = f'{min(price, prev_close):.2f}'
+    fields[37] = f'{volume * price / 100:.0f}'  # 成交额（万）
+    fields[38] = f'{seed % 1000 / 100:.2f}'  # 换手率
+    return f'v_{code}="{"~".join(fields)}";'
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    settings: MockSettings = MockSettings()
+    stats: Counter = Counter()
+    lock = threading.Lock()
+    clients: Dict[str, List[float]] = {}  # 客户端 -> [令牌数, 上次时间]
+
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, body: str, content_type: str = 'application/json;charset=UTF-8',
+              encoding: str = 'utf-8', headers: Optional[Dict] = None):
+        data = body.encode(encoding)
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_json(self, payload: Dict):
+        self._send(200, json.dumps(payload, ensure_ascii=False, separators=(',', ':')))
+
+    def _over_limit(self) -> bool:
+        """单客户端令牌桶，超过限速返回429"""
+        rps = self.settings.client_rps
+        if rps <= 0:
+            return False
+        client = self.client_address[0]
+        now = time.monotonic()
+        with self.lock:
+            tokens, updated = self.clients.get(client, [rps, now])
+            tokens = min(rps, tokens + (now - updated) * rps)
+            if tokens < 1:
+                self.clients[client] = [tokens, now]
+                return True
+            self.clients[client] = [tokens - 1, now]
+            return False
+
+    def do_GET(self):
+        settings = self.settings
+        parsed = urlparse(self.path)
+        query = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+        path = parsed.path
+
+        if path == '/__stats':
+            with self.lock:
+                self._send_json(dict(self.stats))
+            return
+
+        delay = settings.latency + settings.random.uniform(0, settings.jitter)
+        if delay > 0:
+            time.sleep(delay)
+
+        with self.lock:
+            self.stats['requests'] += 1
+            roll = settings.random.random()
+
+        if path == '/':
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html;charset=UTF-8')
+            self.send_header('Set-Cookie', f'xq_a_token=mock{int(time.time())}; Path=/')
+            self.send_header('Set-Cookie', f'device_id=mock{self.client_address[1]}; Path=/')
+            body = b'<html><body>mock xueqiu</body></html>'
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            with self.lock:
+                self.stats['homepage'] += 1
+            return
+
+        if self._over_limit() or roll < settings.rate_429:
+            with self.lock:
+                self.stats['429'] += 1
+            self._send(429, '{"error_description":"请求过于频繁"}', headers={'Retry-After': '1'})
+            return
+
+        if roll < settings.rate_429 + settings.rate_waf:
+            with self.lock:
+                self.stats['waf'] += 1
+            self._send(200, WAF_HTML, 'text/html;charset=UTF-8')
+            return
+
+        if path in ('/query/v1/symbol/search/status', '/v5/statuses/search.json'):
+            symbol = query.get('symbol', 'SH600118')
+            count = int(query.get('count') or query.get('size') or 20)
+            max_id = int(query['max_id']) if query.get('max_id') else None
+            posts = make_posts(symbol, min(count, 100), max_id, settings.posts_per_hour)
+            with self.lock:
+                self.stats['status'] += 1
+            self._send_json({"about": "", "count": len(posts), "list": posts, "maxPage": 100})
+            return
+
+        if path == '/statuses/livenews/list.json':
+            count = int(query.get('count', 20))
+            now_ms = int(time.time() * 1000)
+            items = [{
+                "id": now_ms // 60000 - i,
+                "text": LIVENEWS_TEMPLATES[i % len(LIVENEWS_TEMPLATES)],
+                "created_at": now_ms - i * 60000,
+            } for i in range(count)]
+            with self.lock:
+                self.stats['livenews'] += 1
+            self._send_json({"items": items, "next_max_id": items[-1]["id"] if items else 0})
+            return
+
+        if path.startswith('/q='):
+            codes = [c for c in path[3:].split(',') if c]
+            with self.lock:
+                self.stats['quote'] += 1
+            self._send(200, '\n'.join(make_quote(c) for c in codes) + '\n', 'text/html; charset=GBK', encoding='gbk')
+            return
+
+        self._send(404, '{"error_description":"not found"}')
+
+
+def start_server(port: int = 8800, settings: Optional[MockSettings] = None) -> ThreadingHTTPServer:
+    """后台线程启动服务器（压测脚本里用）"""
+    handler = type('Handler', (MockHandler,), {
+        'settings': settings or MockSettings(),
+        'stats': Counter(),
+        'lock': threading.Lock(),
+        'clients': {},
+    })
+    server = ThreadingHTTPServer(('127.0.0.1', port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def synthetic_symbols(n: int) -> List[str]:
+    """生成 n 个合成股票代码"""
+    return [f"{'SH' if i % 2 else 'SZ'}{(600000 if i % 2 else 1) + i:06d}" for i in range(n)]
+
+
+def run_bench(server: ThreadingHTTPServer, n: int, max_pages: int, concurrency: int, rps: float):
+    """用并发抓取引擎压测 n 只股票（需在 import config 之前设置好环境变量）"""
+    import crawler
+    import rate_control
+
+    symbols = synthetic_symbols(n)
+    print(f"\n🏋️ 压测: {n} 只股票 x {max_pages} 页 | 并发 {concurrency} | 限速 {rps or '不限'}")
+    start = time.time()
+    # AIMD 上限放开到压测并发，观察它能把速率推到多高
+    controller = rate_control.get_controller()
+    controller.max_rate = max(rps, 1000.0) if rps else 1000.0
+    controller.max_concurrency = concurrency
+    results = crawler.crawl_symbols(symbols, max_pages=max_pages, concurrency=concurrency, rps=rps)
+    elapsed = time.time() - start
+
+    total = sum(len(posts) for posts in results.values())
+    stats = dict(server.RequestHandlerClass.stats)
+    print(f"\n✅ 完成: {total} 条帖子, 耗时 {elapsed:.1f}s, {stats.get('requests', 0) / elapsed:.1f} req/s")
+    print(f"   服务器统计: {stats}")
+    print(f"   AIMD: {controller.stats()}")
+
+
+if __name__ == "__main__":
+    import os
+
+    parser = argparse.ArgumentParser(description="本地模拟雪球 / 行情服务器")
+    parser.add_argument("--port", type=int, default=8800)
+    parser.add_argument("--latency", type=float, default=0, help="固定延迟（毫秒）")
+    parser.add_argument("--jitter", type=float, default=0, help="随机附加延迟上限（毫秒）")
+    parser.add_argument("--rate-429", type=float, default=0, help="随机返回429的比例")
+    parser.add_argument("--rate-waf", type=float, default=0, help="随机返回WAF HTML的比例")
+    parser.add_argument("--client-rps", type=float, default=0, help="单客户端限速，超过返回429")
+    parser.add_argument("--posts-per-hour", type=int, default=60, help="每只股票每小时发帖量")
+    parser.add_argument("--seed", type=int, default=None, help="随机种子（复现注入的错误）")
+    parser.add_argument("--bench", type=int, default=0, metavar="N", help="起服务后压测N只股票")
+    parser.add_argument("--bench-pages", type=int, default=3, help="压测时每只股票翻页数")
+    parser.add_argument("--bench-concurrency", type=int, default=32, help="压测并发股票数")
+    parser.add_argument("--bench-rps", type=float, default=0, help="压测全局限速（0为不限）")
+    args = parser.parse_args()
+
+    settings = MockSettings(
+        latency=args.latency / 1000,
+        jitter=args.jitter / 1000,
+        rate_429=args.rate_429,
+        rate_waf=args.rate_waf,
+        client_rps=args.client_rps,
+        posts_per_hour=args.posts_per_hour,
+        seed=args.seed,
+    )
+
+    base_url = f"http://127.0.0.1:{args.port}"
+    print("=" * 60)
+    print(f"🧪 模拟服务器: {base_url}")
+    print(f"   延迟 {args.latency}+{args.jitter}ms | 429 {args.rate_429:.0%} | WAF {args.rate_waf:.0%} | 发帖 {args.posts_per_hour}/h")
+    print(f"   XUEQIU_BASE_URL={base_url} XUEQIU_STOCK_BASE_URL={base_url} XUEQIU_QUOTE_BASE_URL={base_url}")
+    print("=" * 60)
+
+    server = start_server(args.port, settings)
+
+    if args.bench:
+        for name in ("XUEQIU_BASE_URL", "XUEQIU_STOCK_BASE_URL", "XUEQIU_QUOTE_BASE_URL"):
+            os.environ[name] = base_url
+        os.environ.setdefault("XUEQIU_COOKIE_CACHE", "/tmp/xueqiu_mock_cookies.json")
+        run_bench(server, args.bench, args.bench_pages, args.bench_concurrency, args.bench_rps)
+        server.shutdown()
+    else:
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            server.shutdown()
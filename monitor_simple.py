@@ -2,12 +2,13 @@
 """
 雪球舆情监控 - 简化版（直接展示结果）
 """
-import subprocess
-import json
 import time
 import re
 from datetime import datetime
 
+from browser_pool import get_browser_pool
+from snapshot_parser import parse_snapshot
+
 SYMBOLS = [
     ("SH600118", "中国卫星"),
     ("SZ002155", "湖南黄金"),
@@ -36,40 +37,11 @@ def fetch_one(symbol, name):
     url = f'https://xueqiu.com/query/v1/symbol/search/status?symbol={symbol}&count=15&comment=0'
     
     try:
-        # 打开页面
-        result = subprocess.run(
-            ['openclaw', 'browser', 'open', url],
-            capture_output=True, text=True, timeout=30
-        )
-        
-        match = re.search(r'id:\s*([A-F0-9]+)', result.stdout)
-        if not match:
-            return []
-        
-        target_id = match.group(1)
-        time.sleep(2)
-        
-        # 获取内容
-        result = subprocess.run(
-            ['openclaw', 'browser', 'snapshot', '--target-id', target_id],
-            capture_output=True, text=True, timeout=30
-        )
-        
-        # 关闭页面
-        subprocess.run(
-            ['openclaw', 'browser', 'close', '--target-id', target_id],
-            capture_output=True, timeout=10
-        )
-        
-        # 提取JSON
-        generic_match = re.search(r'generic \[ref=[^\]]+\]: "({.*?})"', result.stdout, re.DOTALL)
-        if not generic_match:
-            return []
-        
-        json_str = generic_match.group(1).replace('\\"', '"').replace('\\n', '\n')
-        data = json.loads(json_str)
+        # 常驻标签页打开，轮询等待数据就绪
+        snapshot = get_browser_pool().snapshot(url)
         
-        posts = data.get('list', [])
+        # 单遍解析 snapshot
+        posts = parse_snapshot(snapshot)
         results = []
         
         for post in posts[:5]:  # 只取前5条
@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+"""
+近似重复帖子识别（MinHash + 分段 LSH），跨股票、跨轮次
+策略：
+1. 指纹：去空白、转小写后取 3 字 shingle，每个 shingle 一个 64 位 blake2b 哈希，
+   单哈希分桶 MinHash（one permutation hashing）：高 5 位分 32 个桶，每桶取最小值得 32 维签名，
+   空桶从右边最近的非空桶借值（轮转致密化）；每条只排序一次，不用算 32 个哈希函数
+   （试过 64 位 SimHash：几十字的短帖改两个字，汉明距离就普遍超过 3，漏判太多）
+2. 签名切成 NEAR_DUP_BANDS 段，任一段完全相同才是候选（每段查一次桶，期望 O(1)），
+   候选再按签名相同的比例估算 Jaccard，不低于 NEAR_DUP_THRESHOLD 算近似重复
+3. 只在 NEAR_DUP_WINDOW_HOURS 时间窗口内比较（按发帖时间），同一个 id 不算自己的重复
+4. 索引有界：按加入顺序淘汰超出窗口的，最多保留 NEAR_DUP_MAX_ENTRIES 条；落盘到 NEAR_DUP_FILE，下轮接着用
+5. collapse() 在 batch_analyze 之前折叠：批内重复并到第一条（提到的股票取并集，计 duplicates），
+   和以前轮次分析过的内容重复的直接跳过；分析完用 remember() 把分析成功的加入索引
+   （分析失败的不入索引、不算处理过，LLM 临时不可用时下一轮连同它的重复重新分析）
+6. 回放模式下不读写索引文件，保证回放结果稳定
+
+使用:
+    python near_dup.py                            # 索引状态
+    python near_dup.py /tmp/xueqiu_normalized.jsonl   # 看一批数据能折叠掉多少
+    python near_dup.py --bench 100000
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from functools import lru_cache
+from hashlib import blake2b
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import cassette
+import config
+
+SHINGLE = 3
+PERMUTATIONS = 32  # 签名维数（分桶数）
+_BIN_SHIFT = 59  # 64 位哈希的高 5 位是桶号
+_VALUE_SHIFT = 43  # 桶内取接下来的 16 位作为签名值
+MIN_CHARS = 10  # 太短的文本指纹不可靠（也进不了 batch_analyze）
+
+
+@lru_cache(maxsize=1 << 18)
+def _shingle_hash(shingle: str) -> int:
+    """shingle 的 64 位哈希；常见 3 字组合反复出现，缓存命中率高"""
+    return int.from_bytes(blake2b(shingle.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+def minhash(text: str) -> Tuple[int, ...]:
+    """32 维 MinHash 签名"""
+    text = ''.join(text.lower().split())
+    shingles = {text[i:i + SHINGLE] for i in range(max(len(text) - SHINGLE + 1, 1))}
+    # 从大到小写入，每个桶最后留下的是最小值
+    mins = {h >> _BIN_SHIFT: (h >> _VALUE_SHIFT) & 0xFFFF
+            for h in sorted(map(_shingle_hash, shingles), reverse=True)}
+    if len(mins) == PERMUTATIONS:
+        return tuple(mins[b] for b in range(PERMUTATIONS))
+
+    signature = []
+    for b in range(PERMUTATIONS):
+        offset = 0
+        while (b + offset) % PERMUTATIONS not in mins:
+            offset += 1
+        # 借来的值按距离错开，两段文本只有空桶分布也相同时才会相等
+        signature.append((mins[(b + offset) % PERMUTATIONS] + offset * 0x9E37) & 0xFFFF)
+    return tuple(signature)
+
+
+def similarity(a: Tuple[int, ...], b: Tuple[int, ...]) -> float:
+    """签名相同的比例 ≈ 两段文本 shingle 集合的 Jaccard"""
+    return sum(x == y for x, y in zip(a, b)) / len(a)
+
+
+def item_key(item: Dict) -> str:
+    return f"{item.get('type')}:{item.get('id')}"
+
+
+class Entry(NamedTuple):
+    added: float  # 加入索引的时间（淘汰用）
+    signature: Tuple[int, ...]
+    ts: int  # 发帖时间（秒）
+    key: str
+    symbol: Optional[str]
+
+
+class NearDupIndex:
+    """MinHash 分段索引（线程安全）"""
+
+    def __init__(self, filename: Optional[str] = config.NEAR_DUP_FILE,
+                 window_hours: float = config.NEAR_DUP_WINDOW_HOURS,
+                 max_entries: int = config.NEAR_DUP_MAX_ENTRIES,
+                 threshold: float = config.NEAR_DUP_THRESHOLD,
+                 bands: int = config.NEAR_DUP_BANDS):
+        self.filename = filename
+        self.window = window_hours * 3600
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = PERMUTATIONS // bands
+        self.lock = threading.Lock()
+        self.entries: deque = deque()
+        self.buckets: Dict[Tuple, List[Entry]] = {}
+        self.pending: Dict[str, Tuple[int, ...]] = {}  # collapse 算过、等 remember 入库的签名
+        if filename:
+            self._load()
+
+    def _band_keys(self, signature: Tuple[int, ...]) -> List[Tuple]:
+        rows = self.rows
+        return [(band,) + signature[band * rows:(band + 1) * rows] for band in range(self.bands)]
+
+    # ---------- 增删查 ----------
+
+    def _insert(self, entry: Entry):
+        self.entries.append(entry)
+        for band_key in self._band_keys(entry.signature):
+            self.buckets.setdefault(band_key, []).append(entry)
+
+    def _evict(self, now: float):
+        while self.entries and (len(self.entries) > self.max_entries or now - self.entries[0].added > self.window):
+            entry = self.entries.popleft()
+            for band_key in self._band_keys(entry.signature):
+                bucket = self.buckets.get(band_key)
+                if bucket:
+                    bucket.remove(entry)
+                    if not bucket:
+                        del self.buckets[band_key]
+
+    def find(self, signature: Tuple[int, ...], ts: int, key: str = "") -> Optional[Entry]:
+        """时间窗口内第一条近似重复（不含同 key 的自己）"""
+        with self.lock:
+            checked = set()
+            for band_key in self._band_keys(signature):
+                for entry in self.buckets.get(band_key, ()):
+                    if entry.key == key or entry.key in checked or abs(entry.ts - ts) > self.window:
+                        continue
+                    checked.add(entry.key)
+                    if similarity(entry.signature, signature) >= self.threshold:
+                        return entry
+        return None
+
+    def add(self, signature: Tuple[int, ...], ts: int, key: str, symbol: Optional[str] = None):
+        now = time.time()
+        with self.lock:
+            self._insert(Entry(now, signature, ts, key, symbol))
+            self._evict(now)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    # ---------- 持久化 ----------
+
+    def _load(self):
+        if not os.path.exists(self.filename):
+            return
+        try:
+            with open(self.filename, 'r', encoding='utf-8') as f:
+                rows = json.load(f).get('entries', [])
+            for added, signature, ts, key, symbol in rows:
+                self._insert(Entry(added, tuple(signature), ts, key, symbol))
+            self._evict(time.time())
+        except (OSError, ValueError, TypeError) as e:
+            print(f"   ⚠️ 近似重复索引读取失败，重新开始: {e}")
+            self.entries.clear()
+            self.buckets.clear()
+
+    def save(self):
+        if not self.filename:
+            return
+        with self.lock:
+            self._evict(time.time())
+            rows = [list(entry) for entry in self.entries]
+        tmp_file = self.filename + '.tmp'
+        try:
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump({'entries': rows}, f, ensure_ascii=False)
+            os.replace(tmp_file, self.filename)
+        except OSError as e:
+            print(f"   ⚠️ 近似重复索引写入失败: {e}")
+
+
+_index: Optional[NearDupIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_index() -> NearDupIndex:
+    """进程级共享的索引（回放时用不落盘的空索引）"""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = NearDupIndex(None if cassette.replaying() else config.NEAR_DUP_FILE)
+        return _index
+
+
+def _signature(item: Dict) -> Optional[Tuple[int, ...]]:
+    text = item.get("text") or ""
+    if len(text.strip()) < MIN_CHARS:
+        return None
+    return minhash(text)
+
+
+def collapse(items: Iterable[Dict], index: Optional[NearDupIndex] = None) -> List[Dict]:
+    """
+    折叠近似重复，返回要分析的数据（保持原顺序）
+
+    被折叠的数据标上 duplicate_of（对应那条的 key），不再送去分析；
+    批内重复的股票并入保留那条的 mentions，按股票聚合时每只股票仍然计入
+    """
+    index = index if index is not None else get_index()
+    batch = NearDupIndex(None, window_hours=index.window / 3600, max_entries=sys.maxsize,
+                         threshold=index.threshold, bands=index.bands)
+    kept: List[Dict] = []
+    canonical_by_key: Dict[str, Dict] = {}
+    seen_before = in_batch = 0
+    index.pending = {}
+
+    for item in items:
+        key = item_key(item)
+        signature = _signature(item)
+        if signature is None:
+            kept.append(item)
+            continue
+        ts = item.get("timestamp") or 0
+
+        prior = index.find(signature, ts, key)
+        if prior:
+            item["duplicate_of"] = prior.key
+            seen_before += 1
+            continue
+
+        first = batch.find(signature, ts, key)
+        if first:
+            item["duplicate_of"] = first.key
+            canonical = canonical_by_key[first.key]
+            canonical["duplicates"] = canonical.get("duplicates", 0) + 1
+            symbols = ([item["symbol"]] if item.get("symbol") else []) + list(item.get("mentions") or [])
+            extra = [s for s in symbols if s != canonical.get("symbol")]
+            if extra:
+                canonical["mentions"] = list(dict.fromkeys(list(canonical.get("mentions") or []) + extra))
+            in_batch += 1
+            continue
+
+        batch.add(signature, ts, key, item.get("symbol"))
+        index.pending[key] = signature
+        canonical_by_key[key] = item
+        kept.append(item)
+
+    if seen_before or in_batch:
+        print(f"🧬 近似重复折叠: 批内 {in_batch} 条, 与历史重复 {seen_before} 条, 剩 {len(kept)} 条")
+    return kept
+
+
+def analyzed_ok(item: Dict) -> bool:
+    """有分析结果且不是失败（analyze 失败时返回 {"error": ...}）"""
+    return "error" not in item.get("analysis", {"error": "未分析"})
+
+
+def processed(items: List[Dict]) -> List[Dict]:
+    """
+    本轮可以记为已处理的数据：分析成功的，以及对应那条已分析成功的近似重复
+
+    对应那条在本批里、但超出分析条数上限没分析的，它的重复也不算处理过：
+    下一轮和它一起重新折叠，合并进去的 mentions / duplicates 才不会丢
+    """
+    by_key = {item_key(item): item for item in items}
+    result = []
+    for item in items:
+        if analyzed_ok(item):
+            result.append(item)
+        elif "duplicate_of" in item:
+            canonical = by_key.get(item["duplicate_of"])
+            # 不在本批里的是与历史重复，那一条以前分析过
+            if canonical is None or analyzed_ok(canonical):
+                result.append(item)
+    return result
+
+
+def remember(items: Iterable[Dict], index: Optional[NearDupIndex] = None):
+    """把分析过的数据加入索引并落盘（之后的轮次遇到同样内容直接跳过）"""
+    index = index if index is not None else get_index()
+    for item in items:
+        key = item_key(item)
+        signature = index.pending.pop(key, None) or _signature(item)
+        if signature is not None:
+            index.add(signature, item.get("timestamp") or 0, key, item.get("symbol"))
+    index.save()
+
+
+if __name__ == "__main__":
+    if '--bench' in sys.argv:
+        import random
+
+        n = int(sys.argv[sys.argv.index('--bench') + 1]) if len(sys.argv) > 2 else 100000
+        rng = random.Random(42)
+        vocab = "今天大盘震荡继续持有观望放量突破前高明天看好业绩预告超预期主力资金净流入亿高开概率组合调仓清仓换仓军工黄金卫星航天"
+        texts = []
+        for i in range(n):
+            if texts and rng.random() < 0.3:
+                # 三成是改了几个字的转发 / 复制
+                text = list(rng.choice(texts))
+                for _ in range(2):
+                    text[rng.randrange(len(text))] = rng.choice(vocab)
+                texts.append(''.join(text))
+            else:
+                texts.append(''.join(rng.choice(vocab) for _ in range(rng.randint(40, 120))))
+        items = [{"type": "status", "id": i, "text": t, "timestamp": int(time.time())} for i, t in enumerate(texts)]
+        index = NearDupIndex(None)
+        start = time.time()
+        kept = collapse(items, index)
+        remember(kept, index)
+        elapsed = time.time() - start
+        print(f"🏋️ {n} 条: {elapsed:.2f}s ({n / elapsed:,.0f} 条/秒), 保留 {len(kept)} 条, 索引 {len(index)} 条")
+    elif len(sys.argv) > 1:
+        with open(sys.argv[1], 'r', encoding='utf-8') as f:
+            items = [json.loads(line) for line in f if line.strip()]
+        kept = collapse(items, NearDupIndex(None))
+        print(f"📊 {len(items)} 条 → {len(kept)} 条")
+        dups = [item for item in items if item.get("duplicate_of")]
+        for item in dups[:10]:
+            print(f"   {item_key(item)} ≈ {item['duplicate_of']}: {item.get('text', '')[:40]}")
+    else:
+        index = get_index()
+        print(f"🧬 近似重复索引 {config.NEAR_DUP_FILE}: {len(index)} 条, {len(index.buckets)} 个桶, "
+              f"窗口 {config.NEAR_DUP_WINDOW_HOURS}h, 相似度 ≥ {config.NEAR_DUP_THRESHOLD}")
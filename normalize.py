@@ -2,26 +2,30 @@
 """
 数据标准化模块
 将不同来源的雪球数据统一成标准格式
+
+流式写出：SortedJsonlWriter 边收边写，内存里最多留 NORMALIZE_BUFFER_SIZE 条，
+满了就排好序落到临时文件，结束时多路归并成按时间倒序的 JSONL
 """
 
+import heapq
 import json
-import re
+import os
+import tempfile
+import threading
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import config
+import symbol_tagger
+import text_clean
 
 def clean_text(text: str) -> str:
-    """清理文本，移除HTML标签和特殊字符"""
-    if not text:
-        return ""
-    
-    # 移除HTML标签
-    text = re.sub(r'<[^>]+>', '', text)
-    # 移除多余空白
-    text = re.sub(r'\s+', ' ', text).strip()
-    # 移除雪球特有表情标签
-    text = re.sub(r'\[.*?\]', '', text)
-    
-    return text
+    """清理文本，移除HTML标签、实体和雪球表情（见 text_clean）"""
+    return text_clean.clean(text)
+
+def _mentions(cleaned: text_clean.CleanResult) -> List[str]:
+    """文中提到的股票：cashtag / 个股链接 + 简称、代码、别名"""
+    return list(dict.fromkeys(cleaned.symbols + symbol_tagger.tag(cleaned.text)))
 
 def normalize_status(item: Dict, symbol: str) -> Dict:
     """
@@ -35,21 +39,26 @@ def normalize_status(item: Dict, symbol: str) -> Dict:
         dict: 标准化后的数据
     """
     user = item.get("user", {})
+    cleaned = text_clean.parse(item.get("text", ""))
+    # fetch_status.fetch_discussions 给的是它自己标准化过的帖子（timestamp / author，毫秒）
+    created_at = item.get("created_at") or item.get("timestamp") or 0
     
     return {
         "id": str(item.get("id", "")),
         "symbol": symbol,
         "source": "xueqiu",
         "type": "status",
-        "author": user.get("screen_name", ""),
+        "author": user.get("screen_name") or item.get("author", ""),
         "author_id": user.get("id", ""),
-        "text": clean_text(item.get("text", "")),
+        "text": cleaned.text,
         "raw_text": item.get("text", ""),  # 保留原始文本用于调试
+        "mentions": _mentions(cleaned),  # 帖子里提到的股票
+        "emoticons": dict(cleaned.emoticons),
         "likes": item.get("like_count", 0),
         "comments": item.get("comment_count", 0),
         "reposts": item.get("repost_count", 0),
-        "created_at": datetime.fromtimestamp(item.get("created_at", 0) / 1000).isoformat(),
-        "timestamp": item.get("created_at", 0) // 1000,  # Unix时间戳
+        "created_at": datetime.fromtimestamp(created_at / 1000).isoformat(),
+        "timestamp": created_at // 1000,  # Unix时间戳
         "url": f"https://xueqiu.com/S/{symbol}/{item.get('id', '')}",
     }
 
@@ -63,6 +72,7 @@ def normalize_livenews(item: Dict) -> Dict:
     Returns:
         dict: 标准化后的数据
     """
+    cleaned = text_clean.parse(item.get("text", ""))
     return {
         "id": str(item.get("id", "")),
         "symbol": None,  # 快讯可能不关联特定股票
@@ -70,8 +80,10 @@ def normalize_livenews(item: Dict) -> Dict:
         "type": "livenews",
         "author": "雪球快讯",
         "author_id": "system",
-        "text": clean_text(item.get("text", "")),
+        "text": cleaned.text,
         "raw_text": item.get("text", ""),
+        "mentions": _mentions(cleaned),  # signals / top10 按提到的股票计入
+        "emoticons": dict(cleaned.emoticons),
         "likes": 0,
         "comments": 0,
         "reposts": 0,
@@ -92,29 +104,107 @@ def normalize_all(status_data: List[Dict], livenews_data: List[Dict], symbols: L
     Returns:
         list: 标准化后的数据列表
     """
-    normalized = []
+    normalized = list(iter_normalized(status_data, livenews_data))
+    
+    # 按时间排序（最新的在前）
+    normalized.sort(key=lambda x: x.get("timestamp", 0), reverse=True)
     
+    return normalized
+
+def iter_normalized(status_data: Iterable[Dict], livenews_data: Iterable[Dict]) -> Iterator[Dict]:
+    """逐条标准化（不排序），配合 SortedJsonlWriter 流式写出"""
     # 处理个股讨论
     for item in status_data:
-        # 尝试获取关联的股票代码
-        symbol = item.get("symbol", "")
-        if not symbol:
-            # 从链接中提取
-            text = item.get("text", "")
-            match = re.search(r'(SH|SZ)\d{6}', text)
-            if match:
-                symbol = match.group(0)
+        record = normalize_status(item, item.get("symbol", ""))
+        if not record["symbol"] and record["mentions"]:
+            # 没有关联股票时取文中第一个提到的
+            record["symbol"] = record["mentions"][0]
         
-        normalized.append(normalize_status(item, symbol))
+        yield record
     
     # 处理快讯
     for item in livenews_data:
-        normalized.append(normalize_livenews(item))
+        yield normalize_livenews(item)
+
+def _sort_key(item: Dict) -> int:
+    return item.get("timestamp", 0)
+
+def _read_run(filename: str) -> Iterator[Dict]:
+    with open(filename, "r", encoding="utf-8") as f:
+        for line in f:
+            yield json.loads(line)
+
+class SortedJsonlWriter:
+    """
+    有界内存的按时间倒序 JSONL 写出（外部归并排序，线程安全）
     
-    # 按时间排序（最新的在前）
-    normalized.sort(key=lambda x: x.get("timestamp", 0), reverse=True)
+    用法:
+        with SortedJsonlWriter() as writer:
+            writer.extend(normalize_status(p, symbol) for p in page)
+        print(writer.count)
+    """
     
-    return normalized
+    def __init__(self, filename: str = "/tmp/xueqiu_normalized.jsonl",
+                 buffer_size: int = config.NORMALIZE_BUFFER_SIZE):
+        self.filename = filename
+        self.buffer_size = max(buffer_size, 1)
+        self.buffer: List[Dict] = []
+        self.runs: List[str] = []  # 已排序的临时文件
+        self.count = 0
+        self.closed = False
+        self.lock = threading.Lock()
+    
+    def add(self, item: Dict):
+        with self.lock:
+            if self.closed:
+                return
+            self.buffer.append(item)
+            self.count += 1
+            if len(self.buffer) >= self.buffer_size:
+                self._spill()
+    
+    def extend(self, items: Iterable[Dict]):
+        for item in items:
+            self.add(item)
+    
+    def _spill(self):
+        """缓冲区排好序写到临时文件"""
+        self.buffer.sort(key=_sort_key, reverse=True)
+        fd, run_file = tempfile.mkstemp(prefix="xueqiu_run_", suffix=".jsonl")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            for item in self.buffer:
+                f.write(json.dumps(item, ensure_ascii=False) + "\n")
+        self.runs.append(run_file)
+        self.buffer = []
+    
+    def close(self) -> int:
+        """归并所有临时文件和缓冲区，写出最终文件，返回总条数"""
+        with self.lock:
+            if self.closed:
+                return self.count
+            self.closed = True
+            self.buffer.sort(key=_sort_key, reverse=True)
+            sources = [_read_run(run) for run in self.runs] + [iter(self.buffer)]
+            tmp_file = self.filename + ".tmp"
+            try:
+                with open(tmp_file, "w", encoding="utf-8") as f:
+                    for item in heapq.merge(*sources, key=_sort_key, reverse=True):
+                        f.write(json.dumps(item, ensure_ascii=False) + "\n")
+                os.replace(tmp_file, self.filename)
+            finally:
+                for run in self.runs:
+                    os.remove(run)
+                self.runs = []
+                self.buffer = []
+        
+        print(f"💾 已保存 {self.count} 条标准化数据到 {self.filename}")
+        return self.count
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
 
 def load_raw_data(prefix: str = "/tmp/xueqiu") -> tuple:
     """
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+按活跃度调度抓取（热门股勤刷、冷门股少刷）
+策略：
+1. 每只股票用 EWMA 估计发帖速率（条/分钟）：每次抓完按"上次抓取以来的新帖数 / 间隔分钟"更新
+2. 刷新间隔 = 目标新帖数 / 速率，夹在 ACTIVITY_MIN_INTERVAL（1分钟）~ ACTIVITY_MAX_INTERVAL（30分钟）
+3. 翻页深度 = 一个间隔内预计的新帖数 / 每页条数 + 1 页余量，夹在 1 ~ CRAWL_MAX_PAGES
+4. 没有历史的股票立即抓，页数按上限
+5. 全局请求预算（ACTIVITY_REQUEST_BUDGET 页/分钟）：总需求超了就按比例拉长所有间隔，
+   单轮超了先抓最"欠"的（超期最久 × 越活跃越优先），其余顺延到下一轮
+
+状态存在 ACTIVITY_FILE，跨进程保留
+"""
+
+import json
+import math
+import os
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import config
+
+PAGE_SIZE = 20  # 讨论接口每页条数
+
+
+class SymbolActivity:
+    """单只股票的活跃度估计"""
+
+    def __init__(self, rate: Optional[float] = None, last_crawl: float = 0.0, crawls: int = 0):
+        self.rate = rate  # 条/分钟，None 表示还没抓过
+        self.last_crawl = last_crawl
+        self.crawls = crawls
+
+    def to_dict(self) -> Dict:
+        return {'rate': self.rate, 'last_crawl': self.last_crawl, 'crawls': self.crawls}
+
+
+class PollScheduler:
+    """按发帖速率分配刷新间隔和翻页深度"""
+
+    def __init__(self, filename: str = config.ACTIVITY_FILE,
+                 alpha: float = config.ACTIVITY_EWMA_ALPHA,
+                 target_posts: float = config.ACTIVITY_TARGET_POSTS,
+                 min_interval: float = config.ACTIVITY_MIN_INTERVAL,
+                 max_interval: float = config.ACTIVITY_MAX_INTERVAL,
+                 max_pages: int = config.CRAWL_MAX_PAGES,
+                 budget: float = config.ACTIVITY_REQUEST_BUDGET):
+        self.filename = filename
+        self.alpha = alpha
+        self.target_posts = target_posts
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.max_pages = max_pages
+        self.budget = budget  # 页/分钟
+        self.lock = threading.Lock()
+        self.symbols: Dict[str, SymbolActivity] = {}
+        self._load()
+
+    # ---------- 状态 ----------
+
+    def _load(self):
+        if not self.filename or not os.path.exists(self.filename):
+            return
+        try:
+            with open(self.filename, 'r', encoding='utf-8') as f:
+                for symbol, entry in json.load(f).items():
+                    self.symbols[symbol] = SymbolActivity(**entry)
+        except (OSError, ValueError, TypeError):
+            self.symbols = {}
+
+    def save(self):
+        if not self.filename:
+            return
+        with self.lock:
+            data = {symbol: state.to_dict() for symbol, state in self.symbols.items()}
+        tmp_file = self.filename + '.tmp'
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_file, self.filename)
+
+    # ---------- 估计 ----------
+
+    def observe(self, symbol: str, timestamps: Iterable[int], now: Optional[float] = None):
+        """
+        一次抓取完成后更新发帖速率
+
+        Args:
+            timestamps: 本次抓到的帖子的 created_at（毫秒）
+        """
+        now = now or time.time()
+        with self.lock:
+            state = self.symbols.setdefault(symbol, SymbolActivity())
+            # 统计窗口：上次抓取以来，最长24小时（首次抓取就是24小时窗口）
+            window_start = max(state.last_crawl, now - 24 * 3600)
+            minutes = max((now - window_start) / 60, 1.0)
+            fresh = sum(1 for ts in timestamps if ts / 1000 > window_start)
+            sample = fresh / minutes
+
+            if state.rate is None:
+                state.rate = sample
+            else:
+                state.rate = self.alpha * sample + (1 - self.alpha) * state.rate
+            state.last_crawl = now
+            state.crawls += 1
+
+    def interval(self, symbol: str) -> float:
+        """刷新间隔（秒，未考虑全局预算）"""
+        state = self.symbols.get(symbol)
+        if state is None or state.rate is None:
+            return self.min_interval
+        if state.rate <= 0:
+            return self.max_interval
+        seconds = self.target_posts / state.rate * 60
+        return min(max(seconds, self.min_interval), self.max_interval)
+
+    def pages(self, symbol: str, interval: Optional[float] = None) -> int:
+        """一次抓取的翻页深度"""
+        state = self.symbols.get(symbol)
+        if state is None or state.rate is None:
+            return self.max_pages
+        interval = interval or self.interval(symbol)
+        expected = state.rate * interval / 60
+        return min(max(math.ceil(expected / PAGE_SIZE) + 1, 1), self.max_pages)
+
+    # ---------- 调度 ----------
+
+    def plan(self, symbols: List[str], now: Optional[float] = None,
+             cycle: float = 60.0) -> List[Tuple[str, int]]:
+        """
+        本轮要抓哪些股票、各翻几页
+
+        Args:
+            cycle: 调度周期（秒），本轮最多用掉 budget × cycle / 60 页
+
+        Returns:
+            [(symbol, 页数)]，最该抓的在前
+        """
+        now = now or time.time()
+        with self.lock:
+            intervals = {s: self.interval(s) for s in symbols}
+            depth = {s: self.pages(s, intervals[s]) for s in symbols}
+
+            # 总需求（页/分钟）超预算：所有间隔按同一比例拉长
+            demand = sum(depth[s] / intervals[s] * 60 for s in symbols)
+            stretch = max(demand / self.budget, 1.0) if self.budget > 0 else 1.0
+
+            due = []
+            for symbol in symbols:
+                state = self.symbols.get(symbol)
+                interval = intervals[symbol] * stretch
+                last = state.last_crawl if state else 0.0
+                overdue = (now - last) / interval
+                if overdue >= 1.0:
+                    rate = state.rate if state and state.rate is not None else 0.0
+                    due.append((overdue * (1.0 + rate), symbol))
+            due.sort(reverse=True)
+
+            # 本轮页数上限
+            allowance = self.budget * cycle / 60 if self.budget > 0 else float('inf')
+            planned = []
+            used = 0
+            for _, symbol in due:
+                if planned and used + depth[symbol] > allowance:
+                    continue
+                planned.append((symbol, depth[symbol]))
+                used += depth[symbol]
+            return planned
+
+    def next_due(self, symbols: List[str], now: Optional[float] = None) -> float:
+        """距最近一只股票到期还有几秒（守护进程据此 sleep）"""
+        now = now or time.time()
+        waits = []
+        for symbol in symbols:
+            state = self.symbols.get(symbol)
+            if state is None:
+                return 0.0
+            waits.append(state.last_crawl + self.interval(symbol) - now)
+        return max(min(waits), 0.0) if waits else self.max_interval
+
+    def summary(self, symbols: List[str]) -> List[Dict]:
+        rows = []
+        for symbol in symbols:
+            state = self.symbols.get(symbol) or SymbolActivity()
+            rows.append({
+                'symbol': symbol,
+                'rate': round(state.rate, 3) if state.rate is not None else None,
+                'interval': round(self.interval(symbol)),
+                'pages': self.pages(symbol),
+            })
+        return rows
+
+
+_scheduler: Optional[PollScheduler] = None
+
+
+def get_scheduler() -> PollScheduler:
+    """进程级共享的调度器"""
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = PollScheduler()
+    return _scheduler
+
+
+if __name__ == "__main__":
+    import sys
+
+    # 用历史报告模拟：报告里各股票24小时内的帖子数作为一次观测
+    report = sys.argv[1] if len(sys.argv) > 1 else os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), 'reports', 'xueqiu_20260206_194759.json')
+    with open(report, 'r', encoding='utf-8') as f:
+        data = json.load(f)['data']
+
+    scheduler = PollScheduler(filename='')
+    now = time.time()
+    for symbol, posts in data.items():
+        # 报告里的时间戳是旧的，整体平移到"刚刚抓完"
+        newest = max((p.get('timestamp') or 0 for p in posts), default=0)
+        scheduler.observe(symbol, [now * 1000 - (newest - (p.get('timestamp') or 0)) for p in posts], now)
+
+    symbols = list(data)
+    print(f"📊 活跃度估计（{os.path.basename(report)}）:")
+    for row in sorted(scheduler.summary(symbols), key=lambda r: -(r['rate'] or 0)):
+        print(f"   {row['symbol']}: {row['rate']} 条/分钟 → 每 {row['interval'] / 60:.0f} 分钟, {row['pages']} 页")
+
+    print(f"\n🗓️ 之后各时刻的计划（预算 {scheduler.budget} 页/分钟）:")
+    for minutes in (1, 5, 15, 30):
+        plan = scheduler.plan(symbols, now + minutes * 60)
+        print(f"   +{minutes} 分钟: {len(plan)} 只, {sum(p for _, p in plan)} 页 {plan}")
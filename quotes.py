@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+行情服务（腾讯 qt.gtimg.cn）
+策略：
+1. 一次请求带多只股票（逗号分隔，每批 QUOTE_BATCH_SIZE 只），多批并发
+2. 内存 + 磁盘缓存，QUOTE_CACHE_TTL 秒内重复查询不再联网（signals / top10 共用一次结果）
+3. 按 ~ 分隔的完整字段解析成 Quote（现价、涨跌、成交量、成交额、换手率），不再只取第32个字段
+4. 行情接口不是雪球的，不走 AIMD 限速，也不带雪球Cookie
+
+字段（0 起）: 1 名称, 2 代码, 3 现价, 4 昨收, 5 今开, 6 成交量(手), 30 时间,
+             31 涨跌, 32 涨跌幅%, 33 最高, 34 最低, 37 成交额(万), 38 换手率%
+"""
+
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, asdict
+from typing import List, Dict, Optional
+
+import cassette
+import config
+from session_pool import create_session
+
+_LINE = re.compile(r'v_(\w+)="([^"]*)"')
+
+
+@dataclass
+class Quote:
+    symbol: str  # 雪球格式，如 SH600118
+    name: str
+    price: float
+    prev_close: float
+    open: float
+    high: float
+    low: float
+    change: float
+    change_pct: float
+    volume: int  # 成交量（手）
+    amount: float  # 成交额（万元）
+    turnover_rate: float  # 换手率（%）
+    time: str  # YYYYMMDDhhmmss
+
+
+def to_quote_code(symbol: str) -> str:
+    """SH600118 → sh600118（没有前缀时 6 开头算沪市）"""
+    market = "sh" if symbol.startswith("SH") or symbol.startswith("6") else "sz"
+    return market + symbol.replace("SH", "").replace("SZ", "")
+
+
+def _num(fields: List[str], idx: int) -> float:
+    try:
+        return float(fields[idx])
+    except (IndexError, ValueError):
+        return 0.0
+
+
+def parse_quote(code: str, payload: str) -> Optional[Quote]:
+    """解析单只股票的 ~ 分隔字段，字段不全（停牌 / 代码不存在）返回 None"""
+    fields = payload.split('~')
+    if len(fields) <= 32:
+        return None
+    return Quote(
+        symbol=code.upper(),
+        name=fields[1],
+        price=_num(fields, 3),
+        prev_close=_num(fields, 4),
+        open=_num(fields, 5),
+        high=_num(fields, 33),
+        low=_num(fields, 34),
+        change=_num(fields, 31),
+        change_pct=_num(fields, 32),
+        volume=int(_num(fields, 6)),
+        amount=_num(fields, 37),
+        turnover_rate=_num(fields, 38),
+        time=fields[30],
+    )
+
+
+def parse_quotes(text: str) -> Dict[str, Quote]:
+    """解析一批响应：v_sh600118="...";\\nv_sz002155="...";"""
+    quotes = {}
+    for match in _LINE.finditer(text):
+        quote = parse_quote(match.group(1), match.group(2))
+        if quote:
+            quotes[quote.symbol] = quote
+    return quotes
+
+
+class QuoteService:
+    """批量 + 并发 + 带缓存的行情查询"""
+
+    def __init__(self, base_url: str = config.QUOTE_BASE_URL,
+                 batch_size: int = config.QUOTE_BATCH_SIZE,
+                 concurrency: int = config.QUOTE_CONCURRENCY,
+                 ttl: float = config.QUOTE_CACHE_TTL,
+                 cache_file: str = config.QUOTE_CACHE_FILE):
+        self.base_url = base_url
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.ttl = ttl
+        self.cache_file = cache_file
+
+        self.lock = threading.Lock()
+        self.cache: Dict[str, Dict] = {}  # symbol -> {'quote': Quote, 'ts': 抓取时间}
+        self._local = threading.local()
+        self._load_cache()
+
+    # ---------- 缓存 ----------
+
+    def _load_cache(self):
+        # 回放时只用录制的响应，不读磁盘缓存
+        if cassette.replaying() or not os.path.exists(self.cache_file):
+            return
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                cache = json.load(f)
+            if cache.get('base_url') != self.base_url:
+                return
+            now = time.time()
+            for symbol, entry in cache.get('quotes', {}).items():
+                if now - entry['ts'] < self.ttl:
+                    self.cache[symbol] = {'quote': Quote(**entry['quote']), 'ts': entry['ts']}
+        except (OSError, ValueError, TypeError, KeyError):
+            pass
+
+    def _save_cache(self):
+        tmp_file = self.cache_file + '.tmp'
+        with self.lock:
+            quotes = {s: {'quote': asdict(e['quote']), 'ts': e['ts']} for s, e in self.cache.items()}
+        try:
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump({'base_url': self.base_url, 'quotes': quotes}, f, ensure_ascii=False)
+            os.replace(tmp_file, self.cache_file)
+        except OSError as e:
+            print(f"   ⚠️ 行情缓存写入失败: {e}")
+
+    # ---------- 查询 ----------
+
+    def _session(self):
+        # 每个线程一个 session，连接各自复用
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = create_session(paced=False)
+            self._local.session = session
+        return session
+
+    def _fetch_batch(self, codes: List[str]) -> Dict[str, Quote]:
+        url = f"{self.base_url}/q={','.join(codes)}"
+        try:
+            r = self._session().get(url, timeout=config.REQUEST_TIMEOUT)
+            return parse_quotes(r.content.decode('gbk', errors='replace'))
+        except Exception as e:
+            print(f"   ⚠️ 行情请求失败 ({len(codes)} 只): {e}")
+            return {}
+
+    def get_quotes(self, symbols: List[str]) -> Dict[str, Quote]:
+        """
+        查询一组股票的行情
+
+        Returns:
+            {雪球代码: Quote}，查不到的股票不在结果里
+        """
+        now = time.time()
+        result = {}
+        missing = []
+        with self.lock:
+            for symbol in dict.fromkeys(symbols):
+                entry = self.cache.get(symbol)
+                if entry and now - entry['ts'] < self.ttl:
+                    result[symbol] = entry['quote']
+                else:
+                    missing.append(symbol)
+
+        if not missing:
+            return result
+
+        # 排序后分批，批次内容稳定，录制 / 回放能对上
+        codes = {to_quote_code(s): s for s in missing}
+        ordered = sorted(codes)
+        batches = [ordered[i:i + self.batch_size] for i in range(0, len(ordered), self.batch_size)]
+
+        with ThreadPoolExecutor(max_workers=min(self.concurrency, len(batches))) as executor:
+            fetched = {}
+            for quotes in executor.map(self._fetch_batch, batches):
+                fetched.update(quotes)
+
+        fetched_at = time.time()
+        with self.lock:
+            for code, quote in fetched.items():
+                symbol = codes.get(code.lower())
+                if symbol:
+                    quote.symbol = symbol
+                    result[symbol] = quote
+                    self.cache[symbol] = {'quote': quote, 'ts': fetched_at}
+
+        if fetched and not cassette.replaying():
+            self._save_cache()
+        return result
+
+
+_service: Optional[QuoteService] = None
+_service_lock = threading.Lock()
+
+
+def get_quote_service() -> QuoteService:
+    """获取进程级共享的行情服务"""
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = QuoteService()
+        return _service
+
+
+def get_quotes(symbols: List[str]) -> Dict[str, Quote]:
+    return get_quote_service().get_quotes(symbols)
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) > 1 and sys.argv[1] == '--bench':
+        # 起本地模拟服务器，测 N 只股票的行情耗时
+        import mock_server
+
+        n = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+        server = mock_server.start_server(8801)
+        symbols = mock_server.synthetic_symbols(n)
+        service = QuoteService(base_url='http://127.0.0.1:8801', cache_file='/tmp/xueqiu_quotes_bench.json')
+
+        print(f"🏋️ 行情压测: {n} 只股票 | 每批 {service.batch_size} | 并发 {service.concurrency}")
+        for label in ('冷启动', '缓存命中'):
+            start = time.time()
+            quotes = service.get_quotes(symbols)
+            print(f"   {label}: {len(quotes)} 只, {time.time() - start:.3f}s")
+        print(f"   服务器统计: {dict(server.RequestHandlerClass.stats)}")
+        server.shutdown()
+    else:
+        symbols = sys.argv[1:] or config.SYMBOLS
+        for symbol, quote in get_quotes(symbols).items():
+            print(f"📈 {symbol} {quote.name}: {quote.price:.2f} ({quote.change_pct:+.2f}%) "
+                  f"量 {quote.volume}手 额 {quote.amount:.0f}万 换手 {quote.turnover_rate:.2f}%")
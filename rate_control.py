@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+自适应限速（AIMD，按 host 分别计算）
+策略：
+1. 响应正常（JSON）→ 加性增：速率每秒约 +AIMD_RATE_STEP，并发每轮 +1
+2. 收到 429 / 非 JSON content-type / WAF HTML → 乘性减：速率和并发减半
+3. 两次减速之间有冷却期，同一批在途请求一起被拦不会把速率连砍好几次
+4. 速率和并发都有上下限，最终稳定在站点能容忍的最高速度附近
+
+HTTP 请求在 session_pool 的适配器里统一接入，浏览器 snapshot 在 browser_pool 里接入
+"""
+
+import asyncio
+import threading
+import time
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+import config
+
+OK = "ok"
+THROTTLED = "throttled"
+NEUTRAL = "neutral"  # 网络异常、5xx 等，不调整速率
+
+SLOT_POLL = 0.05  # 并发已满时的等待间隔（秒）
+
+
+def expects_json(url: str) -> bool:
+    """是否是应当返回 JSON 的接口（首页、行情等返回 HTML/文本是正常的）"""
+    path = urlparse(url).path
+    return path.endswith('.json') or path.startswith('/query/')
+
+
+def classify_response(resp) -> str:
+    """根据响应判断是否被限流"""
+    if resp.status_code == 429:
+        return THROTTLED
+    if resp.status_code >= 500:
+        return NEUTRAL
+    if resp.status_code == 200 and expects_json(resp.url or ''):
+        content_type = resp.headers.get('content-type', '')
+        if 'json' not in content_type:
+            return THROTTLED  # 200 但返回 HTML，多半是 WAF 拦截页
+    return OK
+
+
+class HostState:
+    """单个 host 的速率 / 并发状态"""
+
+    def __init__(self, rate: float, concurrency: float):
+        self.rate = rate
+        self.concurrency = concurrency
+        self.in_flight = 0
+        self.next_at = 0.0  # 下一个请求最早的发出时间
+        self.last_decrease = 0.0
+        self.ok = 0
+        self.throttled = 0
+
+
+class AIMDController:
+    """按 host 的 AIMD 速率 / 并发控制器（线程安全，同步 / asyncio 均可用）"""
+
+    def __init__(self, initial_rate: float = config.AIMD_INITIAL_RATE,
+                 min_rate: float = config.AIMD_MIN_RATE,
+                 max_rate: float = config.AIMD_MAX_RATE,
+                 rate_step: float = config.AIMD_RATE_STEP,
+                 initial_concurrency: int = config.AIMD_INITIAL_CONCURRENCY,
+                 max_concurrency: int = config.AIMD_MAX_CONCURRENCY,
+                 decrease: float = config.AIMD_DECREASE,
+                 cooldown: float = config.AIMD_COOLDOWN):
+        self.initial_rate = initial_rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.rate_step = rate_step
+        self.initial_concurrency = initial_concurrency
+        self.max_concurrency = max_concurrency
+        self.decrease = decrease
+        self.cooldown = cooldown
+
+        self.lock = threading.Lock()
+        self.hosts: Dict[str, HostState] = {}
+
+    def _state(self, host: str) -> HostState:
+        state = self.hosts.get(host)
+        if state is None:
+            state = HostState(self.initial_rate, float(self.initial_concurrency))
+            self.hosts[host] = state
+        return state
+
+    def reserve(self, url: str) -> float:
+        """
+        尝试占一个请求名额
+
+        Returns:
+            0 表示已占到，否则为建议等待的秒数
+        """
+        host = urlparse(url).netloc
+        with self.lock:
+            state = self._state(host)
+            now = time.monotonic()
+            if state.in_flight >= int(state.concurrency):
+                return SLOT_POLL
+            if now < state.next_at:
+                return state.next_at - now
+            state.in_flight += 1
+            state.next_at = now + 1.0 / state.rate
+            return 0.0
+
+    def acquire(self, url: str):
+        """阻塞直到可以发请求（线程里用）"""
+        while True:
+            wait = self.reserve(url)
+            if wait <= 0:
+                return
+            time.sleep(wait)
+
+    async def acquire_async(self, url: str):
+        """异步版 acquire"""
+        while True:
+            wait = self.reserve(url)
+            if wait <= 0:
+                return
+            await asyncio.sleep(wait)
+
+    def release(self, url: str, outcome: str = NEUTRAL):
+        """请求结束，归还名额并按结果调整速率"""
+        host = urlparse(url).netloc
+        with self.lock:
+            state = self._state(host)
+            state.in_flight = max(state.in_flight - 1, 0)
+            self._feedback(state, outcome)
+
+    def _feedback(self, state: HostState, outcome: str):
+        if outcome == OK:
+            state.ok += 1
+            # 加性增：约每秒 +rate_step，每轮（concurrency 个请求）并发 +1
+            state.rate = min(self.max_rate, state.rate + self.rate_step / max(state.rate, 1.0))
+            state.concurrency = min(self.max_concurrency, state.concurrency + 1.0 / state.concurrency)
+        elif outcome == THROTTLED:
+            state.throttled += 1
+            now = time.monotonic()
+            if now - state.last_decrease < self.cooldown:
+                return
+            # 乘性减
+            state.rate = max(self.min_rate, state.rate * self.decrease)
+            state.concurrency = max(1.0, state.concurrency * self.decrease)
+            state.last_decrease = now
+            state.next_at = now + 1.0 / state.rate
+            print(f"   🐢 限流，降速到 {state.rate:.2f} rps / 并发 {int(state.concurrency)}")
+
+    def stats(self) -> Dict[str, Dict]:
+        """各 host 当前速率 / 并发 / 计数"""
+        with self.lock:
+            return {host: {
+                'rate': round(state.rate, 2),
+                'concurrency': int(state.concurrency),
+                'ok': state.ok,
+                'throttled': state.throttled,
+            } for host, state in self.hosts.items()}
+
+
+_controller: Optional[AIMDController] = None
+_controller_lock = threading.Lock()
+
+
+def get_controller() -> AIMDController:
+    """进程级共享的限速控制器"""
+    global _controller
+    with _controller_lock:
+        if _controller is None:
+            _controller = AIMDController()
+        return _controller
+
+
+if __name__ == "__main__":
+    # 模拟：站点最多容忍 10 rps，观察速率收敛（锯齿形贴近上限）
+    limit = 10
+    controller = AIMDController(initial_rate=2.0, rate_step=2.0, max_rate=50, cooldown=0.5)
+    url = 'https://xueqiu.com/query/v1/symbol/search/status'
+    window = []
+    start = time.monotonic()
+
+    print(f"🧪 模拟站点上限 {limit} rps（超过返回429）")
+    for i in range(200):
+        controller.acquire(url)
+        now = time.monotonic()
+        window = [t for t in window if now - t < 1.0] + [now]
+        controller.release(url, THROTTLED if len(window) > limit else OK)
+        if i % 50 == 49:
+            print(f"   {now - start:5.1f}s: {controller.stats()}")
@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+原始响应归档（审计 + 不联网重新标准化）
+策略：
+1. 只追加，不覆盖：每天一个 .rawlog 数据文件 + 一个 .idx 索引文件
+2. 每条记录 = 4字节长度 + 1字节压缩方式 + 压缩后的 (4字节元数据长度 + 元数据JSON + 响应原始字节)
+3. 每条单独压缩（有 zstandard 用 zstd，没有退回 zlib/deflate），可以按偏移量直接读某一条
+4. 索引每行一条 JSON（symbol / ts / offset / length / kind / status），按股票和时间筛选不用解压数据文件
+5. 默认关闭，XUEQIU_RAW_CAPTURE=1 开启；回放模式下不归档
+6. 同一天的文件可能被多个进程同时追加（work_queue 的 worker），取偏移、写数据、写索引整个过程持有文件锁（flock）
+
+使用:
+    XUEQIU_RAW_CAPTURE=1 python run.py --fetch
+    python raw_archive.py                       # 各天 / 各股票的记录数
+    python raw_archive.py SH600118              # 列出某只股票的记录
+    python raw_archive.py --renormalize         # 从归档重新生成 /tmp/xueqiu_normalized.jsonl
+"""
+
+import atexit
+import fcntl
+import json
+import os
+import struct
+import threading
+import time
+import zlib
+from typing import Dict, Iterator, List, Optional, Tuple
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+import cassette
+import config
+
+CODEC_NONE = 0
+CODEC_ZLIB = 1
+CODEC_ZSTD = 2
+
+_HEADER = struct.Struct('>IB')  # 记录长度（不含头）+ 压缩方式
+_META_LEN = struct.Struct('>I')
+
+
+def _compress(data: bytes, codec: int) -> bytes:
+    if codec == CODEC_ZSTD:
+        return zstandard.ZstdCompressor(level=3).compress(data)
+    if codec == CODEC_ZLIB:
+        return zlib.compress(data, 6)
+    return data
+
+
+def _decompress(data: bytes, codec: int) -> bytes:
+    if codec == CODEC_ZSTD:
+        if zstandard is None:
+            raise RuntimeError("该记录是 zstd 压缩的，需要安装 zstandard")
+        return zstandard.ZstdDecompressor().decompress(data)
+    if codec == CODEC_ZLIB:
+        return zlib.decompress(data)
+    return data
+
+
+def _day(ts: float) -> str:
+    return time.strftime('%Y%m%d', time.localtime(ts))
+
+
+class RawArchive:
+    """按天分文件的只追加归档（线程安全，多进程靠 flock）"""
+
+    def __init__(self, directory: str = config.RAW_ARCHIVE_DIR, codec: str = config.RAW_ARCHIVE_CODEC):
+        self.directory = directory
+        self.codec = CODEC_ZSTD if codec == 'zstd' and zstandard is not None else CODEC_ZLIB
+        self.lock = threading.Lock()
+        self._files: Dict[str, Tuple] = {}  # day -> (数据文件, 索引文件)
+
+    def _paths(self, day: str) -> Tuple[str, str]:
+        base = os.path.join(self.directory, day)
+        return base + '.rawlog', base + '.idx'
+
+    def _open(self, day: str):
+        files = self._files.get(day)
+        if files is None:
+            # 跨天后关掉旧文件
+            self.close()
+            os.makedirs(self.directory, exist_ok=True)
+            data_path, index_path = self._paths(day)
+            files = (open(data_path, 'ab'), open(index_path, 'a', encoding='utf-8'))
+            self._files[day] = files
+        return files
+
+    def append(self, meta: Dict, body: bytes) -> Dict:
+        """
+        追加一条记录
+
+        Args:
+            meta: 请求元数据（kind / symbol / url / status / content_type ...）
+            body: 响应原始字节
+
+        Returns:
+            索引条目
+        """
+        meta = dict(meta, ts=meta.get('ts') or time.time())
+        meta_bytes = json.dumps(meta, ensure_ascii=False).encode('utf-8')
+        payload = _compress(_META_LEN.pack(len(meta_bytes)) + meta_bytes + body, self.codec)
+        day = _day(meta['ts'])
+
+        with self.lock:
+            data_file, index_file = self._open(day)
+            # 别的进程可能在同时追加：锁住数据文件，取偏移到写完索引之间不能插进别人的记录
+            fcntl.flock(data_file, fcntl.LOCK_EX)
+            try:
+                offset = data_file.seek(0, os.SEEK_END)
+                data_file.write(_HEADER.pack(len(payload), self.codec) + payload)
+                data_file.flush()
+
+                entry = {
+                    'day': day,
+                    'offset': offset,
+                    'length': _HEADER.size + len(payload),
+                    'ts': round(meta['ts'], 3),
+                    'symbol': meta.get('symbol'),
+                    'kind': meta.get('kind'),
+                    'status': meta.get('status'),
+                    'size': len(body),
+                }
+                index_file.write(json.dumps(entry, ensure_ascii=False) + '\n')
+                index_file.flush()
+            finally:
+                fcntl.flock(data_file, fcntl.LOCK_UN)
+        return entry
+
+    def close(self):
+        for data_file, index_file in self._files.values():
+            data_file.close()
+            index_file.close()
+        self._files = {}
+
+    # ---------- 读取 ----------
+
+    def days(self) -> List[str]:
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(name[:-4] for name in os.listdir(self.directory) if name.endswith('.idx'))
+
+    def find(self, symbol: Optional[str] = None, since: Optional[float] = None,
+             until: Optional[float] = None, kind: Optional[str] = None) -> Iterator[Dict]:
+        """按股票 / 时间 / 类型筛选索引条目（只读索引文件）"""
+        for day in self.days():
+            if since and day < _day(since):
+                continue
+            if until and day > _day(until):
+                continue
+            _, index_path = self._paths(day)
+            with open(index_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # 写到一半的最后一行
+                    if symbol and entry.get('symbol') != symbol:
+                        continue
+                    if kind and entry.get('kind') != kind:
+                        continue
+                    if since and entry['ts'] < since:
+                        continue
+                    if until and entry['ts'] > until:
+                        continue
+                    yield entry
+
+    def read(self, entry: Dict) -> Tuple[Dict, bytes]:
+        """按索引条目读出 (元数据, 响应字节)"""
+        data_path, _ = self._paths(entry['day'])
+        with open(data_path, 'rb') as f:
+            f.seek(entry['offset'])
+            raw = f.read(entry['length'])
+        length, codec = _HEADER.unpack_from(raw)
+        payload = _decompress(raw[_HEADER.size:_HEADER.size + length], codec)
+        (meta_len,) = _META_LEN.unpack_from(payload)
+        meta = json.loads(payload[_META_LEN.size:_META_LEN.size + meta_len].decode('utf-8'))
+        return meta, payload[_META_LEN.size + meta_len:]
+
+    def iter_posts(self, symbol: Optional[str] = None, since: Optional[float] = None,
+                   until: Optional[float] = None) -> Iterator[Tuple[str, List[Dict]]]:
+        """逐条 yield 归档里讨论列表的 (symbol, 原始帖子)，用于重新标准化"""
+        for entry in self.find(symbol, since, until, kind='status'):
+            meta, body = self.read(entry)
+            try:
+                data = json.loads(body.decode('utf-8'))
+            except ValueError:
+                continue
+            posts = data.get('list') or data.get('statuses') or []
+            if posts:
+                yield meta.get('symbol'), posts
+
+
+_archive: Optional[RawArchive] = None
+_archive_lock = threading.Lock()
+
+
+def get_archive() -> RawArchive:
+    """获取进程级共享的归档（进程退出时关闭文件）"""
+    global _archive
+    with _archive_lock:
+        if _archive is None:
+            _archive = RawArchive()
+            atexit.register(_archive.close)
+        return _archive
+
+
+def capture(resp, symbol: Optional[str], kind: str):
+    """
+    归档一个 requests 响应（未开启 RAW_CAPTURE 或回放时什么都不做）
+
+    Args:
+        kind: status（讨论列表）/ waf（拦截页）等
+    """
+    if not config.RAW_CAPTURE or cassette.replaying():
+        return
+    try:
+        get_archive().append({
+            'kind': kind,
+            'symbol': symbol,
+            'method': resp.request.method if resp.request is not None else 'GET',
+            'url': resp.url,
+            'status': resp.status_code,
+            'content_type': resp.headers.get('content-type', ''),
+            'elapsed': round(resp.elapsed.total_seconds(), 3),
+        }, resp.content)
+    except OSError as e:
+        print(f"   ⚠️ 原始响应归档失败: {e}")
+
+
+if __name__ == "__main__":
+    import sys
+    from collections import Counter
+
+    archive = get_archive()
+    args = sys.argv[1:]
+
+    if '--renormalize' in args:
+        from normalize import SortedJsonlWriter, normalize_status
+
+        print(f"🔧 从归档重新标准化: {archive.directory}")
+        with SortedJsonlWriter() as writer:
+            for symbol, posts in archive.iter_posts():
+                writer.extend(normalize_status(post, symbol) for post in posts)
+    elif args:
+        symbol = args[0]
+        for entry in archive.find(symbol=symbol):
+            print(f"   {time.strftime('%m-%d %H:%M:%S', time.localtime(entry['ts']))} "
+                  f"[{entry['kind']}] {entry['status']} {entry['size']} 字节")
+    else:
+        codec = 'zstd' if archive.codec == CODEC_ZSTD else 'zlib'
+        print(f"📦 原始响应归档: {archive.directory} ({codec}, 采集{'开启' if config.RAW_CAPTURE else '关闭'})")
+        by_day: Dict[str, List[Dict]] = {}
+        for entry in archive.find():
+            by_day.setdefault(entry['day'], []).append(entry)
+        for day, entries in by_day.items():
+            data_path, _ = archive._paths(day)
+            raw_size = sum(e['size'] for e in entries)
+            disk_size = os.path.getsize(data_path)
+            symbols = Counter(e['symbol'] for e in entries)
+            print(f"   {day}: {len(entries)} 条, {len(symbols)} 只股票, "
+                  f"原始 {raw_size // 1024} KB → 磁盘 {disk_size // 1024} KB")
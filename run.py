@@ -13,85 +13,294 @@
 使用:
     python run.py              # 完整流程
     python run.py --fetch      # 仅抓取
+    python run.py --concurrent # 使用并发抓取引擎
+    python run.py --incremental # 增量抓取（只抓上次之后的新帖）
+    python run.py --adaptive   # 按活跃度调度：只抓到期的股票，热门股翻页更深
+    python run.py --market-aware # 按交易时段调整翻页深度和LLM分析条数
+    python run.py --backend auto # 直连优先，被 WAF 拦截的股票自动改走浏览器（见 fetch_backend.py）
+    python run.py --workers 4  # 走 SQLite 工作队列，4 个 worker 进程分片抓取（见 work_queue.py）
     python run.py --analyze    # 仅分析
     python run.py --signals    # 仅生成信号
     python run.py --top10      # 仅聚合Top10
     python run.py --send       # 仅推送
+    python run.py --record     # 联网运行并录制所有响应（默认 /tmp/xueqiu_cassette.jsonl.gz）
+    python run.py --replay     # 从录制文件离线回放（不推送）
+    python run.py --daemon --market-aware  # 常驻进程：按交易时段循环抓取 / 分析 / 信号（SIGTERM 优雅退出）
 """
 
 import sys
 import os
 import json
+import time
+import signal
 import argparse
+import threading
 from datetime import datetime
+from typing import Dict, List
 
 # 添加项目路径
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from config import SYMBOLS
+import cassette
+from config import (SYMBOLS, CASSETTE_FILE, CRAWL_CONCURRENCY, CRAWL_MAX_PAGES, LIVENEWS_COUNT, FETCH_STAGE_TIMEOUT,
+                    DAEMON_HEALTH_FILE, DAEMON_RETENTION_HOURS, DAEMON_SEND_INTERVAL, DAEMON_MIN_SLEEP)
 
-def step_fetch():
-    """Step 1: 抓取数据"""
+NORMALIZED_FILE = "/tmp/xueqiu_normalized.jsonl"
+ANALYZED_FILE = "/tmp/xueqiu_analyzed.jsonl"
+
+def load_jsonl(filename: str) -> List[Dict]:
+    """读取 JSONL 文件（跳过空行）"""
+    items = []
+    with open(filename, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                items.append(json.loads(line))
+    return items
+
+def load_analyzed() -> List[Dict]:
+    """读分析结果：优先列式存储（按需 mmap 列，不逐行解析 JSON），没有就读分析文件"""
+    from column_store import has_analyzed, load_analyzed as load_columns
+    
+    if has_analyzed():
+        return load_columns()
+    return load_jsonl(ANALYZED_FILE) if os.path.exists(ANALYZED_FILE) else []
+
+def recent_analyzed(filename: str = ANALYZED_FILE) -> Dict[str, Dict]:
+    """分析文件里保留窗口内的旧结果 {post_key: 数据}"""
+    from seen_filter import post_key
+    
+    cutoff = cassette.now() - DAEMON_RETENTION_HOURS * 3600
+    previous = {}
+    if os.path.exists(filename):
+        for item in load_jsonl(filename):
+            if (item.get("timestamp") or 0) >= cutoff:
+                previous[post_key(item)] = item
+    return previous
+
+def merge_analyzed(enriched: List[Dict], filename: str = ANALYZED_FILE) -> List[Dict]:
+    """本轮结果并入分析文件里保留窗口内的旧结果（同一条以本轮为准），按时间倒序"""
+    from seen_filter import post_key
+    
+    merged = recent_analyzed(filename)
+    merged.update((post_key(item), item) for item in enriched)
+    return sorted(merged.values(), key=lambda item: item.get("timestamp") or 0, reverse=True)
+
+def fetch_status_all(on_page, concurrent: bool = False, incremental: bool = False,
+                     symbols: list = SYMBOLS, page_depth: dict = None, max_pages: int = None,
+                     workers: int = 0, backend: str = "http", deadline: float = None) -> int:
+    """
+    抓取股票讨论，每抓到一页就回调 on_page(symbol, 帖子)
+    
+    Args:
+        page_depth: {symbol: 翻页数}（按活跃度调度时由 poll_scheduler 给出，只对并发引擎生效）
+        max_pages: 每只股票最大翻页数（按交易时段调整时由 market_calendar 给出）
+        workers: 大于 0 时走 work_queue，起这么多个 worker 进程分片抓取
+        backend: http 直连；auto 由 fetch_backend 路由，被 WAF 拦截的股票改走浏览器
+        deadline: 时限（time.time() 时间戳）：到点各条路径都停止翻页，已抓到的照常回调
+    
+    Returns:
+        抓到的讨论条数
+    """
+    import checkpoint
+    from fetch_status import fetch_discussions
+    
+    total = 0
+    
+    def expired():
+        return deadline is not None and time.time() >= deadline
+    
+    def count_page(symbol, posts):
+        nonlocal total
+        total += len(posts)
+        on_page(symbol, posts)
+    
+    print(f"\n🐣 抓取 {len(symbols)} 只股票的讨论...")
+    checkpoint.begin()  # 中途挂掉的话，下次从检查点接着翻
+    if workers:
+        from work_queue import crawl_distributed
+        crawl_distributed(symbols, workers, on_page=count_page, page_depth=page_depth, max_pages=max_pages,
+                          deadline=deadline)
+    elif concurrent:
+        from crawler import crawl_symbols
+        router = None
+        if backend == "auto":
+            from fetch_backend import get_router
+            router = get_router()
+        crawl_symbols(symbols, max_pages=max_pages, incremental=incremental,
+                      on_page=count_page, page_depth=page_depth, router=router, deadline=deadline)
+    elif backend == "auto":
+        from fetch_backend import fetch_discussions_24h
+        for symbol in symbols:
+            if expired():
+                break
+            fetch_discussions_24h(symbol, max_pages=max_pages or CRAWL_MAX_PAGES,
+                                  incremental=incremental, on_page=count_page, deadline=deadline)
+    elif incremental:
+        from fetch_status_v2 import fetch_discussions_24h
+        for symbol in symbols:
+            if expired():
+                break
+            fetch_discussions_24h(symbol, max_pages=max_pages or 10, incremental=True, on_page=count_page,
+                                  deadline=deadline)
+    else:
+        for symbol in symbols:
+            if expired():
+                break
+            count_page(symbol, fetch_discussions(symbol))
+    
+    # 整轮抓完才清掉断点（中途挂掉或到了时限，下次按检查点续抓）
+    if expired():
+        print(f"   ⏱️ 到达抓取时限，本轮讨论只抓到 {total} 条")
+    else:
+        checkpoint.complete()
+    return total
+
+def step_fetch(concurrent: bool = False, incremental: bool = False, adaptive: bool = False,
+               max_pages: int = None, workers: int = 0, backend: str = "http"):
+    """Step 1: 抓取数据（讨论、快讯、行情预取同时进行，讨论边抓边标准化写盘）"""
     print("\n" + "=" * 60)
     print("📥 Step 1: 抓取雪球数据")
     print("=" * 60)
     
-    from fetch_status import fetch_discussions
+    symbols, page_depth = SYMBOLS, None
+    if adaptive:
+        # 按活跃度只抓到期的股票，翻页深度各不相同（走并发引擎）
+        from poll_scheduler import get_scheduler
+        scheduler = get_scheduler()
+        if max_pages:
+            scheduler.max_pages = max_pages
+        plan = scheduler.plan(SYMBOLS)
+        symbols, page_depth = [s for s, _ in plan], dict(plan)
+        concurrent = concurrent or not workers
+        print(f"\n🗓️ 本轮到期 {len(symbols)}/{len(SYMBOLS)} 只股票, 共 {sum(page_depth.values())} 页")
+    
+    from concurrent.futures import ThreadPoolExecutor
     from fetch_livenews import fetch_livenews
-    from normalize import save_normalized_data
-    
-    # 抓取个股讨论
-    print(f"\n🐣 抓取 {len(SYMBOLS)} 只股票的讨论...")
-    status_data = []
-    for symbol in SYMBOLS:
-        posts = fetch_discussions(symbol)
-        status_data.extend(posts)
-    
-    print(f"   获取 {len(status_data)} 条讨论")
-    
-    # 抓取快讯
-    print("\n📰 抓取雪球快讯...")
-    livenews_data = fetch_livenews(50)
-    print(f"   获取 {len(livenews_data)} 条快讯")
-    
-    # 标准化
-    from normalize import normalize_all
+    from normalize import SortedJsonlWriter, iter_normalized, normalize_status
+    from quotes import get_quotes
+    from seen_filter import get_filter
+    from session_pool import get_pool
+    
+    # 快讯和讨论同时借 session，池子至少要多留一个
+    get_pool().ensure_size(CRAWL_CONCURRENCY + 1)
+    
+    # 每页讨论到手就标准化，交给有界内存的归并写出
+    writer = SortedJsonlWriter()
+    
+    seen_times = {symbol: [] for symbol in symbols}  # 各股票抓到的发帖时间，用于更新活跃度
+    seen = get_filter()  # 以前轮次处理过的帖子不再标准化 / 分析
+    skipped = []
+    
+    def on_page(symbol, posts):
+        seen_times[symbol].extend(post.get("created_at") or 0 for post in posts)
+        if seen:
+            fresh = [post for post in posts if not seen.seen(f"status:{post.get('id')}")]
+            skipped.append(len(posts) - len(fresh))
+            posts = fresh
+        writer.extend(normalize_status(post, symbol) for post in posts)
+    
+    # 三个来源互不依赖，并行抓取，总耗时取决于最慢的一个
+    # 时限传进各条抓取路径，到点停止翻页后线程自己结束（不丢下还在跑的线程往已关闭的 writer 里写）
+    deadline = time.time() + FETCH_STAGE_TIMEOUT
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        futures = {
+            executor.submit(fetch_status_all, on_page, concurrent, incremental, symbols, page_depth, max_pages,
+                            workers, backend, deadline): "讨论",
+            executor.submit(fetch_livenews, LIVENEWS_COUNT, deadline): "快讯",
+            executor.submit(get_quotes, SYMBOLS): "行情",  # 预热行情缓存，signals / top10 直接命中
+        }
+    if time.time() >= deadline:
+        print(f"   ⚠️ 抓取到达时限（{FETCH_STAGE_TIMEOUT}s），没翻完的页下一轮再抓")
+    
+    results = {}
+    for future, name in futures.items():
+        try:
+            results[name] = future.result()
+        except Exception as e:
+            print(f"   ❌ {name}抓取失败: {e}")
+    
+    livenews_data = results.get("快讯", [])
+    if seen:
+        fresh = [item for item in livenews_data if not seen.seen(f"livenews:{item.get('id')}")]
+        skipped.append(len(livenews_data) - len(fresh))
+        livenews_data = fresh
+    if adaptive and "讨论" in results:
+        for symbol, times in seen_times.items():
+            scheduler.observe(symbol, times)
+        scheduler.save()
+    print(f"\n   获取 {results.get('讨论', 0)} 条讨论, {len(livenews_data)} 条新快讯, "
+          f"{len(results.get('行情', {}))} 只股票行情")
+    if sum(skipped):
+        print(f"   🧾 跳过以前处理过的 {sum(skipped)} 条")
+    
+    # 快讯并入后归并写出
     print("\n🔧 标准化数据...")
-    normalized = normalize_all(status_data, livenews_data, SYMBOLS)
-    print(f"   标准化 {len(normalized)} 条")
-    
-    # 保存
-    save_normalized_data(normalized)
-    
-    return len(normalized)
+    writer.extend(iter_normalized([], livenews_data))
+    return writer.close()
 
-def step_analyze():
-    """Step 2: LLM分析"""
+def step_analyze(limit: int = 50, items: List[Dict] = None, save: bool = True) -> List[Dict]:
+    """
+    Step 2: LLM分析
+    
+    Args:
+        limit: 本轮最多分析条数
+        items: 待分析数据（不传则读标准化文件）
+        save: 是否写出分析文件（守护进程合并后自己写）
+    
+    Returns:
+        带分析结果和权重的数据
+    """
     print("\n" + "=" * 60)
     print("🧠 Step 2: LLM舆情分析")
     print("=" * 60)
     
-    normalized_file = "/tmp/xueqiu_normalized.jsonl"
+    if items is None:
+        if not os.path.exists(NORMALIZED_FILE):
+            print("⚠️ 没有找到标准化数据，请先运行 --fetch")
+            return []
+        items = load_jsonl(NORMALIZED_FILE)
     
-    if not os.path.exists(normalized_file):
-        print("⚠️ 没有找到标准化数据，请先运行 --fetch")
-        return 0
+    print(f"📥 加载 {len(items)} 条数据")
     
-    # 读取数据
-    items = []
-    with open(normalized_file, "r", encoding="utf-8") as f:
-        for line in f:
-            if line.strip():
-                items.append(json.loads(line))
+    from seen_filter import get_filter, post_key
     
-    print(f"📥 加载 {len(items)} 条数据")
+    seen = get_filter()
+    if seen:
+        fresh = seen.filter_new(items, post_key)
+        if len(fresh) < len(items):
+            print(f"🧾 跳过以前处理过的 {len(items) - len(fresh)} 条，剩 {len(fresh)} 条")
+        items = fresh
+    
+    if limit <= 0:
+        print("⏭️ 本时段不做LLM分析")
+        return []
+    
+    # 近似重复（转发、复制的组合帖、多只股票下重复的快讯）只分析一次
+    from near_dup import analyzed_ok, collapse, processed, remember
+    
+    candidates = collapse(items)
     
     # 分析
     from analyze import batch_analyze, enrich_with_weights, save_analyzed_data
+    from column_store import has_analyzed, save_analyzed
     
-    analyzed = batch_analyze(items, limit=50)
+    analyzed = batch_analyze(candidates, limit=limit)
+    # 分析失败的（LLM 临时不可用等）不入近似重复索引，否则之后同样内容的帖子都会被跳过
+    remember(item for item in analyzed if analyzed_ok(item))
     enriched = enrich_with_weights(analyzed)
-    save_analyzed_data(enriched)
+    if seen:
+        # 分析成功的和对应那条已分析的近似重复记为已处理；分析失败、超出本轮条数上限的（连同它的重复）下轮再分析
+        seen.add_all(post_key(item) for item in processed(items))
+        seen.flush()
+    if save:
+        # 只分析了新帖，以前轮次的结果要并进来，signals / top10 才看得到完整窗口
+        merged = merge_analyzed(enriched) if seen else enriched
+        save_analyzed_data(merged)
+        # 列式存储：只分析了新帖时追加一个段；还没有段（第一次）或没开过滤时整体写入
+        if seen and has_analyzed():
+            save_analyzed(enriched)
+        else:
+            save_analyzed(merged, append=False)
     
     # 统计
     positive = len([i for i in enriched if i.get("analysis", {}).get("sentiment") == "多"])
@@ -103,32 +312,26 @@ def step_analyze():
     print(f"   🔴 空: {negative} 条")
     print(f"   ⚪ 中: {neutral} 条")
     
-    return len(enriched)
+    return enriched
 
-def step_signals():
-    """Step 3: 生成信号"""
+def step_signals(items: List[Dict] = None):
+    """Step 3: 生成信号（items 不传则读列式存储 / 分析文件）"""
     print("\n" + "=" * 60)
     print("🚨 Step 3: 生成交易信号")
     print("=" * 60)
     
-    analyzed_file = "/tmp/xueqiu_analyzed.jsonl"
-    
-    if not os.path.exists(analyzed_file):
-        print("⚠️ 没有找到分析数据，请先运行 --fetch --analyze")
-        return 0
-    
-    # 读取
-    items = []
-    with open(analyzed_file, "r", encoding="utf-8") as f:
-        for line in f:
-            if line.strip():
-                items.append(json.loads(line))
+    if items is None:
+        items = load_analyzed()
+        if not items:
+            print("⚠️ 没有找到分析数据，请先运行 --fetch --analyze")
+            return 0
     
     print(f"📥 加载 {len(items)} 条分析数据")
     
     # 获取价格
     from signals import SentimentSignals, get_price_changes
-    price_changes = get_price_changes(SYMBOLS)
+    from symbol_tagger import mentioned_symbols
+    price_changes = get_price_changes(mentioned_symbols(items))
     print(f"📈 获取 {len(price_changes)} 只股票价格")
     
     # 检测信号
@@ -147,36 +350,30 @@ def step_signals():
     
     return len(signals)
 
-def step_top10():
-    """Step 4: 生成Top10"""
+def step_top10(items: List[Dict] = None):
+    """Step 4: 生成Top10（items 不传则读列式存储 / 分析文件）"""
     print("\n" + "=" * 60)
     print("📊 Step 4: 生成Top10舆情")
     print("=" * 60)
     
-    analyzed_file = "/tmp/xueqiu_analyzed.jsonl"
-    
-    if not os.path.exists(analyzed_file):
-        print("⚠️ 没有找到分析数据，请先运行 --fetch --analyze")
-        return 0
-    
-    # 读取
-    items = []
-    with open(analyzed_file, "r", encoding="utf-8") as f:
-        for line in f:
-            if line.strip():
-                items.append(json.loads(line))
+    if items is None:
+        items = load_analyzed()
+        if not items:
+            print("⚠️ 没有找到分析数据，请先运行 --fetch --analyze")
+            return 0
     
     print(f"📥 加载 {len(items)} 条分析数据")
     
     # 聚合
     from top10 import aggregate_by_symbol, generate_top10
     from signals import get_price_changes
+    from symbol_tagger import mentioned_symbols
     
     aggregated = aggregate_by_symbol(items)
     print(f"📊 聚合为 {len(aggregated)} 只股票")
     
     # 获取价格
-    price_changes = get_price_changes(SYMBOLS)
+    price_changes = get_price_changes(mentioned_symbols(items))
     
     # 生成Top10
     top10 = generate_top10(aggregated, price_changes, limit=10)
@@ -213,6 +410,181 @@ def step_send():
     
     return success
 
+class DaemonState:
+    """守护进程跨轮次保留的内存状态：已分析的数据、已处理过的帖子、运行统计"""
+    
+    def __init__(self, retention_hours: float = DAEMON_RETENTION_HOURS):
+        self.retention = retention_hours * 3600
+        self.analyzed: Dict[str, Dict] = {}  # key -> 带分析结果的数据
+        self.done: Dict[str, int] = {}  # 已分析过的 key -> 发帖时间（含被判为噪音的）
+        self.started = time.time()
+        self.cycles = 0
+        self.errors = 0
+        self.last_error = ""
+        self.last_start = 0.0
+        self.last_end = 0.0
+        self.last_send = 0.0
+        self.last_stats: Dict = {}
+        self.next_run = 0.0
+        self.phase = ""
+    
+    @staticmethod
+    def key(item: Dict) -> str:
+        return f"{item.get('type')}:{item.get('id')}"
+    
+    def pending(self, items: List[Dict]) -> List[Dict]:
+        """还没分析过的数据"""
+        return [item for item in items if self.key(item) not in self.done]
+    
+    def merge(self, attempted: List[Dict], enriched: List[Dict]):
+        from near_dup import processed
+        
+        # 被折叠的近似重复只有在对应那条分析过时才算处理过（见 near_dup.processed）
+        for item in processed(attempted):
+            self.done[self.key(item)] = item.get("timestamp") or 0
+        for item in enriched:
+            self.analyzed[self.key(item)] = item
+        self.prune()
+    
+    def prune(self, now: float = None):
+        """丢掉超出保留窗口的数据，内存不随运行时间增长"""
+        cutoff = (now or time.time()) - self.retention
+        self.done = {k: ts for k, ts in self.done.items() if ts >= cutoff}
+        self.analyzed = {k: item for k, item in self.analyzed.items()
+                         if (item.get("timestamp") or 0) >= cutoff}
+    
+    def items(self) -> List[Dict]:
+        return list(self.analyzed.values())
+    
+    def health(self, status: str) -> Dict:
+        return {
+            "status": status,
+            "pid": os.getpid(),
+            "started": int(self.started),
+            "uptime": int(time.time() - self.started),
+            "cycles": self.cycles,
+            "errors": self.errors,
+            "last_error": self.last_error,
+            "last_cycle_start": int(self.last_start),
+            "last_cycle_end": int(self.last_end),
+            "last_cycle_seconds": round(self.last_end - self.last_start, 1) if self.last_end >= self.last_start else None,
+            "last_stats": self.last_stats,
+            "next_run": int(self.next_run),
+            "phase": self.phase,
+            "analyzed_in_memory": len(self.analyzed),
+        }
+
+def write_health(state: DaemonState, status: str, filename: str = DAEMON_HEALTH_FILE):
+    """写健康文件（先写临时文件再替换，外部检查不会读到半截）"""
+    tmp_file = filename + ".tmp"
+    try:
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            json.dump(state.health(status), f, ensure_ascii=False, indent=2)
+        os.replace(tmp_file, filename)
+    except OSError as e:
+        print(f"   ⚠️ 健康文件写入失败: {e}")
+
+def run_cycle(state: DaemonState, args, max_pages: int, llm_budget: int) -> Dict:
+    """守护进程的一轮：抓取 → 只分析新数据 → 和内存中的旧结果合并 → 信号 / Top10"""
+    from analyze import save_analyzed_data
+    from column_store import save_analyzed
+    
+    stats = {"fetched": step_fetch(concurrent=args.concurrent, incremental=args.incremental,
+                                   adaptive=args.adaptive, max_pages=max_pages, workers=args.workers, backend=args.backend)}
+    
+    fresh = state.pending(load_jsonl(NORMALIZED_FILE)) if os.path.exists(NORMALIZED_FILE) else []
+    enriched = step_analyze(limit=llm_budget, items=fresh, save=False)
+    state.merge(fresh, enriched)
+    stats["analyzed"] = len(enriched)
+    
+    items = state.items()
+    save_analyzed_data(items)
+    save_analyzed(items, append=False)
+    stats["signals"] = step_signals(items)
+    stats["top10"] = step_top10(items)
+    
+    if args.send and time.time() - state.last_send >= DAEMON_SEND_INTERVAL:
+        stats["sent"] = step_send()
+        state.last_send = time.time()
+    return stats
+
+def run_daemon(args):
+    """
+    常驻运行：session / Cookie / 行情缓存 / 浏览器标签页 / LLM 客户端 / 分析结果都留在进程里，
+    每轮只做增量工作。两轮间隔按交易时段（--interval 可固定），SIGTERM / SIGINT 在当前步骤结束后退出
+    """
+    from market_calendar import MarketCalendar, PHASE_NAMES
+    
+    calendar = MarketCalendar()
+    state = DaemonState()
+    # 接着以前的结果（比如先跑过 --all）：已处理过的帖子会被 seen 过滤跳过，
+    # 不先载入的话第一轮就会用只含新帖的结果覆盖分析文件和列式存储
+    previous = list(recent_analyzed().values())
+    state.merge(previous, previous)
+    if previous:
+        print(f"📥 载入保留窗口内的分析结果 {len(state.analyzed)} 条")
+    stop = threading.Event()
+    
+    def request_stop(signum, frame):
+        if stop.is_set():
+            # 第二次信号：不再等当前步骤
+            raise KeyboardInterrupt
+        print(f"\n🛑 收到信号 {signum}，本轮结束后退出（再按一次强制退出）")
+        stop.set()
+    
+    signal.signal(signal.SIGTERM, request_stop)
+    signal.signal(signal.SIGINT, request_stop)
+    
+    print(f"\n🔁 守护模式启动 (pid {os.getpid()}) | 健康文件: {DAEMON_HEALTH_FILE}")
+    write_health(state, "starting")
+    
+    try:
+        while not stop.is_set():
+            phase = calendar.phase()
+            profile = calendar.profile()
+            max_pages, llm_budget = None, 50
+            if args.market_aware:
+                max_pages, llm_budget = profile["pages"], profile["llm_budget"]
+            
+            state.phase = phase
+            state.cycles += 1
+            state.last_start = time.time()
+            print(f"\n🔁 第 {state.cycles} 轮 | {PHASE_NAMES[phase]} | {datetime.now().strftime('%H:%M:%S')}")
+            write_health(state, "running")
+            
+            try:
+                state.last_stats = run_cycle(state, args, max_pages, llm_budget)
+                state.last_error = ""
+            except Exception as e:
+                # 单轮失败不退出，下一轮重试
+                state.errors += 1
+                state.last_error = f"{type(e).__name__}: {e}"
+                print(f"   ❌ 本轮失败: {state.last_error}")
+            state.last_end = time.time()
+            
+            if stop.is_set() or (args.cycles and state.cycles >= args.cycles):
+                break
+            
+            # 下一轮：固定间隔，或按交易时段间隔（不跨时段切换）；按活跃度调度时最近一只股票到期就跑
+            if args.interval:
+                wait = max(state.last_start + args.interval - time.time(), 0.0)
+            else:
+                wait = calendar.wait_seconds(state.last_start)
+                if args.adaptive:
+                    from poll_scheduler import get_scheduler
+                    wait = min(wait, get_scheduler().next_due(SYMBOLS))
+                wait = max(wait, DAEMON_MIN_SLEEP)
+            state.next_run = time.time() + wait
+            print(f"\n💤 本轮 {state.last_end - state.last_start:.1f}s, {state.last_stats} | {wait:.0f}s 后下一轮")
+            write_health(state, "sleeping")
+            stop.wait(wait)
+    except KeyboardInterrupt:
+        print("\n🛑 强制退出")
+    finally:
+        state.next_run = 0.0
+        write_health(state, "stopped")
+        print(f"\n👋 守护进程退出: {state.cycles} 轮, {state.errors} 轮失败")
+
 def main():
     parser = argparse.ArgumentParser(description="雪球舆情监控")
     parser.add_argument("--fetch", action="store_true", help="仅抓取数据")
@@ -221,6 +593,18 @@ def main():
     parser.add_argument("--top10", action="store_true", help="仅生成Top10")
     parser.add_argument("--send", action="store_true", help="仅推送")
     parser.add_argument("--all", action="store_true", help="完整流程")
+    parser.add_argument("--concurrent", action="store_true", help="使用并发抓取引擎")
+    parser.add_argument("--incremental", action="store_true", help="增量抓取（按水位线）")
+    parser.add_argument("--adaptive", action="store_true", help="按活跃度只抓到期的股票（热门勤刷、冷门少刷）")
+    parser.add_argument("--backend", choices=["http", "auto"], default="http",
+                        help="抓取后端：http 直连；auto 被 WAF 拦截时自动改走浏览器")
+    parser.add_argument("--workers", type=int, default=0, help="走工作队列，起 N 个 worker 进程分片抓取")
+    parser.add_argument("--market-aware", action="store_true", help="按A股交易时段调整翻页深度和LLM分析条数")
+    parser.add_argument("--daemon", action="store_true", help="常驻运行，按计划循环抓取 / 分析 / 信号")
+    parser.add_argument("--interval", type=float, metavar="SECONDS", help="守护模式固定轮次间隔（默认按交易时段）")
+    parser.add_argument("--cycles", type=int, default=0, help="守护模式跑几轮后退出（0 为一直运行）")
+    parser.add_argument("--record", nargs="?", const=CASSETTE_FILE, metavar="FILE", help="录制所有网络响应")
+    parser.add_argument("--replay", nargs="?", const=CASSETTE_FILE, metavar="FILE", help="从录制文件离线回放")
     
     args = parser.parse_args()
     
@@ -234,14 +618,41 @@ def main():
     print("=" * 60)
     print(f"📦 监控 {len(SYMBOLS)} 只股票: {', '.join(SYMBOLS)}")
     
+    if args.record and args.replay:
+        parser.error("--record 和 --replay 不能同时使用")
+    if args.record:
+        cassette.start(cassette.RECORD, args.record)
+    elif args.replay:
+        cassette.start(cassette.REPLAY, args.replay)
+    
+    if args.daemon:
+        if args.replay:
+            parser.error("--daemon 不支持 --replay")
+        run_daemon(args)
+        tape = cassette.get_cassette()
+        if tape:
+            print(f"\n📼 {tape.summary()}")
+            cassette.stop()
+        return
+    
+    # 按交易时段取参数（盘中深翻多分析，夜间 / 休市少抓少花）
+    max_pages, llm_budget = None, 50
+    if args.market_aware:
+        from market_calendar import MarketCalendar, PHASE_NAMES
+        calendar = MarketCalendar()
+        profile = calendar.profile()
+        max_pages, llm_budget = profile["pages"], profile["llm_budget"]
+        print(f"🕐 {PHASE_NAMES[calendar.phase()]}: 每股 {max_pages} 页, LLM 最多 {llm_budget} 条")
+    
     # 执行步骤
     stats = {}
     
     if args.fetch or args.all:
-        stats["fetched"] = step_fetch()
+        stats["fetched"] = step_fetch(concurrent=args.concurrent, incremental=args.incremental,
+                                      adaptive=args.adaptive, max_pages=max_pages, workers=args.workers, backend=args.backend)
     
     if args.analyze or args.all:
-        stats["analyzed"] = step_analyze()
+        stats["analyzed"] = len(step_analyze(limit=llm_budget))
     
     if args.signals or args.all:
         stats["signals"] = step_signals()
@@ -250,7 +661,15 @@ def main():
         stats["top10"] = step_top10()
     
     if args.send or args.all:
-        stats["sent"] = step_send()
+        if args.replay:
+            print("\n📼 回放模式，跳过推送")
+        else:
+            stats["sent"] = step_send()
+    
+    tape = cassette.get_cassette()
+    if tape:
+        print(f"\n📼 {tape.summary()}")
+        cassette.stop()
     
     # 总结
     print("\n" + "=" * 60)
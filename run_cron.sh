@@ -1,12 +1,16 @@
 #!/bin/bash
 # 雪球舆情监控 - 定时任务脚本
-# 每天抓取7页，生成报告
+# 按A股交易时段决定是否运行、抓几页（cron 可以每5分钟触发一次：*/5 * * * *）
 
 cd /Users/joinylee/Openclaw/xueqiu_sentiment
 
+# 没到当前时段的抓取间隔就直接退出（盘中2分钟、盘后15分钟、夜间 / 休市1小时）
+python3 market_calendar.py --due || exit 0
+export XUEQIU_MAX_PAGES=$(python3 market_calendar.py --field pages)
+
 echo "===================================="
 echo "🐧 雪球舆情监控 - 定时任务"
-echo "开始时间: $(date '+%Y-%m-%d %H:%M:%S')"
+echo "开始时间: $(date '+%Y-%m-%d %H:%M:%S') | 每股 ${XUEQIU_MAX_PAGES} 页"
 echo "===================================="
 
 # 运行监控脚本
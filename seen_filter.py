@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+已处理帖子过滤（磁盘上的轮转 Bloom 过滤器）
+策略：
+1. 按时间分代：每 SEEN_FILTER_ROTATE_HOURS 小时一代，只保留最近 SEEN_FILTER_GENERATIONS 代，
+   过期的一代整块删掉（Bloom 过滤器删不了单个元素，按代轮转就不用删）
+2. 每代是可扩展 Bloom 过滤器：一片装满 SEEN_FILTER_CAPACITY 条就加一片，
+   新片容量翻倍、误判率减半，总误判率不超过 SEEN_FILTER_ERROR_RATE 的两倍
+3. 每片一个文件，mmap 映射，置位直接落到页缓存，进程崩溃也不丢；退出时 flush
+4. 查询：一次 blake2b 得两个 64 位哈希，双重哈希生成 k 个位置，k 次位运算，不用解析任何文件
+5. 误判只会让极少数新帖被当成旧帖跳过，不会让旧帖重复处理
+6. 回放模式下只用内存，不读写过滤器文件；XUEQIU_SEEN_FILTER=0 关闭
+
+使用:
+    python seen_filter.py                   # 各代 / 各片的条数和占用
+    python seen_filter.py status:123 livenews:456   # 查询是否处理过
+    python seen_filter.py --clear
+    python seen_filter.py --bench 1000000
+"""
+
+import atexit
+import math
+import mmap
+import os
+import struct
+import threading
+import time
+from hashlib import blake2b
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import cassette
+import config
+
+_HEADER = struct.Struct('<4sIQQ')  # 魔数, k, 位数 m, 已加入条数
+_MAGIC = b'XQBF'
+_COUNT_OFFSET = 16
+
+
+def _hashes(key: str) -> Tuple[int, int]:
+    digest = blake2b(key.encode('utf-8'), digest_size=16).digest()
+    return int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+
+
+class BloomFilter:
+    """单片 Bloom 过滤器（filename 为 None 时只在内存里）"""
+
+    def __init__(self, capacity: int, error_rate: float, filename: Optional[str] = None):
+        self.filename = filename
+        self.capacity = capacity
+        bits = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        self.m = (bits + 7) // 8 * 8
+        self.k = max(1, round(self.m / capacity * math.log(2)))
+        self.count = 0
+        self._file = None
+
+        size = _HEADER.size + self.m // 8
+        if filename is None:
+            self.data = bytearray(size)
+            _HEADER.pack_into(self.data, 0, _MAGIC, self.k, self.m, 0)
+            return
+
+        fresh = not os.path.exists(filename)
+        self._file = open(filename, 'w+b' if fresh else 'r+b')
+        if fresh:
+            self._file.write(_HEADER.pack(_MAGIC, self.k, self.m, 0))
+            self._file.truncate(size)
+            self._file.flush()
+        self.data = mmap.mmap(self._file.fileno(), 0)
+        magic, self.k, self.m, self.count = _HEADER.unpack_from(self.data, 0)
+        if magic != _MAGIC or len(self.data) != _HEADER.size + self.m // 8:
+            self.close()
+            raise ValueError(f"不是有效的过滤器文件: {filename}")
+
+    def _positions(self, h1: int, h2: int) -> List[int]:
+        m = self.m
+        return [(h1 + i * h2) % m + _HEADER.size * 8 for i in range(self.k)]
+
+    def contains(self, h1: int, h2: int) -> bool:
+        data = self.data
+        for p in self._positions(h1, h2):
+            if not data[p >> 3] & (1 << (p & 7)):
+                return False
+        return True
+
+    def add(self, h1: int, h2: int) -> bool:
+        """置位，返回是否是新元素"""
+        data = self.data
+        new = False
+        for p in self._positions(h1, h2):
+            byte, bit = p >> 3, 1 << (p & 7)
+            if not data[byte] & bit:
+                data[byte] |= bit
+                new = True
+        if new:
+            self.count += 1
+            struct.pack_into('<Q', self.data, _COUNT_OFFSET, self.count)
+        return new
+
+    def full(self) -> bool:
+        return self.count >= self.capacity
+
+    def flush(self):
+        if self._file is not None:
+            self.data.flush()
+
+    def close(self):
+        if self._file is not None:
+            self.data.close()
+            self._file.close()
+            self._file = None
+
+
+class SeenFilter:
+    """按时间轮转的已处理 id 过滤器（线程安全）"""
+
+    def __init__(self, directory: Optional[str] = config.SEEN_FILTER_DIR,
+                 rotate_hours: float = config.SEEN_FILTER_ROTATE_HOURS,
+                 generations: int = config.SEEN_FILTER_GENERATIONS,
+                 capacity: int = config.SEEN_FILTER_CAPACITY,
+                 error_rate: float = config.SEEN_FILTER_ERROR_RATE,
+                 clock: Callable[[], float] = time.time):
+        self.directory = directory
+        self.rotate_seconds = rotate_hours * 3600
+        self.generations = generations
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.filters: Dict[int, List[BloomFilter]] = {}  # 代号 -> 各片
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            self._load()
+
+    def _path(self, generation: int, index: int) -> Optional[str]:
+        if not self.directory:
+            return None
+        return os.path.join(self.directory, f"{generation}-{index}.bloom")
+
+    def _slice(self, generation: int, index: int) -> BloomFilter:
+        # 第 i 片容量 ×2^i，误判率 ×0.5^(i+1)，各片误判率之和不超过 error_rate
+        return BloomFilter(self.capacity << index, self.error_rate * 0.5 ** (index + 1),
+                           self._path(generation, index))
+
+    def _load(self):
+        for name in sorted(os.listdir(self.directory)):
+            if not name.endswith('.bloom'):
+                continue
+            try:
+                generation, index = (int(part) for part in name[:-len('.bloom')].split('-'))
+                bloom = self._slice(generation, index)
+            except ValueError as e:
+                print(f"   ⚠️ 跳过损坏的过滤器 {name}: {e}")
+                os.remove(os.path.join(self.directory, name))
+                continue
+            self.filters.setdefault(generation, []).append(bloom)
+        for slices in self.filters.values():
+            slices.sort(key=lambda b: b.capacity)
+        self._rotate()
+
+    def _rotate(self) -> int:
+        """丢掉过期的代，返回当前代号"""
+        current = int(self.clock() // self.rotate_seconds)
+        for generation in [g for g in self.filters if g <= current - self.generations]:
+            for bloom in self.filters.pop(generation):
+                bloom.close()
+                if bloom.filename and os.path.exists(bloom.filename):
+                    os.remove(bloom.filename)
+        return current
+
+    def _contains(self, h1: int, h2: int) -> bool:
+        return any(bloom.contains(h1, h2) for slices in self.filters.values() for bloom in slices)
+
+    def seen(self, key: str) -> bool:
+        h1, h2 = _hashes(key)
+        with self.lock:
+            self._rotate()
+            return self._contains(h1, h2)
+
+    def add(self, key: str) -> bool:
+        """记为已处理，返回之前是否没见过"""
+        h1, h2 = _hashes(key)
+        with self.lock:
+            current = self._rotate()
+            if self._contains(h1, h2):
+                return False
+            slices = self.filters.setdefault(current, [])
+            if not slices or slices[-1].full():
+                slices.append(self._slice(current, len(slices)))
+            return slices[-1].add(h1, h2)
+
+    def add_all(self, keys: Iterable[str]) -> int:
+        return sum(1 for key in keys if self.add(key))
+
+    def filter_new(self, items: Iterable, key: Callable) -> List:
+        """只留下没处理过的"""
+        return [item for item in items if not self.seen(key(item))]
+
+    def flush(self):
+        with self.lock:
+            for slices in self.filters.values():
+                for bloom in slices:
+                    bloom.flush()
+
+    def clear(self):
+        with self.lock:
+            for slices in self.filters.values():
+                for bloom in slices:
+                    bloom.close()
+                    if bloom.filename and os.path.exists(bloom.filename):
+                        os.remove(bloom.filename)
+            self.filters = {}
+
+    def summary(self) -> Dict:
+        with self.lock:
+            self._rotate()
+            return {
+                str(generation): {
+                    'since': time.strftime('%m-%d %H:%M', time.localtime(generation * self.rotate_seconds)),
+                    'slices': len(slices),
+                    'count': sum(b.count for b in slices),
+                    'kb': sum(b.m // 8 for b in slices) // 1024,
+                }
+                for generation, slices in sorted(self.filters.items())
+            }
+
+
+def post_key(item: Dict) -> str:
+    """标准化数据的 key（与 run.DaemonState.key 一致）"""
+    return f"{item.get('type')}:{item.get('id')}"
+
+
+_filter: Optional[SeenFilter] = None
+_filter_lock = threading.Lock()
+
+
+def get_filter() -> Optional[SeenFilter]:
+    """进程级共享的过滤器（退出时 flush）；关闭时返回 None，回放时只在内存里"""
+    global _filter
+    if not config.SEEN_FILTER_ENABLED:
+        return None
+    with _filter_lock:
+        if _filter is None:
+            _filter = SeenFilter(None if cassette.replaying() else config.SEEN_FILTER_DIR)
+            atexit.register(_filter.flush)
+        return _filter
+
+
+if __name__ == "__main__":
+    import sys
+
+    if '--bench' in sys.argv:
+        import tempfile
+
+        n = int(sys.argv[sys.argv.index('--bench') + 1]) if len(sys.argv) > 2 else 1000000
+        with tempfile.TemporaryDirectory() as directory:
+            seen = SeenFilter(directory)
+            keys = [f"status:{3000000000 + i}" for i in range(n)]
+            start = time.time()
+            seen.add_all(keys)
+            added = time.time() - start
+            start = time.time()
+            hits = sum(1 for key in keys if seen.seen(key))
+            queried = time.time() - start
+            false_hits = sum(1 for i in range(n) if seen.seen(f"livenews:{i}"))
+            print(f"🏋️ {n} 个 id: 写入 {added:.2f}s ({n / added:,.0f}/秒), 查询 {queried:.2f}s ({n / queried:,.0f}/秒)")
+            print(f"   命中 {hits}/{n}, 误判 {false_hits / n:.4%}, 占用 {seen.summary()}")
+            seen.clear()
+    elif '--clear' in sys.argv:
+        SeenFilter().clear()
+        print(f"🗑️ 已清除 {config.SEEN_FILTER_DIR}")
+    elif len(sys.argv) > 1:
+        seen = SeenFilter()
+        for key in sys.argv[1:]:
+            print(f"   {key}: {'处理过' if seen.seen(key) else '新的'}")
+    else:
+        print(f"🧾 已处理过滤器 {config.SEEN_FILTER_DIR}:")
+        for generation, info in SeenFilter().summary().items():
+            print(f"   {info['since']} 起: {info['count']} 条, {info['slices']} 片, {info['kb']} KB")
@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""
+共享 HTTP Session 池
+策略：
+1. 整个进程共用一组 requests.Session（复用 TCP/TLS 连接）
+2. 首页下发的反WAF Cookie（device_id / xq_a_token 等）缓存到磁盘，带 TTL
+3. 只有 Cookie 过期或检测到 WAF 页面时才重新访问首页
+4. 登录凭据（xq_a_token / u / UA）每次借出 session 时从 credential_pool 取最健康的一组，
+   响应结果通过 response hook 回报给凭据池
+"""
+
+import json
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+import requests
+from urllib3.util.retry import Retry
+
+import cassette
+import config
+import rate_control
+from credential_pool import get_credential_pool, AUTH, THROTTLED
+
+HOMEPAGE_URL = config.BASE_URL + '/'
+
+
+class PacedAdapter(cassette.CassetteAdapter):
+    """每个请求先向 AIMD 控制器占名额，结束后按响应结果反馈（回放时不限速）"""
+
+    def send(self, request, **kwargs):
+        if cassette.replaying():
+            return super().send(request, **kwargs)
+
+        controller = rate_control.get_controller()
+        controller.acquire(request.url)
+        outcome = rate_control.NEUTRAL
+        start = time.time()
+        try:
+            resp = super().send(request, **kwargs)
+            # resp.elapsed 含排队等待时间，这里单独记录服务端耗时给凭据池
+            resp.server_latency = time.time() - start
+            outcome = rate_control.classify_response(resp)
+            return resp
+        finally:
+            controller.release(request.url, outcome)
+
+
+def create_session(paced: bool = True) -> requests.Session:
+    """创建带重试和Cookie支持的session（paced=False 时不走 AIMD 限速，用于第三方接口）"""
+    session = requests.Session()
+
+    # 重试策略（429 不在这里重试，交给 AIMD 降速后由调用方重试）
+    retries = Retry(
+        total=3,
+        backoff_factor=1,
+        status_forcelist=[500, 502, 503, 504]
+    )
+    # CassetteAdapter 在录制/回放模式下接管请求，平时等同 HTTPAdapter
+    adapter_cls = PacedAdapter if paced else cassette.CassetteAdapter
+    adapter = adapter_cls(max_retries=retries, pool_maxsize=config.SESSION_POOL_SIZE)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+
+    # 基础headers
+    session.headers.update({
+        'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+        'Accept': 'application/json, text/plain, */*',
+        'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
+        'Accept-Encoding': 'gzip, deflate, br',
+        'Connection': 'keep-alive',
+        'Referer': 'https://xueqiu.com/',
+    })
+
+    return session
+
+
+def is_waf_response(resp: requests.Response) -> bool:
+    """判断响应是否是WAF拦截页（200 但返回了HTML）"""
+    content_type = resp.headers.get('content-type', '')
+    if 'json' in content_type:
+        return False
+    return '<html' in resp.text[:200].lower()
+
+
+class SessionPool:
+    """进程级 Session 池 + 磁盘 Cookie 缓存"""
+
+    def __init__(self, size: int = config.SESSION_POOL_SIZE,
+                 cookie_file: str = config.COOKIE_CACHE_FILE,
+                 ttl: int = config.COOKIE_TTL):
+        self.size = size
+        self.cookie_file = cookie_file
+        self.ttl = ttl
+
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+        self._cookies: Dict[str, str] = {}
+        self._expires_at = 0.0
+        self._generation = 0  # Cookie 每刷新一次加1，借出的 session 据此同步
+        self._load_cookie_cache()
+
+    # ---------- Cookie ----------
+
+    def _load_cookie_cache(self):
+        """从磁盘加载缓存的Cookie"""
+        if not os.path.exists(self.cookie_file):
+            return
+        try:
+            with open(self.cookie_file, 'r', encoding='utf-8') as f:
+                cache = json.load(f)
+            # 缓存按 host 区分，模拟服务器的Cookie不会被带到真实雪球
+            if cache.get('host', 'xueqiu.com') != urlparse(HOMEPAGE_URL).hostname:
+                return
+            if cache.get('expires_at', 0) > time.time():
+                self._cookies = cache.get('cookies', {})
+                self._expires_at = cache['expires_at']
+                self._generation += 1
+        except (OSError, ValueError):
+            pass
+
+    def _save_cookie_cache(self):
+        """写入磁盘缓存（先写临时文件再替换，避免半截文件）"""
+        tmp_file = self.cookie_file + '.tmp'
+        try:
+            # Cookie 等同登录态，缓存文件只给当前用户读写（0600）
+            fd = os.open(tmp_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            os.fchmod(fd, 0o600)  # 残留的旧临时文件不受 O_CREAT 权限影响
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({
+                    'host': urlparse(HOMEPAGE_URL).hostname,
+                    'cookies': self._cookies,
+                    'fetched_at': time.time(),
+                    'expires_at': self._expires_at,
+                }, f, ensure_ascii=False)
+            os.replace(tmp_file, self.cookie_file)
+        except OSError as e:
+            print(f"   ⚠️ Cookie缓存写入失败: {e}")
+
+    def refresh_cookies(self) -> Dict[str, str]:
+        """访问雪球首页获取新的Cookie
+
+        只有首页正常返回且确实下发了Cookie才按 ttl 缓存并落盘；
+        失败时保留原有Cookie，COOKIE_RETRY_TTL 秒后再试，不写磁盘缓存。
+        """
+        session = create_session()
+        ok = False
+        try:
+            print("   🍪 访问首页获取Cookie...")
+            resp = session.get(HOMEPAGE_URL, timeout=10)
+            ok = resp.ok
+            if not ok:
+                print(f"   ❌ 获取Cookie失败: HTTP {resp.status_code}")
+        except Exception as e:
+            print(f"   ❌ 获取Cookie失败: {e}")
+
+        cookies = session.cookies.get_dict()
+        session.close()
+
+        if not ok or not cookies:
+            self._expires_at = time.time() + config.COOKIE_RETRY_TTL
+            print(f"   ⚠️ 未拿到Cookie，{config.COOKIE_RETRY_TTL}秒后重试")
+            return dict(self._cookies)
+
+        # 登录Cookie（xq_a_token / u）由凭据池按 session 覆盖，见 _apply_cookies
+        self._cookies = cookies
+        self._expires_at = time.time() + self.ttl
+        self._generation += 1
+        if not cassette.replaying():  # 回放拿不到真实Cookie，不能覆盖磁盘缓存
+            self._save_cookie_cache()
+        print(f"   ✓ Cookie已刷新: {list(cookies.keys())[:3]}")
+        return cookies
+
+    def get_cookies(self) -> Dict[str, str]:
+        """获取有效Cookie，过期才刷新"""
+        with self._lock:
+            # 不看 _cookies 是否为空：失败后的重试间隔由 _expires_at 控制
+            if time.time() >= self._expires_at:
+                self.refresh_cookies()
+            return dict(self._cookies)
+
+    def invalidate(self):
+        """检测到WAF时调用，下次借出 session 前重新获取Cookie"""
+        with self._lock:
+            self._expires_at = 0
+
+    def renew(self, session: requests.Session):
+        """作废Cookie并给手上的 session 换上新Cookie"""
+        self.invalidate()
+        self._apply_cookies(session, self.get_cookies())
+
+    # ---------- Session ----------
+
+    def checkout(self) -> requests.Session:
+        """借出一个 session（同一时刻只被一个调用方使用），并绑定当前最健康的凭据"""
+        cookies = self.get_cookies()
+
+        try:
+            session = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                can_create = self._created < self.size
+                if can_create:
+                    self._created += 1
+            session = self._create_session() if can_create else self._idle.get()
+
+        previous = session.credential
+        session.credential = get_credential_pool().acquire()
+        if (getattr(session, 'cookie_generation', None) != self._generation
+                or session.credential is not previous):
+            self._apply_cookies(session, cookies)
+
+        return session
+
+    def _create_session(self) -> requests.Session:
+        session = create_session()
+        session.credential = None
+        session.hooks['response'].append(lambda resp, **kwargs: self._report(session, resp))
+        return session
+
+    def _report(self, session: requests.Session, resp: requests.Response):
+        """把雪球接口的响应结果回报给 session 当前绑定的凭据"""
+        credential = session.credential
+        host = urlparse(resp.url).hostname or ''
+        if credential is None or not host.endswith(urlparse(HOMEPAGE_URL).hostname):
+            return
+
+        credentials = get_credential_pool()
+        if resp.status_code in (401, 403):
+            credentials.report_failure(credential, AUTH, resp.status_code)
+        elif rate_control.classify_response(resp) == rate_control.THROTTLED:
+            credentials.report_failure(credential, THROTTLED, resp.status_code)
+        elif resp.status_code == 200:
+            credentials.report_success(credential, getattr(resp, 'server_latency', resp.elapsed.total_seconds()))
+
+    def _apply_cookies(self, session: requests.Session, cookies: Dict[str, str]):
+        # 限定域名，避免雪球Cookie被带到行情等第三方接口
+        domain = urlparse(HOMEPAGE_URL).hostname
+        if session.credential is not None:
+            cookies = {**cookies, **session.credential.cookies()}
+            session.headers['User-Agent'] = session.credential.user_agent
+        for name, value in cookies.items():
+            session.cookies.set(name, value, domain=domain)
+        session.cookie_generation = self._generation
+
+    def rotate_credential(self, session: requests.Session):
+        """当前凭据失效（如 401）时给手上的 session 换一组凭据"""
+        credentials = get_credential_pool()
+        old = session.credential
+        session.credential = credentials.acquire()
+        if old is not None:
+            credentials.release(old)
+        self._apply_cookies(session, self.get_cookies())
+        print(f"   🔑 更换凭据: {old.name if old else '-'} → {session.credential.name}")
+
+    def ensure_size(self, size: int):
+        """并发调用方多于池大小时扩容（只增不减）"""
+        with self._lock:
+            self.size = max(self.size, size)
+
+    def release(self, session: requests.Session):
+        """归还 session（连同绑定的凭据）"""
+        if getattr(session, 'credential', None) is not None:
+            get_credential_pool().release(session.credential)
+        self._idle.put(session)
+
+    @contextmanager
+    def session(self):
+        """with get_pool().session() as s: ..."""
+        s = self.checkout()
+        try:
+            yield s
+        finally:
+            self.release(s)
+
+
+_pool: Optional[SessionPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> SessionPool:
+    """获取进程级共享的 Session 池"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = SessionPool()
+        return _pool
+
+
+if __name__ == "__main__":
+    pool = get_pool()
+    print(f"📦 Session池大小: {pool.size}")
+    print(f"🍪 Cookie: {pool.get_cookies()}")
+    print(f"💾 缓存文件: {pool.cookie_file}")
+    print(f"🔑 凭据: {[m['name'] for m in get_credential_pool().metrics()]}")
@@ -11,6 +11,8 @@ from datetime import datetime
 from typing import Dict, List, Tuple, Optional
 from collections import defaultdict
 
+from symbol_tagger import item_symbols, mentioned_symbols
+
 # 信号类型
 SIGNAL_OPPORTUNITY = "机会型"  # 舆情升温+价格不动
 SIGNAL_WARNING = "风险型"  # 情绪极端/风险信号
@@ -98,14 +100,14 @@ class SentimentSignals:
         
         return round(total_intensity / total_weight, 2) if total_weight > 0 else 0
     
-    def detect_signal(self, symbol: str, items: List[Dict], price_change: float = 0.0) -> Optional[Dict]:
+    def detect_signal(self, symbol: str, items: List[Dict], price_change: Optional[float] = 0.0) -> Optional[Dict]:
         """
         检测交易信号
         
         Args:
             symbol: 股票代码
             items: 该股票的舆情数据
-            price_change: 当日涨跌幅
+            price_change: 当日涨跌幅；None 表示没有行情，只看不依赖价格的信号2
         
         Returns:
             dict: 信号结果，没有信号返回None
@@ -119,7 +121,8 @@ class SentimentSignals:
         leading_count = len([i for i in items if i.get("analysis", {}).get("leading") == "是"])
         
         # 信号1: 机会型 - 舆情升温 + 价格不动
-        if heat > self.config["heat_threshold"] and avg_intensity >= self.config["intensity_threshold"]:
+        if (price_change is not None and heat > self.config["heat_threshold"]
+                and avg_intensity >= self.config["intensity_threshold"]):
             if abs(price_change) < 1.0:  # 价格横盘
                 if bias > 0.2:  # 偏多
                     return {
@@ -151,6 +154,10 @@ class SentimentSignals:
                 }
             }
         
+        # 信号3、4 都要看价格
+        if price_change is None:
+            return None
+        
         # 信号3: 风险型 - 舆情转空 + 价格不跌
         if bias < -0.3 and price_change > -0.5 and price_change < 0:
             return {
@@ -188,7 +195,8 @@ class SentimentSignals:
         
         Args:
             analyzed_data: 分析后的舆情数据
-            price_changes: 股票涨跌幅字典 {symbol: change}
+            price_changes: 股票涨跌幅字典 {symbol: change}；传了的话，没有行情的股票只检测不依赖价格的信号
+                          （按 0% 算会被误判成"价格横盘"）
         
         Returns:
             list: 信号列表
@@ -196,16 +204,16 @@ class SentimentSignals:
         # 按股票分组
         by_symbol = defaultdict(list)
         
+        # 快讯 / 提到多只股票的帖子计入每只提到的股票
         for item in analyzed_data:
-            symbol = item.get("symbol")
-            if symbol:
+            for symbol in item_symbols(item):
                 by_symbol[symbol].append(item)
         
         # 检测每只股票
         signals = []
         
         for symbol, items in by_symbol.items():
-            price_change = price_changes.get(symbol, 0.0) if price_changes else 0.0
+            price_change = price_changes.get(symbol) if price_changes is not None else 0.0
             signal = self.detect_signal(symbol, items, price_change)
             
             if signal:
@@ -219,29 +227,11 @@ class SentimentSignals:
 
 def get_price_changes(symbols: List[str]) -> Dict[str, float]:
     """
-    获取股票涨跌幅
+    获取股票涨跌幅（批量 + 缓存，见 quotes.py）
     """
-    import requests
-    
-    changes = {}
-    
-    for symbol in symbols:
-        market = "sh" if symbol.startswith("SH") or symbol.startswith("6") else "sz"
-        code = symbol.replace("SH", "").replace("SZ", "")
-        
-        try:
-            url = f"http://qt.gtimg.cn/q={market}{code}"
-            r = requests.get(url, timeout=5)
-            data = r.text.split("~")
-            
-            if len(data) > 32:
-                change = float(data[32])
-                changes[symbol] = change
-                
-        except Exception:
-            pass
+    from quotes import get_quotes
     
-    return changes
+    return {symbol: quote.change_pct for symbol, quote in get_quotes(symbols).items()}
 
 if __name__ == "__main__":
     from normalize import load_raw_data
@@ -254,22 +244,25 @@ if __name__ == "__main__":
     # 加载分析数据
     analyzed_file = "/tmp/xueqiu_analyzed.jsonl"
     
-    if not os.path.exists(analyzed_file):
+    import column_store
+    if not column_store.has_analyzed() and not os.path.exists(analyzed_file):
         print("\n⚠️ 没有找到分析数据，请先运行 analyze.py")
         sys.exit(1)
     
-    # 读取数据
+    # 读取数据（优先列式存储，只 mmap 用到的列）
     items = []
-    with open(analyzed_file, "r", encoding="utf-8") as f:
-        for line in f:
-            if line.strip():
-                items.append(json.loads(line))
+    if column_store.has_analyzed():
+        items = column_store.load_analyzed()
+    else:
+        with open(analyzed_file, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    items.append(json.loads(line))
     
     print(f"📥 加载 {len(items)} 条分析数据")
     
     # 获取价格
-    from config import SYMBOLS
-    price_changes = get_price_changes(SYMBOLS)
+    price_changes = get_price_changes(mentioned_symbols(items))
     print(f"📈 获取 {len(price_changes)} 只股票价格")
     
     # 检测信号
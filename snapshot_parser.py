@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+浏览器 snapshot 解析 - 单遍流式版
+snapshot 格式: - generic [ref=e2]: "{\"about\":...,\"list\":[{...},{...}]}"
+
+策略：
+1. 外层 JSON 字符串只反转义一遍（json 自带的 C 实现 scanstring），不再多次 replace
+2. 逐个 raw_decode list 里的帖子对象，解析出一条就 yield 一条
+3. 每条帖子是完整的 JSON 对象，text / created_at / screen_name 不会错位
+4. snapshot 被截断时，已完整解析的帖子照常返回
+"""
+
+import json
+import re
+from json.decoder import scanstring
+from typing import List, Dict, Iterator, Optional
+
+READY_MARKER = 'generic [ref='
+_decoder = json.JSONDecoder()
+_WS = re.compile(r'[ \t\n\r]*')
+
+
+def extract_payload(snapshot: str) -> Optional[str]:
+    """
+    从 snapshot 中取出 JSON 文本（一次反转义）
+
+    Returns:
+        JSON 文本，找不到返回 None
+    """
+    pos = snapshot.find(READY_MARKER)
+    if pos < 0:
+        # 部分版本的 openclaw 直接输出 JSON
+        stripped = snapshot.lstrip()
+        return stripped if stripped.startswith('{') else None
+
+    colon = snapshot.find(': ', pos)
+    if colon < 0:
+        return None
+
+    start = colon + 2
+    if snapshot.startswith('"', start):
+        try:
+            payload, _ = scanstring(snapshot, start + 1)
+        except ValueError:
+            # 字符串被截断：去掉末尾残缺的转义后再解一次
+            tail = snapshot[start + 1:].rstrip()
+            tail = tail[:len(tail) - (len(tail) - len(tail.rstrip('\\'))) % 2]
+            try:
+                payload, _ = scanstring(tail + '"', 0)
+            except ValueError:
+                return None
+        return payload
+
+    if snapshot.startswith('{', start):
+        return snapshot[start:]
+    return None
+
+
+def _skip_ws(text: str, idx: int) -> int:
+    return _WS.match(text, idx).end()
+
+
+def iter_list(payload: str, key: str = 'list') -> Iterator[Dict]:
+    """
+    流式解析顶层对象里 key 对应的数组，逐个 yield 元素
+
+    其他字段用 raw_decode 跳过，不会误匹配到帖子正文里出现的 "list"
+    """
+    idx = _skip_ws(payload, 0)
+    if not payload.startswith('{', idx):
+        return
+    idx = _skip_ws(payload, idx + 1)
+
+    try:
+        while payload.startswith('"', idx):
+            name, idx = scanstring(payload, idx + 1)
+            idx = _skip_ws(payload, idx)
+            if not payload.startswith(':', idx):
+                return
+            idx = _skip_ws(payload, idx + 1)
+
+            if name == key and payload.startswith('[', idx):
+                yield from _iter_array(payload, idx + 1)
+                return
+
+            _, idx = _decoder.raw_decode(payload, idx)
+            idx = _skip_ws(payload, idx)
+            if not payload.startswith(',', idx):
+                return
+            idx = _skip_ws(payload, idx + 1)
+    except ValueError:
+        # 截断在 list 之前的字段里
+        return
+
+
+def _iter_array(payload: str, idx: int) -> Iterator[Dict]:
+    raw_decode = _decoder.raw_decode
+    end = len(payload)
+    while True:
+        if idx < end and payload[idx] in ' \t\n\r':
+            idx = _skip_ws(payload, idx)
+        if idx >= end or payload[idx] == ']':
+            return
+        try:
+            item, idx = raw_decode(payload, idx)
+        except ValueError:
+            # 最后一条被截断
+            return
+        if isinstance(item, dict):
+            yield item
+
+        # 紧凑 JSON 没有空白，直接判断分隔符
+        if idx < end and payload[idx] in ' \t\n\r':
+            idx = _skip_ws(payload, idx)
+        if idx >= end or payload[idx] != ',':
+            return
+        idx += 1
+
+
+def iter_snapshot_posts(snapshot: str) -> Iterator[Dict]:
+    """逐条 yield snapshot 里的原始帖子（雪球接口原样字段）"""
+    payload = extract_payload(snapshot)
+    if payload:
+        yield from iter_list(payload)
+
+
+def parse_snapshot(snapshot: str) -> List[Dict]:
+    """解析 snapshot，返回原始帖子列表"""
+    return list(iter_snapshot_posts(snapshot))
+
+
+def parse_snapshot_data(snapshot: str) -> Dict:
+    """整体解析 snapshot 的 JSON（需要 list 以外字段时用，如 maxPage）"""
+    payload = extract_payload(snapshot)
+    if not payload:
+        return {}
+    try:
+        data = json.loads(payload)
+    except ValueError:
+        return {'list': list(iter_list(payload))}
+    return data if isinstance(data, dict) else {}
+
+
+# ============ 基准测试 ============
+
+def _legacy_extract(snapshot: str) -> List[Dict]:
+    """旧版 v7/v8/v9 的做法：两次 replace + 三遍 finditer 按下标配对"""
+    line = snapshot.strip()
+    pos = line.find(': "')
+    raw = line[pos + 2:line.rfind('"')]
+    raw = raw.replace('\\"', '"').replace('\\\\', '\\')
+    texts = list(re.finditer(r'"text":"(.*?)"[,}]', raw, re.DOTALL))
+    times = list(re.finditer(r'"created_at":(\d+)', raw))
+    authors = list(re.finditer(r'"screen_name":"(.*?)"', raw))
+    return [{
+        'text': m.group(1),
+        'created_at': int(times[i].group(1)) if i < len(times) else 0,
+        'author': authors[i].group(1) if i < len(authors) else '',
+    } for i, m in enumerate(texts)]
+
+
+def _make_snapshot(posts: List[Dict]) -> str:
+    """按 openclaw 的格式包装成 snapshot"""
+    raw_posts = [{
+        'id': 380000000 + i,
+        'created_at': p.get('timestamp') or 0,
+        'text': f"<p>{p.get('text', '')}</p>",
+        'user': {'id': i, 'screen_name': p.get('author', ''), 'description': '"转发":1,"created_at":0'},
+        'retweeted_status': {'created_at': 1391769374706} if i % 5 == 0 else None,
+    } for i, p in enumerate(posts)]
+    payload = json.dumps({'about': '', 'count': len(raw_posts), 'list': raw_posts},
+                         ensure_ascii=False, separators=(',', ':'))
+    return f'- generic [ref=e2]: {json.dumps(payload, ensure_ascii=False)}'
+
+
+if __name__ == "__main__":
+    import glob
+    import os
+    import sys
+    import time
+
+    report_dir = sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.path.dirname(os.path.abspath(__file__)), 'reports')
+    files = sorted(glob.glob(os.path.join(report_dir, '*.json')), key=os.path.getsize)
+
+    print("=" * 60)
+    print("⏱️ snapshot 解析基准：旧版三遍正则 vs 单遍流式")
+    print("=" * 60)
+
+    for filename in files:
+        with open(filename, 'r', encoding='utf-8') as f:
+            report = json.load(f)
+        posts = [p for items in report.get('data', {}).values() if isinstance(items, list) for p in items]
+        if not posts:
+            continue
+
+        snapshot = _make_snapshot(posts)
+        rounds = max(3, 2000000 // len(snapshot))
+
+        start = time.perf_counter()
+        for _ in range(rounds):
+            legacy = _legacy_extract(snapshot)
+        legacy_ms = (time.perf_counter() - start) / rounds * 1000
+
+        start = time.perf_counter()
+        for _ in range(rounds):
+            parsed = parse_snapshot(snapshot)
+        new_ms = (time.perf_counter() - start) / rounds * 1000
+
+        mismatched = sum(1 for old, new in zip(legacy, parsed) if old['created_at'] != new['created_at'])
+        print(f"\n📄 {os.path.basename(filename)}: {len(posts)} 条, snapshot {len(snapshot) // 1024} KB")
+        print(f"   旧版: {legacy_ms:.2f} ms, {len(legacy)} 条, 时间错位 {mismatched} 条")
+        print(f"   新版: {new_ms:.2f} ms, {len(parsed)} 条 ({legacy_ms / new_ms:.1f}x)")
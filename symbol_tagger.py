@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+"""
+股票提及识别（Aho-Corasick 多模式匹配）
+策略：
+1. 股票全集 = 内置表（自选股 + 常见别名）+ 全市场股票表 SYMBOL_UNIVERSE_FILE
+   全市场表用 --build 生成：按沪深代码段批量查腾讯行情，有名称的就是存在的股票
+2. 每只股票的模式：SH600118 / 600118 / 简称（中国卫星）/ 去掉 *ST、尾部 A 的简称 / 别名（茅台）
+   同一个简称或别名对应多只股票时丢弃，宁可漏标不错标
+3. 所有模式建成一个 Aho-Corasick 自动机，扫描一遍文本就找出全部提及，与股票数量无关
+4. 同一位置重叠时取最左最长（"湖南黄金" 不会再拆出别的词）；代码类模式前后不能紧挨字母数字
+5. 自动机建好后存成 JSON 到 SYMBOL_TAGGER_CACHE（不用 pickle：/tmp 下的文件谁都能放，反序列化不能执行代码），
+   第一行是股票表内容的指纹，先比对指纹再解析自动机，股票表不变时下次启动直接加载
+
+使用:
+    python symbol_tagger.py --build               # 拉取全市场股票表并重建自动机
+    python symbol_tagger.py '中国卫星和湖南黄金今天都涨停了，600519 也不错'
+    python symbol_tagger.py --bench 100000
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import config
+
+CACHE_VERSION = 2
+
+# 内置简称（离线也能识别自选股）
+STOCK_NAMES = {
+    "SH603667": "五洲新春",
+    "SH601869": "长飞光纤",
+    "SZ002112": "三变科技",
+    "SZ002361": "神剑股份",
+    "SZ002506": "协鑫集成",
+    "SZ002155": "湖南黄金",
+    "SZ002342": "巨力索具",
+    "SZ300136": "信维通信",
+    "SZ002413": "雷科防务",
+    "SH600118": "中国卫星",
+    "SZ002149": "西部材料",
+}
+
+# 常见别名 / 俗称
+ALIASES = {
+    "SH600519": ["贵州茅台", "茅台"],
+    "SZ300750": ["宁德时代", "宁王"],
+    "SZ002594": ["比亚迪"],
+    "SH601318": ["中国平安"],
+    "SZ000858": ["五粮液"],
+    "SH600036": ["招商银行", "招行"],
+    "SH688981": ["中芯国际"],
+    "SZ002155": ["湖南黄金"],
+    "SH600118": ["中国卫星"],
+}
+
+# 沪深 A 股代码段（--build 时逐段查询）
+CODE_RANGES = [
+    ("SH", 600000, 606000),
+    ("SH", 688000, 690000),
+    ("SZ", 1, 4000),
+    ("SZ", 300000, 302000),
+]
+
+_NAME_PREFIXES = ("*ST", "S*ST", "ST", "SST")
+_WORD_CHARS = frozenset("ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789")
+
+
+def _normalize_name(name: str) -> str:
+    """腾讯行情的简称里有全角空格（万  科Ａ）"""
+    return ''.join(name.replace('　', ' ').split()).replace('Ａ', 'A').replace('Ｂ', 'B')
+
+
+def name_variants(name: str) -> List[str]:
+    """简称本身 + 去掉 ST 前缀 / 尾部 A 的写法"""
+    name = _normalize_name(name)
+    variants = [name]
+    for prefix in _NAME_PREFIXES:
+        if name.upper().startswith(prefix):
+            variants.append(name[len(prefix):])
+            break
+    if variants[-1].endswith('A') and len(variants[-1]) > 2:
+        variants.append(variants[-1][:-1])
+    return [v for v in variants if len(v) >= 2]
+
+
+def symbol_patterns(symbol: str, names: Iterable[str]) -> List[str]:
+    """一只股票的全部模式（大写，和扫描时的 text.upper() 对应）"""
+    patterns = [symbol, symbol[2:]]
+    for name in names:
+        patterns.extend(name_variants(name))
+    return [p.upper() for p in dict.fromkeys(patterns)]
+
+
+class SymbolTagger:
+    """Aho-Corasick 自动机：goto 每个节点一个 dict，out 为该节点结束的 (模式长度, 股票, 是否代码类)"""
+
+    def __init__(self, patterns: Dict[str, str]):
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.out: List[Tuple[Tuple[int, str, bool], ...]] = [()]
+        self.size = len(patterns)
+        if patterns:
+            self._build(patterns)
+
+    def state(self) -> Dict:
+        """缓存用的纯数据（JSON 里 out 的元组会变成列表，from_state 再转回来）"""
+        return {'goto': self.goto, 'fail': self.fail, 'out': self.out, 'size': self.size}
+
+    @classmethod
+    def from_state(cls, state: Dict) -> 'SymbolTagger':
+        tagger = cls({})
+        tagger.goto, tagger.fail, tagger.size = state['goto'], state['fail'], state['size']
+        tagger.out = [tuple(tuple(match) for match in matches) for matches in state['out']]
+        return tagger
+
+    def _build(self, patterns: Dict[str, str]):
+        goto, out = self.goto, [[]]
+        for pattern, symbol in patterns.items():
+            node = 0
+            for ch in pattern:
+                nxt = goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[node][ch] = nxt
+                    goto.append({})
+                    out.append([])
+                node = nxt
+            out[node].append((len(pattern), symbol, pattern[-1] in _WORD_CHARS))
+
+        # BFS 补失败指针，输出沿失败链合并
+        fail = [0] * len(goto)
+        queue = list(goto[0].values())
+        for node in queue:
+            for ch, nxt in goto[node].items():
+                queue.append(nxt)
+                f = fail[node]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[nxt] = goto[f].get(ch, 0)
+                out[nxt].extend(out[fail[nxt]])
+        self.fail = fail
+        self.out = [tuple(o) for o in out]
+
+    def matches(self, text: str) -> List[Tuple[int, int, str]]:
+        """全部命中 (起点, 终点, 股票)，未去重叠"""
+        text = text.upper()
+        goto, fail, out = self.goto, self.fail, self.out
+        found = []
+        node = 0
+        for i, ch in enumerate(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if out[node]:
+                for length, symbol, word in out[node]:
+                    start = i - length + 1
+                    # 代码类模式不能是更长字母数字串的一部分（1600118、SH6001180）
+                    if word and ((start and text[start - 1] in _WORD_CHARS) or
+                                 (i + 1 < len(text) and text[i + 1] in _WORD_CHARS)):
+                        continue
+                    found.append((start, i + 1, symbol))
+        return found
+
+    def tag(self, text: str) -> List[str]:
+        """文本提到的股票（最左最长、不重叠，按出现顺序去重）"""
+        if not text:
+            return []
+        symbols = []
+        end = 0
+        for start, stop, symbol in sorted(self.matches(text), key=lambda m: (m[0], -m[1])):
+            if start >= end:
+                symbols.append(symbol)
+                end = stop
+        return list(dict.fromkeys(symbols))
+
+
+# ---------- 股票表 ----------
+
+def load_universe(filename: str = config.SYMBOL_UNIVERSE_FILE) -> Dict[str, Dict]:
+    """内置表 + 全市场股票表，{symbol: {"name": 简称, "aliases": [...]}}"""
+    stocks = {symbol: {"name": name, "aliases": []} for symbol, name in STOCK_NAMES.items()}
+    if filename and os.path.exists(filename):
+        try:
+            with open(filename, 'r', encoding='utf-8') as f:
+                for symbol, entry in json.load(f).get('stocks', {}).items():
+                    stocks.setdefault(symbol, {"name": "", "aliases": []}).update(entry)
+        except (OSError, ValueError, AttributeError) as e:
+            print(f"   ⚠️ 股票表读取失败: {e}")
+    for symbol, aliases in ALIASES.items():
+        entry = stocks.setdefault(symbol, {"name": "", "aliases": []})
+        entry["aliases"] = list(dict.fromkeys(entry.get("aliases", []) + aliases))
+    return stocks
+
+
+def build_patterns(stocks: Dict[str, Dict]) -> Dict[str, str]:
+    """模式 -> 股票；一个模式对应多只股票时丢弃"""
+    owners: Dict[str, set] = {}
+    for symbol, entry in stocks.items():
+        names = [entry.get("name", "")] + list(entry.get("aliases", []))
+        for pattern in symbol_patterns(symbol, [n for n in names if n]):
+            owners.setdefault(pattern, set()).add(symbol)
+    return {pattern: next(iter(s)) for pattern, s in owners.items() if len(s) == 1}
+
+
+def candidate_symbols() -> List[str]:
+    return [f"{market}{code:06d}" for market, start, end in CODE_RANGES for code in range(start, end)]
+
+
+def build_universe(filename: str = config.SYMBOL_UNIVERSE_FILE) -> int:
+    """按代码段查行情，有名称的写进股票表，返回股票数（保留表里手工加的别名）"""
+    from quotes import get_quotes
+
+    quotes = get_quotes(candidate_symbols())
+    stocks = {}
+    if os.path.exists(filename):
+        try:
+            with open(filename, 'r', encoding='utf-8') as f:
+                stocks = json.load(f).get('stocks', {})
+        except (OSError, ValueError):
+            pass
+    for symbol, quote in quotes.items():
+        name = _normalize_name(quote.name)
+        if name:
+            stocks.setdefault(symbol, {"aliases": []})["name"] = name
+
+    tmp_file = filename + '.tmp'
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump({'built': int(time.time()), 'stocks': stocks}, f, ensure_ascii=False)
+    os.replace(tmp_file, filename)
+    return len(stocks)
+
+
+# ---------- 缓存 ----------
+
+def _fingerprint(universe_file: str) -> str:
+    digest = hashlib.sha1(f"{CACHE_VERSION}".encode())
+    digest.update(json.dumps([STOCK_NAMES, ALIASES], ensure_ascii=False, sort_keys=True).encode())
+    if universe_file and os.path.exists(universe_file):
+        with open(universe_file, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def load_tagger(universe_file: str = config.SYMBOL_UNIVERSE_FILE,
+                cache_file: str = config.SYMBOL_TAGGER_CACHE) -> SymbolTagger:
+    """股票表没变就直接加载缓存的自动机，否则重建并写缓存"""
+    fingerprint = _fingerprint(universe_file)
+    if cache_file and os.path.exists(cache_file):
+        try:
+            with open(cache_file, 'r', encoding='utf-8') as f:
+                # 指纹不对就不往下读
+                if json.loads(f.readline()).get('fingerprint') == fingerprint:
+                    return SymbolTagger.from_state(json.load(f))
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            pass  # 缓存损坏 / 版本不对，重建
+
+    start = time.time()
+    tagger = SymbolTagger(build_patterns(load_universe(universe_file)))
+    print(f"   🏷️ 股票识别自动机: {tagger.size} 个模式, {len(tagger.goto)} 个节点, "
+          f"构建 {time.time() - start:.2f}s")
+    if cache_file:
+        tmp_file = cache_file + '.tmp'
+        try:
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                f.write(json.dumps({'fingerprint': fingerprint}) + '\n')
+                json.dump(tagger.state(), f, ensure_ascii=False, separators=(',', ':'))
+            os.replace(tmp_file, cache_file)
+        except OSError as e:
+            print(f"   ⚠️ 自动机缓存写入失败: {e}")
+    return tagger
+
+
+_tagger: Optional[SymbolTagger] = None
+_tagger_lock = threading.Lock()
+
+
+def get_tagger() -> SymbolTagger:
+    """获取进程级共享的识别器"""
+    global _tagger
+    with _tagger_lock:
+        if _tagger is None:
+            _tagger = load_tagger()
+        return _tagger
+
+
+def tag(text: str) -> List[str]:
+    return get_tagger().tag(text)
+
+
+def item_symbols(item: Dict) -> List[str]:
+    """一条数据关联的全部股票：自身的 symbol + 文中提到的（signals / top10 按这个分组）"""
+    symbols = [item["symbol"]] if item.get("symbol") else []
+    return list(dict.fromkeys(symbols + list(item.get("mentions") or [])))
+
+
+def mentioned_symbols(items: List[Dict]) -> List[str]:
+    """一批数据关联到的全部股票（去重，按出现顺序；取行情时用，提到的自选股以外的股票也要有价格）"""
+    return list(dict.fromkeys(symbol for item in items for symbol in item_symbols(item)))
+
+
+if __name__ == "__main__":
+    import sys
+
+    if '--build' in sys.argv:
+        print("🏗️ 拉取全市场股票表...")
+        start = time.time()
+        count = build_universe()
+        print(f"   {count} 只股票 → {config.SYMBOL_UNIVERSE_FILE} ({time.time() - start:.1f}s)")
+        tagger = load_tagger()
+        print(f"✅ 自动机已缓存到 {config.SYMBOL_TAGGER_CACHE}")
+    elif '--bench' in sys.argv:
+        n = int(sys.argv[sys.argv.index('--bench') + 1]) if len(sys.argv) > 2 else 100000
+        start = time.time()
+        tagger = get_tagger()
+        print(f"🏋️ 加载自动机 {time.time() - start:.3f}s ({tagger.size} 个模式)")
+        from text_clean import clean, synthetic_texts
+
+        texts = [clean(t) for t in synthetic_texts(n)]
+        start = time.time()
+        tagged = sum(1 for text in texts if tagger.tag(text))
+        elapsed = time.time() - start
+        chars = sum(len(t) for t in texts)
+        print(f"   {n} 条 / {chars:,} 字: {elapsed:.2f}s ({n / elapsed:,.0f} 条/秒, "
+              f"{chars / elapsed:,.0f} 字/秒), {tagged} 条有提及")
+    else:
+        tagger = get_tagger()
+        for text in sys.argv[1:] or ["中国卫星和湖南黄金今天都涨停了，600519 也不错",
+                                     "$长飞光纤(SH601869)$ 宁王财报超预期，sz002149 跟涨"]:
+            print(f"🏷️ {tagger.tag(text)} ← {text}")
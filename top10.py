@@ -7,10 +7,12 @@ Top10舆情聚合模块
 import json
 import sys
 import os
-from datetime import datetime
-from typing import Dict, List
+from typing import Dict, List, Optional
 from collections import defaultdict
 
+import cassette
+from symbol_tagger import item_symbols, mentioned_symbols
+
 def calculate_top_score(stock_data: Dict) -> float:
     """
     计算Top10综合得分
@@ -48,7 +50,7 @@ def aggregate_by_symbol(analyzed_data: List[Dict], time_window_hours: int = 2) -
     Returns:
         list: 聚合后的股票数据
     """
-    now = datetime.now().timestamp()
+    now = cassette.now()  # 回放时为录制时刻
     cutoff = now - time_window_hours * 3600
     
     # 按股票分组
@@ -62,32 +64,30 @@ def aggregate_by_symbol(analyzed_data: List[Dict], time_window_hours: int = 2) -
         "total_weight": 0,
     })
     
+    # 快讯 / 提到多只股票的帖子计入每只提到的股票
     for item in analyzed_data:
-        symbol = item.get("symbol")
-        if not symbol:
-            continue
-        
         timestamp = item.get("timestamp", 0)
         weight = item.get("weight", 0)
         analysis = item.get("analysis", {})
         
-        data = by_symbol[symbol]
-        data["symbol"] = symbol
-        data["items"].append(item)
-        data["total_score"] += weight
-        
-        if timestamp > cutoff:
-            data["recent_items"].append(item)
-        
-        if analysis.get("sentiment") == "多":
-            data["positive_count"] += 1
-        elif analysis.get("sentiment") == "空":
-            data["negative_count"] += 1
-        
-        if analysis.get("leading") == "是":
-            data["leading_count"] += 1
-        
-        data["total_weight"] += weight
+        for symbol in item_symbols(item):
+            data = by_symbol[symbol]
+            data["symbol"] = symbol
+            data["items"].append(item)
+            data["total_score"] += weight
+            
+            if timestamp > cutoff:
+                data["recent_items"].append(item)
+            
+            if analysis.get("sentiment") == "多":
+                data["positive_count"] += 1
+            elif analysis.get("sentiment") == "空":
+                data["negative_count"] += 1
+            
+            if analysis.get("leading") == "是":
+                data["leading_count"] += 1
+            
+            data["total_weight"] += weight
     
     # 计算聚合指标
     result = []
@@ -162,9 +162,9 @@ def aggregate_by_symbol(analyzed_data: List[Dict], time_window_hours: int = 2) -
     
     return result
 
-def assign_type(stock_data: Dict, price_change: float = 0) -> str:
+def assign_type(stock_data: Dict, price_change: Optional[float] = 0) -> str:
     """
-    为股票分配用途类型
+    为股票分配用途类型（price_change 为 None 表示没有行情，不判断和价格有关的类型）
     """
     score = stock_data["top_score"]
     acceleration = stock_data["acceleration"]
@@ -173,7 +173,7 @@ def assign_type(stock_data: Dict, price_change: float = 0) -> str:
     item_count = stock_data["item_count"]
     
     # 机会型: 舆情升温 + 偏多 + 价格未动
-    if acceleration > 1.5 and bias_shift > 0.1 and abs(price_change) < 1.0 and score > 0.3:
+    if price_change is not None and acceleration > 1.5 and bias_shift > 0.1 and abs(price_change) < 1.0 and score > 0.3:
         return "机会型"
     
     # 风险型: 情绪极端或分歧放大
@@ -181,7 +181,7 @@ def assign_type(stock_data: Dict, price_change: float = 0) -> str:
         return "风险型"
     
     # 验证型: 舆情与价格同步
-    if abs(price_change) > 2 and bias_shift * price_change > 0:
+    if price_change is not None and abs(price_change) > 2 and bias_shift * price_change > 0:
         return "验证型"
     
     # 关注型: 综合得分还可以
@@ -196,7 +196,7 @@ def generate_top10(aggregated_data: List[Dict], price_changes: Dict[str, float],
     
     Args:
         aggregated_data: 聚合后的数据
-        price_changes: 股票涨跌幅
+        price_changes: 股票涨跌幅（没有行情的股票 price_change 为 None）
         limit: 返回数量
     
     Returns:
@@ -206,7 +206,7 @@ def generate_top10(aggregated_data: List[Dict], price_changes: Dict[str, float],
     
     for stock in aggregated_data[:limit * 2]:  # 先取更多
         symbol = stock["symbol"]
-        price_change = price_changes.get(symbol, 0)
+        price_change = price_changes.get(symbol)
         
         stock_type = assign_type(stock, price_change)
         
@@ -255,16 +255,20 @@ if __name__ == "__main__":
     # 加载数据
     analyzed_file = "/tmp/xueqiu_analyzed.jsonl"
     
-    if not os.path.exists(analyzed_file):
+    import column_store
+    if not column_store.has_analyzed() and not os.path.exists(analyzed_file):
         print("\n⚠️ 没有找到分析数据")
         sys.exit(1)
     
-    # 读取
+    # 读取（优先列式存储，只 mmap 用到的列）
     items = []
-    with open(analyzed_file, "r", encoding="utf-8") as f:
-        for line in f:
-            if line.strip():
-                items.append(json.loads(line))
+    if column_store.has_analyzed():
+        items = column_store.load_analyzed()
+    else:
+        with open(analyzed_file, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    items.append(json.loads(line))
     
     print(f"📥 加载 {len(items)} 条分析数据")
     
@@ -273,8 +277,7 @@ if __name__ == "__main__":
     print(f"📊 聚合为 {len(aggregated)} 只股票")
     
     # 获取价格
-    from config import SYMBOLS
-    price_changes = get_price_changes(SYMBOLS)
+    price_changes = get_price_changes(mentioned_symbols(items))
     print(f"📈 获取 {len(price_changes)} 只股票价格")
     
     # 生成Top10
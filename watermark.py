@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+增量抓取 - 每只股票的高水位线
+策略：
+1. 记录每只股票已抓到的最新帖子 id / created_at（高水位线）
+2. 翻页时碰到水位线就停，只下载新帖
+3. 页数预算用完、被拦截 / 限流、请求失败或到了时限时还没碰到水位线 → 中间有断档，记下游标，下一轮回补
+   （不按 id / 时间跳变猜断档：id 是全站共用的递增序号，冷门股两帖之间隔几小时也正常，跳变说明不了漏页）
+"""
+
+import json
+import os
+import threading
+from typing import List, Dict, Any, Optional, Tuple
+
+import cassette
+import config
+
+ONE_DAY_MS = 24 * 60 * 60 * 1000
+
+# 翻页结束原因（walk 函数的返回值之一）
+END_MARK = "mark"  # 碰到水位线
+END_CUTOFF = "cutoff"  # 超过24小时
+END_EMPTY = "empty"  # 没有更多数据
+END_BUDGET = "budget"  # 页数预算用完
+END_BLOCKED = "blocked"  # WAF拦截等
+END_TIMEOUT = "timeout"  # 到了抓取阶段的时限（run.py FETCH_STAGE_TIMEOUT）
+END_FAILED = "failed"  # 请求异常 / 非200 / 浏览器快照失败，重试几次仍不行
+
+# 没翻到头就停下的原因：还没碰到水位线的话要记断档，下一轮回补
+UNFINISHED = (END_BUDGET, END_BLOCKED, END_TIMEOUT, END_FAILED)
+
+
+def split_at_mark(posts: List[Dict], mark: Optional[Dict]) -> Tuple[List[Dict], bool]:
+    """
+    按水位线切分一页数据（帖子按时间倒序）
+
+    Returns:
+        (比水位线新的帖子, 是否已碰到水位线)
+    """
+    if not mark:
+        return posts, False
+
+    newer = []
+    reached = False
+    for post in posts:
+        post_id = post.get('id') or 0
+        if post_id > mark['id']:
+            newer.append(post)
+        elif (post.get('created_at') or 0) <= mark['created_at']:
+            # id 和时间都不比水位线新才算到达（置顶的旧帖只跳过，不停止）
+            reached = True
+            break
+    return newer, reached
+
+
+class WatermarkStore:
+    """水位线存储（JSON 文件；filename 为 None 时只在内存里）"""
+
+    def __init__(self, filename: Optional[str] = config.WATERMARK_FILE):
+        self.filename = filename
+        self.lock = threading.Lock()
+        self.marks: Dict[str, Dict] = {}
+        if filename and os.path.exists(filename):
+            try:
+                with open(filename, 'r', encoding='utf-8') as f:
+                    self.marks = json.load(f)
+            except (OSError, ValueError):
+                self.marks = {}
+
+    def get(self, symbol: str) -> Dict:
+        with self.lock:
+            return dict(self.marks.get(symbol, {}))
+
+    def set(self, symbol: str, entry: Dict):
+        with self.lock:
+            self.marks[symbol] = entry
+            if not self.filename:
+                return
+            tmp_file = self.filename + '.tmp'
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(self.marks, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_file, self.filename)
+
+
+_store: Optional[WatermarkStore] = None
+
+
+def get_store() -> WatermarkStore:
+    """进程级共享的水位线存储（回放时只在内存里，不改真实的水位线文件）"""
+    global _store
+    if _store is None:
+        _store = WatermarkStore(None if cassette.replaying() else config.WATERMARK_FILE)
+    return _store
+
+
+class IncrementalRun:
+    """
+    单只股票的一轮增量抓取
+
+    用法（walk(start_max_id, mark) -> (posts, 结束原因, 最后游标)）:
+        run = IncrementalRun(symbol)
+        run.head_done(*walk(None, run.mark))
+        for gap in run.pending_gaps:
+            run.gap_done(gap, *walk(gap['max_id'], gap_mark(gap)))
+        run.save()
+        return run.posts
+    """
+
+    def __init__(self, symbol: str, store: Optional[WatermarkStore] = None):
+        self.symbol = symbol
+        self.store = store or get_store()
+
+        entry = self.store.get(symbol)
+        self.mark = entry.get('mark')
+        now = cassette.now() * 1000
+        # 只回补24小时窗口内的断档，更早的已经没有意义
+        self.pending_gaps = [g for g in entry.get('gaps', []) if now - g['until_ts'] <= ONE_DAY_MS]
+        self.gaps = list(self.pending_gaps)
+        self.posts: List[Dict[str, Any]] = []
+        self.newest: Optional[Dict] = None
+
+    def head_done(self, posts: List[Dict], reason: str, cursor: Optional[int]):
+        """最新一段抓完"""
+        self.posts.extend(posts)
+        self._track_newest(posts)
+
+        if reason in UNFINISHED and self.mark and cursor:
+            print(f"   🕳️ {self.symbol} 未到水位线就停止翻页，记录断档待回补")
+            self.gaps.append({
+                'max_id': cursor,
+                'until_id': self.mark['id'],
+                'until_ts': self.mark['created_at'],
+            })
+
+    def gap_done(self, gap: Dict, posts: List[Dict], reason: str, cursor: Optional[int]):
+        """一个断档回补完（或部分回补）"""
+        self.posts.extend(posts)
+        self.gaps.remove(gap)
+
+        if reason in UNFINISHED and cursor:
+            self.gaps.append(dict(gap, max_id=cursor))
+        else:
+            print(f"   🩹 {self.symbol} 断档已回补 {len(posts)} 条")
+
+    def _track_newest(self, posts: List[Dict]):
+        for post in posts:
+            if not self.newest or (post.get('id') or 0) > self.newest['id']:
+                self.newest = {'id': post.get('id') or 0, 'created_at': post.get('timestamp') or 0}
+
+    def save(self):
+        mark = self.newest if self.newest and (not self.mark or self.newest['id'] > self.mark['id']) else self.mark
+        self.store.set(self.symbol, {
+            'mark': mark,
+            'gaps': self.gaps,
+            'updated_at': int(cassette.now()),
+        })
+
+
+def gap_mark(gap: Dict) -> Dict:
+    """断档的下沿，当作回补时的水位线"""
+    return {'id': gap['until_id'], 'created_at': gap['until_ts']}
+
+
+def incremental_fetch(symbol: str, walk, store: Optional[WatermarkStore] = None) -> List[Dict[str, Any]]:
+    """
+    同步版增量抓取
+
+    Args:
+        symbol: 股票代码
+        walk: walk(start_max_id, mark) -> (标准化帖子列表, 结束原因, 最后游标)
+
+    Returns:
+        本轮新抓到的帖子
+    """
+    run = IncrementalRun(symbol, store)
+    run.head_done(*walk(None, run.mark))
+    for gap in list(run.pending_gaps):
+        run.gap_done(gap, *walk(gap['max_id'], gap_mark(gap)))
+    run.save()
+    return run.posts
+
+
+if __name__ == "__main__":
+    store = get_store()
+    print(f"💾 水位线文件: {store.filename}")
+    for symbol, entry in store.marks.items():
+        mark = entry.get('mark') or {}
+        print(f"   {symbol}: id={mark.get('id')} 断档={len(entry.get('gaps', []))}")
@@ -0,0 +1,435 @@
+#!/usr/bin/env python3
+"""
+分片抓取 - 本地持久化工作队列（SQLite WAL）
+策略：
+1. 一次抓取拆成工作项 (symbol, 游标 max_id, 剩余页数)，写进 SQLite（WAL 模式，多进程同时读写）
+2. worker 租用工作项，租约 WORK_LEASE_SECONDS 秒，每抓一页续租；worker 崩溃后租约过期，别的 worker 接手
+3. 每个工作项最多翻 WORK_CHUNK_PAGES 页，没翻完就把 (symbol, 下一页游标, 剩余页数) 作为新工作项放回队列，
+   同一只股票的后续页也能被别的 worker 接着抓，崩溃最多丢一小段
+4. 每个 worker 写自己的分区文件 {WORK_OUTPUT_DIR}/{run}/{worker}.jsonl（每行一页原始帖子），互不加锁
+5. 合并器读所有分区、按帖子 id 去重（租约过期重抓会有重复），交给 on_page 或直接标准化写盘
+6. 单个工作项失败 WORK_MAX_ATTEMPTS 次后标记失败，不阻塞整轮
+
+多台机器：SQLite 不适合放在网络文件系统上，跨机器时每台机器各跑一套队列（按股票分组），
+或把 worker 进程放在不同出口 IP 的同一台机器上
+
+使用:
+    python work_queue.py run --workers 4         # 本机入队 + 起 4 个 worker 进程 + 合并
+    python work_queue.py enqueue [SYMBOL ...]    # 只入队，打印 run id
+    python work_queue.py worker --run RUN_ID     # 在任意进程 / 终端里加入抓取
+    python work_queue.py merge --run RUN_ID      # 合并分区到 /tmp/xueqiu_normalized.jsonl
+    python work_queue.py status [--run RUN_ID]
+"""
+
+import json
+import os
+import signal
+import socket
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import cassette
+import config
+
+# 工作项状态
+PENDING = "pending"
+LEASED = "leased"
+DONE = "done"
+FAILED = "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    run TEXT NOT NULL,
+    symbol TEXT NOT NULL,
+    cursor INTEGER,
+    depth INTEGER NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    lease_until REAL NOT NULL DEFAULT 0,
+    pages INTEGER NOT NULL DEFAULT 0,
+    posts INTEGER NOT NULL DEFAULT 0,
+    reason TEXT,
+    error TEXT,
+    updated REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS items_run_state ON items (run, state);
+"""
+
+
+def new_run_id() -> str:
+    return time.strftime('%Y%m%d-%H%M%S')
+
+
+def worker_name() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+class WorkQueue:
+    """SQLite 工作队列（每个线程一个连接，多进程共享同一个库文件）"""
+
+    def __init__(self, filename: str = config.WORK_QUEUE_FILE,
+                 lease_seconds: float = config.WORK_LEASE_SECONDS,
+                 max_attempts: int = config.WORK_MAX_ATTEMPTS):
+        self.filename = filename
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self._local = threading.local()
+        self._conn().executescript(_SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            # isolation_level=None：自己控制事务，写事务用 BEGIN IMMEDIATE 先拿写锁
+            conn = sqlite3.connect(self.filename, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def _write(self, func):
+        """在一个写事务里执行 func(conn)"""
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            result = func(conn)
+            conn.execute('COMMIT')
+            return result
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+
+    # ---------- 生产 ----------
+
+    def enqueue(self, run: str, items: List[Tuple[str, Optional[int], int]]) -> int:
+        """
+        入队一批工作项
+
+        Args:
+            items: [(symbol, 起始游标 max_id 或 None, 页数)]
+        """
+        now = time.time()
+
+        def insert(conn):
+            conn.executemany(
+                'INSERT INTO items (run, symbol, cursor, depth, updated) VALUES (?, ?, ?, ?, ?)',
+                [(run, symbol, cursor, depth, now) for symbol, cursor, depth in items if depth > 0])
+        self._write(insert)
+        return len(items)
+
+    # ---------- 消费 ----------
+
+    def lease(self, run: str, worker: str) -> Optional[Dict]:
+        """租一个工作项（待处理的，或租约已过期的）；没有可租的返回 None"""
+        now = time.time()
+
+        def claim(conn):
+            # 租约过期且次数用完的直接判失败
+            conn.execute(
+                'UPDATE items SET state = ?, error = ?, updated = ? '
+                'WHERE run = ? AND state = ? AND lease_until < ? AND attempts >= ?',
+                (FAILED, 'lease expired', now, run, LEASED, now, self.max_attempts))
+            row = conn.execute(
+                'SELECT * FROM items WHERE run = ? AND (state = ? OR (state = ? AND lease_until < ?)) '
+                'ORDER BY id LIMIT 1', (run, PENDING, LEASED, now)).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                'UPDATE items SET state = ?, worker = ?, lease_until = ?, attempts = attempts + 1, updated = ? '
+                'WHERE id = ?', (LEASED, worker, now + self.lease_seconds, now, row['id']))
+            return dict(row, worker=worker)
+        return self._write(claim)
+
+    def extend(self, item: Dict) -> bool:
+        """续租（每抓完一页调用）；租约已被别人接手时返回 False"""
+        now = time.time()
+        cur = self._conn().execute(
+            'UPDATE items SET lease_until = ?, updated = ? WHERE id = ? AND worker = ? AND state = ?',
+            (now + self.lease_seconds, now, item['id'], item['worker'], LEASED))
+        return cur.rowcount == 1
+
+    def complete(self, item: Dict, pages: int, posts: int, reason: str,
+                 next_cursor: Optional[int] = None) -> bool:
+        """
+        完成工作项；还有剩余页数且没有自然结束时，把后续页作为新工作项放回队列
+
+        Returns:
+            是否仍持有租约（False 表示已超时被别人接手，本次结果只会在合并时被去重）
+        """
+        now = time.time()
+        remaining = item['depth'] - pages
+
+        def finish(conn):
+            cur = conn.execute(
+                'UPDATE items SET state = ?, pages = ?, posts = ?, reason = ?, updated = ? '
+                'WHERE id = ? AND worker = ? AND state = ?',
+                (DONE, pages, posts, reason, now, item['id'], item['worker'], LEASED))
+            if cur.rowcount != 1:
+                return False
+            if next_cursor is not None and remaining > 0:
+                conn.execute(
+                    'INSERT INTO items (run, symbol, cursor, depth, updated) VALUES (?, ?, ?, ?, ?)',
+                    (item['run'], item['symbol'], next_cursor, remaining, now))
+            return True
+        return self._write(finish)
+
+    def fail(self, item: Dict, error: str):
+        """处理失败：次数没用完放回队列，否则标记失败"""
+        now = time.time()
+        state = FAILED if item['attempts'] + 1 >= self.max_attempts else PENDING
+        self._conn().execute(
+            'UPDATE items SET state = ?, error = ?, lease_until = 0, updated = ? '
+            'WHERE id = ? AND worker = ? AND state = ?',
+            (state, error[:500], now, item['id'], item['worker'], LEASED))
+
+    # ---------- 查询 ----------
+
+    def counts(self, run: str) -> Dict[str, int]:
+        rows = self._conn().execute(
+            'SELECT state, COUNT(*) AS n FROM items WHERE run = ? GROUP BY state', (run,)).fetchall()
+        return {row['state']: row['n'] for row in rows}
+
+    def active(self, run: str) -> bool:
+        """本轮还有没完成的工作项（待处理或租用中）"""
+        counts = self.counts(run)
+        return counts.get(PENDING, 0) + counts.get(LEASED, 0) > 0
+
+    def runs(self, limit: int = 10) -> List[str]:
+        rows = self._conn().execute(
+            'SELECT run, MAX(updated) AS last FROM items GROUP BY run ORDER BY last DESC LIMIT ?',
+            (limit,)).fetchall()
+        return [row['run'] for row in rows]
+
+    def summary(self, run: str) -> Dict:
+        row = self._conn().execute(
+            'SELECT COUNT(DISTINCT symbol) AS symbols, SUM(pages) AS pages, SUM(posts) AS posts, '
+            'COUNT(DISTINCT worker) AS workers FROM items WHERE run = ?', (run,)).fetchone()
+        return dict(row, states=self.counts(run))
+
+
+# ---------- worker ----------
+
+def partition_path(run: str, worker: str, output_dir: str = config.WORK_OUTPUT_DIR) -> str:
+    return os.path.join(output_dir, run, f"{worker}.jsonl")
+
+
+def process_item(queue: WorkQueue, item: Dict, out) -> Tuple[int, int, str, Optional[int]]:
+    """抓一个工作项：从游标开始最多翻 WORK_CHUNK_PAGES 页，每页写进分区并续租"""
+    from fetch_status_v2 import PageWalk, iter_pages
+    from session_pool import get_pool
+    from watermark import END_BUDGET
+
+    chunk = min(item['depth'], config.WORK_CHUNK_PAGES)
+    walk = PageWalk(item['symbol'], chunk, item['cursor'], verbose=False)
+    pool = get_pool()
+    with pool.session() as session:
+        for posts in iter_pages(pool, session, walk):
+            out.write(json.dumps({'item': item['id'], 'symbol': item['symbol'], 'posts': posts},
+                                 ensure_ascii=False) + '\n')
+            out.flush()
+            queue.extend(item)
+
+    # 只有页数用完才需要接着翻；碰到24小时截止 / 没有更多 / 被拦截都算这只股票结束
+    pages = walk.page - 1 if walk.reason == END_BUDGET else walk.page
+    next_cursor = walk.max_id if walk.reason == END_BUDGET else None
+    return pages, walk.count, walk.reason, next_cursor
+
+
+def run_worker(run: str, worker: Optional[str] = None, queue: Optional[WorkQueue] = None,
+               output_dir: str = config.WORK_OUTPUT_DIR, poll: float = 1.0) -> int:
+    """
+    持续租用并处理工作项，直到本轮所有工作项都结束
+
+    Returns:
+        本 worker 处理的工作项数
+    """
+    queue = queue or WorkQueue()
+    worker = worker or worker_name()
+    path = partition_path(run, worker, output_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    handled = 0
+    with open(path, 'a', encoding='utf-8') as out:
+        while True:
+            item = queue.lease(run, worker)
+            if item is None:
+                # 别的 worker 手上还有租约：等一会儿，它们崩溃的话租约过期后由这里接手
+                if not queue.active(run):
+                    break
+                time.sleep(poll)
+                continue
+
+            try:
+                pages, posts, reason, next_cursor = process_item(queue, item, out)
+                queue.complete(item, pages, posts, reason, next_cursor)
+                print(f"   ✅ [{worker}] {item['symbol']} 游标 {item['cursor']}: {posts} 条 / {pages} 页 ({reason})")
+            except Exception as e:
+                queue.fail(item, f"{type(e).__name__}: {e}")
+                print(f"   ❌ [{worker}] {item['symbol']} 失败: {e}")
+            handled += 1
+    return handled
+
+
+# ---------- 合并 ----------
+
+def iter_partitions(run: str, output_dir: str = config.WORK_OUTPUT_DIR) -> Iterator[Tuple[str, List[Dict]]]:
+    """按页 yield 各分区里的 (symbol, 原始帖子)，同一帖子只出现一次"""
+    directory = os.path.join(output_dir, run)
+    if not os.path.isdir(directory):
+        return
+    seen = set()
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith('.jsonl'):
+            continue
+        with open(os.path.join(directory, name), 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    page = json.loads(line)
+                except ValueError:
+                    continue  # worker 崩溃时写到一半的最后一行
+                posts = []
+                for post in page['posts']:
+                    key = (page['symbol'], post.get('id'))
+                    if key not in seen:
+                        seen.add(key)
+                        posts.append(post)
+                if posts:
+                    yield page['symbol'], posts
+
+
+def merge(run: str, on_page: Optional[Callable[[str, List[Dict]], None]] = None,
+          output_dir: str = config.WORK_OUTPUT_DIR) -> int:
+    """
+    合并一轮的所有分区
+
+    Args:
+        on_page: 每页回调 on_page(symbol, 原始帖子)；不传则标准化写到 /tmp/xueqiu_normalized.jsonl
+
+    Returns:
+        去重后的帖子数
+    """
+    total = 0
+    if on_page is not None:
+        for symbol, posts in iter_partitions(run, output_dir):
+            on_page(symbol, posts)
+            total += len(posts)
+        return total
+
+    from normalize import SortedJsonlWriter, normalize_status
+    with SortedJsonlWriter() as writer:
+        for symbol, posts in iter_partitions(run, output_dir):
+            writer.extend(normalize_status(post, symbol) for post in posts)
+            total += len(posts)
+    return total
+
+
+def spawn_workers(run: str, count: int) -> List[subprocess.Popen]:
+    """
+    在本机起 count 个 worker 进程（和在其他终端 / 机器上手动起 worker 等价）
+
+    录制 / 回放模式经环境变量传给 worker（cassette.child_env），录制的话结束后用 merge_recordings 收回
+    """
+    script = os.path.abspath(__file__)
+    procs = []
+    for i in range(count):
+        name = f"{worker_name()}-w{i}"
+        procs.append(subprocess.Popen([sys.executable, script, 'worker', '--run', run, '--id', name],
+                                      env=cassette.child_env(name)))
+    return procs
+
+
+def merge_recordings(procs: List[subprocess.Popen]):
+    """录制模式下把各 worker 的录制并进当前进程的归档"""
+    tape = cassette.get_cassette()
+    if tape is None or tape.replaying:
+        return
+    # worker 名是命令行最后一个参数（--id）
+    merged = sum(1 for proc in procs if tape.merge(cassette.child_filename(tape, proc.args[-1])))
+    print(f"   📼 合并 {merged} 个 worker 的录制")
+
+
+def crawl_distributed(symbols: List[str], workers: int,
+                      on_page: Optional[Callable[[str, List[Dict]], None]] = None,
+                      page_depth: Optional[Dict[str, int]] = None,
+                      max_pages: Optional[int] = None,
+                      deadline: Optional[float] = None) -> int:
+    """
+    入队 → 本机起 workers 个 worker 进程 → 等全部结束 → 合并
+
+    Args:
+        deadline: 时限（time.time() 时间戳）：到点终止还在跑的 worker，合并已写出的分区
+
+    Returns:
+        去重后的帖子数
+    """
+    queue = WorkQueue()
+    run = new_run_id()
+    depth = page_depth or {}
+    queue.enqueue(run, [(s, None, depth.get(s, max_pages or config.CRAWL_MAX_PAGES)) for s in symbols])
+    print(f"   📋 工作队列 {run}: {len(symbols)} 只股票, {workers} 个 worker")
+
+    expired = False
+    procs = spawn_workers(run, workers)
+    for proc in procs:
+        try:
+            proc.wait(timeout=max(deadline - time.time(), 0) if deadline else None)
+        except subprocess.TimeoutExpired:
+            expired = True
+            proc.terminate()
+            proc.wait()
+    merge_recordings(procs)
+    if expired:
+        print(f"   ⏱️ {run}: 到达抓取时限，已终止 worker，只合并已抓到的页")
+    elif queue.active(run):
+        # worker 全部异常退出时，剩下的由当前进程收尾
+        run_worker(run, queue=queue)
+
+    summary = queue.summary(run)
+    print(f"   📋 {run}: {summary['pages']} 页, {summary['workers']} 个 worker, 状态 {summary['states']}")
+    return merge(run, on_page)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="分片抓取工作队列")
+    parser.add_argument("command", choices=["run", "enqueue", "worker", "merge", "status"])
+    parser.add_argument("symbols", nargs="*", help="股票代码（默认 config.SYMBOLS）")
+    parser.add_argument("--run", help="run id（worker / merge / status 用）")
+    parser.add_argument("--id", help="worker 名称（默认 主机名-pid）")
+    parser.add_argument("--workers", type=int, default=4, help="run 命令起几个 worker 进程")
+    parser.add_argument("--pages", type=int, default=config.CRAWL_MAX_PAGES, help="每只股票翻页数")
+    args = parser.parse_intermixed_args()
+
+    queue = WorkQueue()
+    symbols = args.symbols or config.SYMBOLS
+
+    if args.command == "run":
+        start = time.time()
+        total = crawl_distributed(symbols, args.workers, max_pages=args.pages)
+        print(f"💾 合并 {total} 条 → /tmp/xueqiu_normalized.jsonl ({time.time() - start:.1f}s)")
+    elif args.command == "enqueue":
+        run = args.run or new_run_id()
+        queue.enqueue(run, [(s, None, args.pages) for s in symbols])
+        print(run)
+    elif args.command == "worker":
+        if not args.run:
+            parser.error("worker 需要 --run")
+        # 被终止（抓取时限）时正常退出，atexit 里的录制写盘照常执行
+        signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+        handled = run_worker(args.run, args.id, queue)
+        print(f"👷 worker {args.id or worker_name()} 处理 {handled} 个工作项")
+    elif args.command == "merge":
+        run = args.run or (queue.runs(1) or [None])[0]
+        if not run:
+            parser.error("没有可合并的 run")
+        print(f"💾 {run}: 合并 {merge(run)} 条 → /tmp/xueqiu_normalized.jsonl")
+    else:
+        for run in ([args.run] if args.run else queue.runs()):
+            print(f"📋 {run}: {queue.summary(run)}")
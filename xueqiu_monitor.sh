@@ -5,6 +5,7 @@
 SYMBOLS=("SH600118:中国卫星" "SZ002155:湖南黄金" "SZ300456:赛微电子" "SH600879:航天电子" "SZ002565:顺灏股份")
 OUTPUT_DIR="/Users/joinylee/Openclaw/xueqiu_sentiment/reports"
 TIMESTAMP=$(date +%Y%m%d_%H%M%S)
+SCRIPT_DIR="$(cd "$(dirname "$0")" && pwd)"
 
 mkdir -p "$OUTPUT_DIR"
 
@@ -13,6 +14,24 @@ echo "🐧 雪球舆情监控 - Shell版"
 echo "⏰ $(date '+%Y-%m-%d %H:%M:%S')"
 echo "============================================================"
 
+# 快照轮询间隔（秒），累计约8秒超时；与 config.BROWSER_POLL_* 保持一致
+POLL_INTERVALS="0.3 0.45 0.68 1 1 1 1 1 1"
+LATENCY_FILE="/tmp/xueqiu_browser_latency.jsonl"
+
+# 毫秒时间戳（macOS 自带 date 不支持 %N）
+now_ms() {
+    python3 -c 'import time; print(int(time.time() * 1000))'
+}
+
+# 记录页面等待耗时，格式与 browser_pool.record_latency 相同
+record_latency() {
+    local url=$1 start_ms=$2 polls=$3 ready=$4
+    local elapsed_ms=$(( $(now_ms) - start_ms ))
+    printf '{"ts": %d, "path": "%s", "elapsed": %d.%03d, "polls": %d, "ready": %s}\n' \
+        "$(date +%s)" "${url%%\?*}" $((elapsed_ms / 1000)) $((elapsed_ms % 1000)) "$polls" "$ready" \
+        >> "$LATENCY_FILE" 2>/dev/null
+}
+
 # 抓取单只股票
 fetch_stock() {
     local symbol=$1
@@ -33,61 +52,63 @@ fetch_stock() {
         return
     fi
     
-    sleep 2
-    
-    # 获取快照并保存到临时文件
+    # 轮询快照直到出现JSON数据（间隔递增，最多约8秒），代替固定 sleep 2
     local tmp_file="/tmp/xueqiu_${symbol}.txt"
-    openclaw browser snapshot --target-id "$target_id" > "$tmp_file" 2>&1
+    local start_ms=$(now_ms)
+    local polls=0
+    local ready=false
+    for interval in $POLL_INTERVALS; do
+        sleep "$interval"
+        polls=$((polls + 1))
+        openclaw browser snapshot --target-id "$target_id" > "$tmp_file" 2>&1
+        if grep -q 'generic \[ref=' "$tmp_file"; then
+            ready=true
+            break
+        fi
+    done
+    record_latency "$url" "$start_ms" "$polls" "$ready"
     
     # 关闭页面
     openclaw browser close --target-id "$target_id" > /dev/null 2>&1
     
     # 解析JSON并提取前3条讨论
     python3 << EOF
-import json
 import re
+import sys
+
+sys.path.insert(0, "$SCRIPT_DIR")
+from snapshot_parser import parse_snapshot
 
 with open("$tmp_file", "r") as f:
     content = f.read()
 
-# 找到JSON部分
+# 单遍解析 snapshot（与 Python 版共用 snapshot_parser）
 if 'generic [ref=' in content:
-    # 提取 ": " 后面的JSON字符串
-    parts = content.split('": "', 1)
-    if len(parts) > 1:
-        json_str = parts[1].strip()
-        # 去掉末尾的 "
-        if json_str.endswith('"'):
-            json_str = json_str[:-1]
+    try:
+        posts = parse_snapshot(content)
         
-        try:
-            data = json.loads(json_str)
-            posts = data.get('list', [])
+        count = 0
+        for p in posts[:3]:
+            text = p.get('text', '')
+            # 去除HTML标签
+            text = re.sub(r'<[^>]+>', '', text)
+            text = text.replace('&nbsp;', ' ').replace('&quot;', '"')[:60]
             
-            count = 0
-            for p in posts[:3]:
-                text = p.get('text', '')
-                # 去除HTML标签
-                text = re.sub(r'<[^>]+>', '', text)
-                text = text.replace('&nbsp;', ' ').replace('&quot;', '"')[:60]
-                
-                # 时间转换
-                ts = p.get('created_at', 0)
-                from datetime import datetime
-                tm = datetime.fromtimestamp(ts/1000).strftime('%H:%M')
-                
-                author = p.get('user', {}).get('screen_name', '匿名')
-                
-                print(f"   {count+1}. [{tm}] {author}")
-                print(f"      {text}...")
-                count += 1
+            # 时间转换
+            ts = p.get('created_at', 0)
+            from datetime import datetime
+            tm = datetime.fromtimestamp(ts/1000).strftime('%H:%M')
             
-            if count == 0:
-                print("   暂无数据")
-        except Exception as e:
-            print(f"   解析失败: {str(e)[:50]}")
-    else:
-        print("   未找到数据")
+            author = p.get('user', {}).get('screen_name', '匿名')
+            
+            print(f"   {count+1}. [{tm}] {author}")
+            print(f"      {text}...")
+            count += 1
+        
+        if count == 0:
+            print("   暂无数据")
+    except Exception as e:
+        print(f"   解析失败: {str(e)[:50]}")
 else:
     print("   格式错误")
 EOF
@@ -13,15 +13,18 @@
     python xueqiu_monitor_v2.py
 """
 
-import subprocess
 import json
-import re
 import time
 import os
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import List, Dict, Any, Optional
 import sys
 
+from browser_pool import get_browser_pool
+from snapshot_parser import parse_snapshot
+import text_clean
+
 # ============ 配置 ============
 SYMBOLS = [
     ("SH600118", "中国卫星"),
@@ -59,89 +62,14 @@ def fetch_page(symbol: str, max_id: Optional[int] = None) -> List[Dict]:
         url += f'&max_id={max_id}'
     
     try:
-        # 打开页面
-        r1 = subprocess.run(
-            ['openclaw', 'browser', 'open', url],
-            capture_output=True, text=True, timeout=30
-        )
-        
-        match = re.search(r'id:\s*([A-F0-9]+)', r1.stdout)
-        if not match:
-            print(f"   ⚠️ 无法获取页面ID")
+        # 借常驻标签页获取快照
+        snapshot = get_browser_pool().snapshot(url)
+        if not snapshot:
+            print(f"   ⚠️ 无法获取页面")
             return []
         
-        target_id = match.group(1)
-        time.sleep(2)  # 等待页面加载
-        
-        # 获取快照
-        r2 = subprocess.run(
-            ['openclaw', 'browser', 'snapshot', '--target-id', target_id],
-            capture_output=True, text=True, timeout=30
-        )
-        
-        # 关闭页面
-        subprocess.run(
-            ['openclaw', 'browser', 'close', '--target-id', target_id],
-            capture_output=True, timeout=10
-        )
-        
-        # 解析JSON数据 - 使用更健壮的方式
-        # 保存原始输出到临时文件，然后使用正则提取
-        import tempfile
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.txt', delete=False) as f:
-            f.write(r2.stdout)
-            tmp_file = f.name
-        
-        try:
-            with open(tmp_file, 'r') as f:
-                content = f.read()
-            
-            os.unlink(tmp_file)
-            
-            # 找到JSON开始的位置
-            if 'generic [ref=' not in content:
-                return []
-            
-            # 格式: - generic [ref=e2]: "{...}"
-            # 找到 ": " 后面的 "{ 开头
-            marker = 'generic [ref='
-            pos = content.find(marker)
-            if pos < 0:
-                return []
-            
-            # 从marker位置向后找 ": "
-            colon_pos = content.find('": "', pos)
-            if colon_pos < 0:
-                return []
-            
-            # JSON从 ": " 后面开始，以 " 结尾
-            start = colon_pos + 3  # 跳过 ": "
-            
-            # 找到行尾的 "
-            end = content.find('"', start)
-            if end < 0:
-                end = len(content)
-            
-            if start >= end:
-                return []
-            
-            json_str = content[start:end]
-            
-            try:
-                data = json.loads(json_str)
-                return data.get('list', [])
-            except json.JSONDecodeError:
-                # 尝试修复常见的JSON问题
-                # 替换未转义的控制字符
-                json_str = re.sub(r'[\x00-\x1F]', '', json_str)
-                try:
-                    data = json.loads(json_str)
-                    return data.get('list', [])
-                except:
-                    return []
-        except Exception as e:
-            print(f"   解析错误: {e}")
-            return []
+        # 单遍流式解析，不再写临时文件
+        return parse_snapshot(snapshot)
         
     except Exception as e:
         print(f"   ❌ 抓取错误: {e}")
@@ -179,9 +107,7 @@ def fetch_24h_posts(symbol: str, name: str) -> List[Dict]:
                 break
             
             # 清洗文本
-            html_text = post.get('text', '')
-            plain_text = re.sub(r'<[^>]+>', '', html_text)
-            plain_text = plain_text.replace('&nbsp;', ' ').replace('&quot;', '"').strip()
+            plain_text = text_clean.clean(post.get('text', ''))
             
             if len(plain_text) < 5:  # 过滤太短的
                 continue
@@ -289,12 +215,10 @@ def main():
     print(f"   最大页数: {MAX_PAGES}")
     print(f"   限速: {SLEEP_TIME}秒/页")
     
-    # 抓取数据
-    all_data = {}
-    for symbol, name in SYMBOLS:
-        posts = fetch_24h_posts(symbol, name)
-        all_data[symbol] = posts
-        time.sleep(1)  # 股票间间隔
+    # 抓取数据（多只股票并行，每个常驻标签页一只）
+    with ThreadPoolExecutor(max_workers=get_browser_pool().size) as executor:
+        results = executor.map(lambda item: fetch_24h_posts(*item), SYMBOLS)
+        all_data = {symbol: posts for (symbol, _), posts in zip(SYMBOLS, results)}
     
     # 生成报告
     print("\n" + "=" * 60)
@@ -4,7 +4,6 @@
 基于 V4 稳定版优化，增强错误处理
 """
 
-import subprocess
 import json
 import re
 import time
@@ -12,6 +11,9 @@ import os
 from datetime import datetime
 from typing import List, Dict
 
+from browser_pool import get_browser_pool
+from snapshot_parser import parse_snapshot
+
 SYMBOLS = [
     ("SH600118", "中国卫星"),
     ("SZ002155", "湖南黄金"),
@@ -32,73 +34,17 @@ def get_sentiment(text: str) -> str:
     elif bear > bull: return "🔴"
     return "⚪"
 
-def parse_json_robust(json_str: str) -> Dict:
-    """健壮的 JSON 解析"""
-    # 尝试1: 直接解析
-    try:
-        return json.loads(json_str)
-    except:
-        pass
-    
-    # 尝试2: 去除控制字符
-    try:
-        cleaned = ''.join(c for c in json_str if ord(c) >= 32 or c in '\n\t\r')
-        return json.loads(cleaned)
-    except:
-        pass
-    
-    # 尝试3: 修复转义
-    try:
-        # 替换未转义的引号（在字符串值内部）
-        cleaned = json_str.replace('\\"', '\x00')  # 临时替换
-        cleaned = cleaned.replace('"', '\\"')  # 转义所有引号
-        cleaned = cleaned.replace('\x00', '"')  # 恢复
-        return json.loads(cleaned)
-    except:
-        pass
-    
-    return {}
-
 def fetch_one(symbol: str) -> List[Dict]:
     """抓取单页"""
     ts = int(time.time() * 1000)
     url = f"https://xueqiu.com/statuses/search.json?count=20&symbol={symbol}&page=1&_={ts}"
     
     try:
-        # 打开
-        r1 = subprocess.run(['openclaw', 'browser', 'open', url], 
-            capture_output=True, text=True, timeout=30)
-        
-        m = re.search(r'id:\s*([A-F0-9]+)', r1.stdout)
-        if not m: return []
-        
-        tid = m.group(1)
-        time.sleep(2)
-        
-        # 快照
-        r2 = subprocess.run(['openclaw', 'browser', 'snapshot', '--target-id', tid],
-            capture_output=True, text=True, timeout=30)
-        
-        # 关闭
-        subprocess.run(['openclaw', 'browser', 'close', '--target-id', tid],
-            capture_output=True, timeout=10)
-        
-        # 解析
-        line = r2.stdout.strip()
-        if ': "' not in line: return []
-        
-        # 提取 JSON 字符串
-        parts = line.split(': "', 1)
-        json_str = parts[1]
-        if json_str.endswith('"'):
-            json_str = json_str[:-1]
-        
-        # 反转义
-        json_str = json_str.replace('\\"', '"').replace('\\n', '\n').replace('\\\\', '\\')
+        # 常驻标签页打开，轮询等待数据就绪
+        snapshot = get_browser_pool().snapshot(url)
         
-        # 解析
-        data = parse_json_robust(json_str)
-        return data.get('list', [])
+        # 单遍解析 snapshot
+        return parse_snapshot(snapshot)
         
     except Exception as e:
         return []
@@ -4,7 +4,6 @@
 使用 browser + 正确解析 JSON
 """
 
-import subprocess
 import json
 import re
 import time
@@ -12,6 +11,9 @@ import os
 from datetime import datetime
 from typing import List, Dict
 
+from browser_pool import get_browser_pool
+from snapshot_parser import parse_snapshot
+
 # ============ 配置 ============
 SYMBOLS = [
     ("SH600118", "中国卫星"),
@@ -42,49 +44,11 @@ def fetch_posts_browser(symbol: str, page: int = 1) -> List[Dict]:
     url = f"https://xueqiu.com/statuses/search.json?count=20&comment=0&symbol={symbol}&hl=0&source=user&sort=time&page={page}&_={timestamp}"
     
     try:
-        # 打开页面
-        r1 = subprocess.run(
-            ['openclaw', 'browser', 'open', url],
-            capture_output=True, text=True, timeout=30
-        )
-        
-        # 提取 target_id
-        match = re.search(r'id:\s*([A-F0-9]+)', r1.stdout)
-        if not match:
-            return []
-        
-        target_id = match.group(1)
-        time.sleep(2)
-        
-        # 获取快照
-        r2 = subprocess.run(
-            ['openclaw', 'browser', 'snapshot', '--target-id', target_id],
-            capture_output=True, text=True, timeout=30
-        )
-        
-        # 关闭页面
-        subprocess.run(
-            ['openclaw', 'browser', 'close', '--target-id', target_id],
-            capture_output=True, timeout=10
-        )
-        
-        # 解析 JSON - 格式: - generic [ref=e2]: "{...}"
-        line = r2.stdout.strip()
-        
-        # 找到 ": " 后面的内容
-        if ': "' not in line:
-            return []
-        
-        # 提取 JSON 字符串（去掉外层引号）
-        json_str = line.split(': "', 1)[1]
-        if json_str.endswith('"'):
-            json_str = json_str[:-1]
-        
-        # 反转义
-        json_str = json_str.replace('\\"', '"').replace('\\n', '\n').replace('\\\\', '\\')
+        # 常驻标签页打开，轮询等待数据就绪
+        snapshot = get_browser_pool().snapshot(url)
         
-        data = json.loads(json_str)
-        return data.get('list', [])
+        # 单遍解析 snapshot - 格式: - generic [ref=e2]: "{...}"
+        return parse_snapshot(snapshot)
         
     except Exception as e:
         print(f"   错误: {str(e)[:50]}")
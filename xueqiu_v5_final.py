@@ -4,7 +4,6 @@
 重点解决 JSON 解析问题
 """
 
-import subprocess
 import json
 import re
 import time
@@ -12,6 +11,9 @@ import os
 from datetime import datetime
 from typing import List, Dict
 
+from browser_pool import get_browser_pool
+from snapshot_parser import parse_snapshot
+
 # ============ 配置 ============
 SYMBOLS = [
     ("SH600118", "中国卫星"),
@@ -36,95 +38,17 @@ def analyze_sentiment(text: str) -> str:
         return "🔴"
     return "⚪"
 
-def safe_parse_json(json_str: str) -> Dict:
-    """安全解析 JSON，处理各种异常情况"""
-    try:
-        # 第一次尝试：直接解析
-        return json.loads(json_str)
-    except:
-        pass
-    
-    try:
-        # 第二次：处理未转义的控制字符
-        # 替换控制字符（除了正常的 \n \t \r）
-        cleaned = re.sub(r'[\x00-\x08\x0b\x0c\x0e-\x1f]', '', json_str)
-        return json.loads(cleaned)
-    except:
-        pass
-    
-    try:
-        # 第三次：尝试用 ast.literal_eval
-        import ast
-        return ast.literal_eval(json_str)
-    except:
-        pass
-    
-    try:
-        # 第四次：修复常见 JSON 问题
-        # 替换单引号为双引号
-        cleaned = json_str.replace("'", '"')
-        # 修复缺失引号的键
-        cleaned = re.sub(r'(\w+):', r'"\1":', cleaned)
-        return json.loads(cleaned)
-    except:
-        pass
-    
-    return {}
-
 def fetch_posts_browser(symbol: str, page: int = 1) -> List[Dict]:
     """使用 browser 抓取数据"""
     timestamp = int(time.time() * 1000)
     url = f"https://xueqiu.com/statuses/search.json?count=20&comment=0&symbol={symbol}&hl=0&source=user&sort=time&page={page}&_={timestamp}"
     
     try:
-        # 打开页面
-        r1 = subprocess.run(
-            ['openclaw', 'browser', 'open', url],
-            capture_output=True, text=True, timeout=30
-        )
-        
-        match = re.search(r'id:\s*([A-F0-9]+)', r1.stdout)
-        if not match:
-            return []
-        
-        target_id = match.group(1)
-        time.sleep(2)
-        
-        # 获取快照
-        r2 = subprocess.run(
-            ['openclaw', 'browser', 'snapshot', '--target-id', target_id],
-            capture_output=True, text=True, timeout=30
-        )
-        
-        # 关闭页面
-        subprocess.run(
-            ['openclaw', 'browser', 'close', '--target-id', target_id],
-            capture_output=True, timeout=10
-        )
-        
-        # 解析 JSON
-        line = r2.stdout.strip()
-        
-        # 找到 ": " 后的 JSON 字符串
-        if ': "' not in line:
-            return []
-        
-        # 提取 "{ 开头，}" 结尾的部分
-        start = line.find('"{')
-        end = line.rfind('}"')
-        
-        if start < 0 or end <= start:
-            return []
-        
-        # 提取 JSON 字符串（去掉外层引号）
-        json_str = line[start+1:end+1]
-        
-        # 反转义
-        json_str = json_str.replace('\\"', '"').replace('\\n', '\n').replace('\\\\', '\\').replace('\\/', '/')
+        # 常驻标签页打开，轮询等待数据就绪
+        snapshot = get_browser_pool().snapshot(url)
         
-        # 安全解析
-        data = safe_parse_json(json_str)
-        return data.get('list', [])
+        # 单遍解析 snapshot
+        return parse_snapshot(snapshot)
         
     except Exception as e:
         return []
@@ -4,13 +4,16 @@
 不解析完整 JSON，直接用正则提取关键字段
 """
 
-import subprocess
 import re
 import time
 import os
 from datetime import datetime
+from itertools import islice
 from typing import List, Dict
 
+from browser_pool import get_browser_pool
+from snapshot_parser import iter_snapshot_posts
+
 SYMBOLS = [
     ("SH600118", "中国卫星"),
     ("SZ002155", "湖南黄金"),
@@ -33,49 +36,31 @@ def analyze_sentiment(text: str) -> str:
         return "🔴"
     return "⚪"
 
-def extract_posts_from_json(raw_text: str) -> List[Dict]:
-    """从原始 JSON 文本中提取帖子"""
+def extract_posts(snapshot: str) -> List[Dict]:
+    """从 snapshot 中提取帖子（逐条完整解析，字段不会错位）"""
     posts = []
     
-    # 找到所有 "text":"..." 的内容
-    # 雪球的内容在 "text":"<p>...</p>" 或 "text":"..." 中
-    text_pattern = r'"text":"(.*?)"(?:,"|})'
-    texts = re.findall(text_pattern, raw_text, re.DOTALL)
-    
-    # 找到所有时间戳
-    time_pattern = r'"created_at":(\d+)'
-    times = re.findall(time_pattern, raw_text)
-    
-    # 找到所有作者
-    author_pattern = r'"screen_name":"(.*?)"'
-    authors = re.findall(author_pattern, raw_text)
-    
-    # 组合数据（取前20条）
-    for i in range(min(len(texts), 20)):
-        try:
-            text = texts[i]
-            # 反转义
-            text = text.replace('\\"', '"').replace('\\n', '\n').replace('\\\\', '\\').replace('<br/>', '\n')
-            # 去除 HTML 标签
-            text = re.sub(r'<[^>]+>', '', text)
-            # 去除股票代码标记
-            text = re.sub(r'\$.*?\$', '', text)
-            text = text.strip()
-            
-            if len(text) < 5:
-                continue
-            
-            ts = int(times[i]) if i < len(times) else 0
-            author = authors[i] if i < len(authors) else "匿名"
-            
-            posts.append({
-                'text': text,
-                'author': author,
-                'time': datetime.fromtimestamp(ts/1000).strftime('%m-%d %H:%M') if ts else "",
-                'sentiment': analyze_sentiment(text),
-            })
-        except:
+    # 取前20条
+    for item in islice(iter_snapshot_posts(snapshot), 20):
+        text = (item.get('text') or '').replace('<br/>', '\n')
+        # 去除 HTML 标签
+        text = re.sub(r'<[^>]+>', '', text)
+        # 去除股票代码标记
+        text = re.sub(r'\$.*?\$', '', text)
+        text = text.strip()
+        
+        if len(text) < 5:
             continue
+        
+        ts = item.get('created_at') or 0
+        author = (item.get('user') or {}).get('screen_name') or "匿名"
+        
+        posts.append({
+            'text': text,
+            'author': author,
+            'time': datetime.fromtimestamp(ts/1000).strftime('%m-%d %H:%M') if ts else "",
+            'sentiment': analyze_sentiment(text),
+        })
     
     return posts
 
@@ -88,52 +73,15 @@ def fetch_stock(symbol: str, name: str) -> List[Dict]:
     url = f"https://xueqiu.com/statuses/search.json?count=20&comment=0&symbol={symbol}&hl=0&source=user&sort=time&page=1&_={timestamp}"
     
     try:
-        # 打开页面
-        r1 = subprocess.run(
-            ['openclaw', 'browser', 'open', url],
-            capture_output=True, text=True, timeout=30
-        )
-        
-        match = re.search(r'id:\s*([A-F0-9]+)', r1.stdout)
-        if not match:
-            print("   ⚠️ 无法打开页面")
-            return []
+        # 常驻标签页打开，轮询等待数据就绪
+        snapshot = get_browser_pool().snapshot(url)
         
-        target_id = match.group(1)
-        time.sleep(2)
-        
-        # 获取快照
-        r2 = subprocess.run(
-            ['openclaw', 'browser', 'snapshot', '--target-id', target_id],
-            capture_output=True, text=True, timeout=30
-        )
-        
-        # 关闭页面
-        subprocess.run(
-            ['openclaw', 'browser', 'close', '--target-id', target_id],
-            capture_output=True, timeout=10
-        )
-        
-        # 提取原始 JSON 字符串
-        line = r2.stdout.strip()
-        
-        # 找到 "{ 开始的部分
-        if ': "' not in line:
-            print("   ⚠️ 格式错误")
-            return []
-        
-        # 提取 JSON 部分
-        start = line.find('"{')
-        end = line.rfind('}"')
-        
-        if start < 0 or end <= start:
+        if 'generic [ref=' not in snapshot:
             print("   ⚠️ 未找到数据")
             return []
         
-        raw_json = line[start+1:end+1]
-        
-        # 用正则提取帖子
-        posts = extract_posts_from_json(raw_json)
+        # 单遍解析 snapshot
+        posts = extract_posts(snapshot)
         
         # 过滤24小时内的
         now_ts = datetime.now().timestamp() * 1000
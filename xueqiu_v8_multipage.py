@@ -4,11 +4,14 @@
 支持翻页，获取更多讨论内容
 """
 
-import subprocess
-import re
 import time
 import os
 from datetime import datetime
+from itertools import islice
+
+from browser_pool import get_browser_pool
+from snapshot_parser import iter_snapshot_posts
+import text_clean
 
 SYMBOLS = [
     ("SH600118", "中国卫星"),
@@ -32,40 +35,27 @@ def get_sentiment(text):
     return "⚪"
 
 def clean_text(text):
-    """清洗文本"""
-    text = text.replace('\\n', '\n').replace('\\t', ' ').replace('\\"', '"')
-    text = re.sub(r'<[^>]+>', ' ', text)
-    text = re.sub(r'\$[^$]+\$', '', text)
-    text = ' '.join(text.split())
-    return text.strip()
+    """清洗文本（去标签 / 实体 / 表情，去掉股票标记）"""
+    return text_clean.clean(text, strip_cashtags=True)
 
-def extract_posts(raw_text):
-    """提取帖子"""
+def extract_posts(snapshot):
+    """提取帖子（逐条完整解析 JSON，text / 时间 / 作者不会错位）"""
     posts = []
-    text_matches = list(re.finditer(r'"text":"(.*?)"[,}]', raw_text, re.DOTALL))
-    time_matches = list(re.finditer(r'"created_at":(\d+)', raw_text))
-    author_matches = list(re.finditer(r'"screen_name":"(.*?)"', raw_text))
-    
-    for i, tm in enumerate(text_matches[:20]):  # 每页最多20条
-        try:
-            text = tm.group(1)
-            text = clean_text(text)
-            if len(text) < 5 or len(text) > 500:
-                continue
-            
-            ts = int(time_matches[i].group(1)) if i < len(time_matches) else 0
-            author = author_matches[i].group(1) if i < len(author_matches) else "匿名"
-            author = author.replace('\\"', '"')
-            
-            posts.append({
-                'text': text[:150],
-                'author': author[:20],
-                'time': datetime.fromtimestamp(ts/1000).strftime('%m-%d %H:%M') if ts else '',
-                'sentiment': get_sentiment(text),
-                'timestamp': ts,
-            })
-        except:
+    for item in islice(iter_snapshot_posts(snapshot), 20):  # 每页最多20条
+        text = clean_text(item.get('text') or '')
+        if len(text) < 5 or len(text) > 500:
             continue
+        
+        ts = item.get('created_at') or 0
+        author = (item.get('user') or {}).get('screen_name') or "匿名"
+        
+        posts.append({
+            'text': text[:150],
+            'author': author[:20],
+            'time': datetime.fromtimestamp(ts/1000).strftime('%m-%d %H:%M') if ts else '',
+            'sentiment': get_sentiment(text),
+            'timestamp': ts,
+        })
     
     return posts
 
@@ -75,36 +65,8 @@ def fetch_page(symbol, page=1):
     url = f"https://xueqiu.com/statuses/search.json?count=20&symbol={symbol}&page={page}&_={ts}"
     
     try:
-        r1 = subprocess.run(['openclaw', 'browser', 'open', url], 
-            capture_output=True, text=True, timeout=30)
-        
-        m = re.search(r'id:\s*([A-F0-9]+)', r1.stdout)
-        if not m: return []
-        
-        tid = m.group(1)
-        time.sleep(2)
-        
-        r2 = subprocess.run(['openclaw', 'browser', 'snapshot', '--target-id', tid],
-            capture_output=True, text=True, timeout=30)
-        
-        subprocess.run(['openclaw', 'browser', 'close', '--target-id', tid],
-            capture_output=True, timeout=10)
-        
-        line = r2.stdout.strip()
-        if 'generic [ref=' not in line:
-            return []
-        
-        pos = line.find(': "')
-        if pos < 0: return []
-        
-        start = pos + 2
-        end = line.rfind('"')
-        if end <= start: return []
-        
-        raw = line[start:end]
-        raw = raw.replace('\\"', '"').replace('\\\\', '\\')
-        
-        return extract_posts(raw)
+        # 常驻标签页打开，轮询等待数据就绪；snapshot 单遍流式解析
+        return extract_posts(get_browser_pool().snapshot(url))
         
     except Exception as e:
         return []